@@ -0,0 +1,207 @@
+# autopep8: off
+import sys; sys.dont_write_bytecode = True
+# autopep8: on
+import asyncio
+from typing import (Callable,
+                    Any,
+                    AsyncGenerator,
+                    Iterable)
+from itertools import islice
+from concurrent.futures import (ThreadPoolExecutor,
+                                Future)
+from .prs import Prs
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+
+class AsyncPrs():
+    def __init__(self,
+                 db_file_path: str,
+                 adb_name_prefix: str,
+                 adb_srt_rule: Callable | str,
+                 adb_srt_rule_kwargs: None | dict = None,
+                 cache_size: int | str = '64M',
+                 cache_warm_lvls: int = 0,
+                 frame_cache_size: int | str = '32M',
+                 key_enc: bool = False,
+                 prs_objs_quan: int = 4,
+                 tasks_quan: int | None = None,
+                 rng_chunk_len: int = 1000):
+        if prs_objs_quan < 1:
+            raise ValueError(f'prs_objs_quan must be positive, not {prs_objs_quan}')
+        self.prs_kwargs = {'db_file_path': db_file_path,
+                           'adb_name_prefix': adb_name_prefix,
+                           'adb_srt_rule': adb_srt_rule,
+                           'adb_srt_rule_kwargs': adb_srt_rule_kwargs,
+                           'cache_size': cache_size,
+                           'cache_warm_lvls': cache_warm_lvls,
+                           'frame_cache_size': frame_cache_size,
+                           'key_enc': key_enc}
+        self.prs_objs_quan = prs_objs_quan
+        self.tasks_quan = tasks_quan or prs_objs_quan
+        self.rng_chunk_len = rng_chunk_len
+        self.executor = ThreadPoolExecutor(prs_objs_quan)
+        self.tasks_sem = asyncio.Semaphore(self.tasks_quan)
+        self.prs_objs = []
+        self.free_prs_objs = asyncio.Queue()
+        self.free_prs_objs.put_nowait(self.crt_prs_obj())
+        self.prs_objs_crtd_quan = 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self,
+                        *exc_info: Any) -> None:
+        self.close()
+
+    def crt_prs_obj(self) -> Prs:
+        prs_obj = Prs(**self.prs_kwargs)
+        self.prs_objs.append(prs_obj)
+        return prs_obj
+
+    async def take_prs_obj(self) -> Prs:
+        if self.free_prs_objs.empty() \
+                and self.prs_objs_crtd_quan < self.prs_objs_quan:
+            self.prs_objs_crtd_quan += 1
+            try:
+                return await self.run(self.crt_prs_obj)
+            except BaseException:
+                self.prs_objs_crtd_quan -= 1
+                raise
+        return await self.free_prs_objs.get()
+
+    def put_prs_obj(self,
+                    prs_obj: Prs,
+                    exec_futs: list[Future]) -> None:
+        if not exec_futs \
+                or exec_futs[-1].done():
+            self.free_prs_objs.put_nowait(prs_obj)
+            return
+        loop = asyncio.get_running_loop()
+        exec_futs[-1].add_done_callback(lambda exec_fut: loop.call_soon_threadsafe(self.free_prs_objs.put_nowait,
+                                                                                   prs_obj))
+
+    async def run(self,
+                  any_func: Callable,
+                  *args: Any,
+                  exec_futs: None | list[Future] = None) -> Any:
+        async with self.tasks_sem:
+            exec_fut = self.executor.submit(any_func,
+                                            *args)
+            if exec_futs is not None:
+                exec_futs[:] = [exec_fut]
+            return await asyncio.wrap_future(exec_fut)
+
+    async def run_in_pool(self,
+                          prs_func: Callable) -> Any:
+        prs_obj = await self.take_prs_obj()
+        exec_futs = []
+        try:
+            return await self.run(prs_func,
+                                  prs_obj,
+                                  exec_futs=exec_futs)
+        finally:
+            self.put_prs_obj(prs_obj,
+                             exec_futs)
+
+    async def eq(self,
+                 *queries: Any) -> list[str]:
+        return await self.run_in_pool(lambda prs_obj: list(prs_obj.eq(*queries)))
+
+    async def eq_lstarts(self,
+                         *queries: Any) -> list[int]:
+        return await self.run_in_pool(lambda prs_obj: list(prs_obj.eq_lstarts(*queries)))
+
+    async def eq_plds(self,
+                      *queries: Any) -> list[tuple]:
+        return await self.run_in_pool(lambda prs_obj: list(prs_obj.eq_plds(*queries)))
+
+    async def eq_batch(self,
+                       queries: Iterable,
+                       ordr: str = 'input') -> list[tuple]:
+        return await self.run_in_pool(lambda prs_obj: list(prs_obj.eq_batch(queries,
+                                                                            ordr)))
+
+    async def fetch(self,
+                    lstarts: Iterable,
+                    ordr: str = 'file') -> list[str]:
+        return await self.run_in_pool(lambda prs_obj: list(prs_obj.fetch(lstarts,
+                                                                         ordr)))
+
+    async def count(self,
+                    query_start: Any = None,
+                    query_end: Any = None) -> int:
+        return await self.run_in_pool(lambda prs_obj: prs_obj.count(query_start,
+                                                                    query_end))
+
+    async def exists(self,
+                     query: Any) -> bool:
+        return await self.run_in_pool(lambda prs_obj: prs_obj.exists(query))
+
+    @staticmethod
+    def read_lines_chunk(prs_obj: Prs,
+                         lstarts: Iterable,
+                         rng_chunk_len: int) -> list[str]:
+        lstarts_chunk = list(islice(lstarts,
+                                    rng_chunk_len))
+        lines_by_lstarts = dict(prs_obj.read_srtd_lines(sorted(set(lstarts_chunk))))
+        return [lines_by_lstarts[lstart]
+                for lstart in lstarts_chunk]
+
+    async def iter_chunks(self,
+                          prs_func: Callable,
+                          chunk_func: Callable) -> AsyncGenerator:
+        prs_obj = await self.take_prs_obj()
+        exec_futs = []
+        try:
+            rows = await self.run(prs_func,
+                                  prs_obj,
+                                  exec_futs=exec_futs)
+            while True:
+                rows_chunk = await self.run(chunk_func,
+                                            prs_obj,
+                                            rows,
+                                            self.rng_chunk_len,
+                                            exec_futs=exec_futs)
+                if not rows_chunk:
+                    break
+                for row in rows_chunk:
+                    yield row
+        finally:
+            self.put_prs_obj(prs_obj,
+                             exec_futs)
+
+    async def rng(self,
+                  query_start: Any,
+                  query_end: Any) -> AsyncGenerator:
+        async for line in self.iter_chunks(lambda prs_obj: prs_obj.rng_lstarts(query_start,
+                                                                               query_end),
+                                           self.read_lines_chunk):
+            yield line
+
+    async def rng_lstarts(self,
+                          query_start: Any,
+                          query_end: Any) -> AsyncGenerator:
+        async for lstart in self.iter_chunks(lambda prs_obj: prs_obj.rng_lstarts(query_start,
+                                                                                 query_end),
+                                             lambda prs_obj, lstarts, rng_chunk_len: list(islice(lstarts,
+                                                                                                 rng_chunk_len))):
+            yield lstart
+
+    async def rng_plds(self,
+                       query_start: Any,
+                       query_end: Any) -> AsyncGenerator:
+        async for val_n_pld in self.iter_chunks(lambda prs_obj: prs_obj.rng_plds(query_start,
+                                                                                 query_end),
+                                                lambda prs_obj, vals_n_plds, rng_chunk_len: list(islice(vals_n_plds,
+                                                                                                        rng_chunk_len))):
+            yield val_n_pld
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        for prs_obj in self.prs_objs:
+            prs_obj.close()
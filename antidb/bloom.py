@@ -0,0 +1,94 @@
+from typing import (Any,
+                    Generator)
+from math import (ceil,
+                  log)
+from struct import Struct
+from hashlib import blake2b
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+BLOOM_MAGIC = b'ADBB'
+BLOOM_HEAD = Struct('<4sQB')
+
+
+def norm_val(val: Any) -> Any:
+    if type(val) in (list, tuple):
+        return list(map(norm_val, val))
+    elif type(val) is float \
+            and val.is_integer():
+        return int(val)
+    elif type(val) is bool:
+        return int(val)
+    return val
+
+
+def calc_bloom_params(vals_quan: int,
+                      fpr: float) -> tuple[int,
+                                           int]:
+    if not 0 < fpr < 1:
+        raise ValueError(f'False positive rate must be between 0 and 1, not {fpr}')
+    vals_quan = max(vals_quan, 1)
+    bits_quan = max(ceil(-vals_quan * log(fpr) / log(2) ** 2), 8)
+    hashes_quan = max(round(bits_quan / vals_quan * log(2)), 1)
+    return bits_quan, hashes_quan
+
+
+class BloomFilter():
+    def __init__(self,
+                 bits_quan: int,
+                 hashes_quan: int,
+                 bits: None | bytearray = None):
+        self.bits_quan = bits_quan
+        self.hashes_quan = hashes_quan
+        if bits is None:
+            self.bits = bytearray((bits_quan + 7) // 8)
+        else:
+            self.bits = bits
+        self.rejects = 0
+        self.fps = 0
+
+    def get_bit_inds(self,
+                     val: Any) -> Generator:
+        val_hash = blake2b(repr(norm_val(val)).encode(),
+                           digest_size=16).digest()
+        fir_hash = int.from_bytes(val_hash[:8], 'little')
+        sec_hash = int.from_bytes(val_hash[8:], 'little') | 1
+        for hash_num in range(self.hashes_quan):
+            yield (fir_hash + hash_num * sec_hash) % self.bits_quan
+
+    def add(self,
+            val: Any) -> None:
+        for bit_ind in self.get_bit_inds(val):
+            self.bits[bit_ind >> 3] |= 1 << (bit_ind & 7)
+
+    def __contains__(self,
+                     val: Any) -> bool:
+        for bit_ind in self.get_bit_inds(val):
+            if not self.bits[bit_ind >> 3] & 1 << (bit_ind & 7):
+                return False
+        return True
+
+    def get_stats(self) -> dict:
+        return {'size': len(self.bits),
+                'hashes_quan': self.hashes_quan,
+                'rejects': self.rejects,
+                'fps': self.fps}
+
+
+def dump_bloom(bloom_filter: BloomFilter) -> bytes:
+    return BLOOM_HEAD.pack(BLOOM_MAGIC,
+                           bloom_filter.bits_quan,
+                           bloom_filter.hashes_quan) + bytes(bloom_filter.bits)
+
+
+def load_bloom(bloom: bytes) -> BloomFilter:
+    magic, bits_quan, hashes_quan = BLOOM_HEAD.unpack_from(bloom)
+    if magic != BLOOM_MAGIC:
+        raise ValueError('Not a Bloom filter of antidb')
+    return BloomFilter(bits_quan,
+                       hashes_quan,
+                       bytearray(memoryview(bloom)[BLOOM_HEAD.size:]))
@@ -12,3 +12,19 @@ class QueryStartGtEndError(Exception):
         err_msg = f'''\nQuery start ({query_start})
 more then query end ({query_end})'''
         super().__init__(err_msg)
+
+
+class NoPldsError(Exception):
+    def __init__(self,
+                 adb_path):
+        err_msg = f'''\nIndex {adb_path} has no payloads.
+Rebuild it with db_line_pld argument'''
+        super().__init__(err_msg)
+
+
+class NoIvalsError(Exception):
+    def __init__(self,
+                 adb_path):
+        err_msg = f'''\nIndex {adb_path} has no intervals.
+Rebuild it with ival_flag argument'''
+        super().__init__(err_msg)
@@ -0,0 +1,48 @@
+from struct import Struct
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+FLAT_ADB_MAGIC = b'ADBF'
+FLAT_ADB_HEAD = Struct('<4sBQQQQB')
+FLAT_ADB_VER = 2
+FLAT_ADB_KEY_ENC = 0x1
+FLAT_ADB_BLK_ALIGN = 8
+
+
+def dump_flat_adb_head(fences_start: int = 0,
+                       fences_size: int = 0,
+                       bloom_start: int = 0,
+                       bloom_size: int = 0,
+                       key_enc: bool = False) -> bytes:
+    return FLAT_ADB_HEAD.pack(FLAT_ADB_MAGIC,
+                              FLAT_ADB_VER,
+                              fences_start,
+                              fences_size,
+                              bloom_start,
+                              bloom_size,
+                              FLAT_ADB_KEY_ENC if key_enc else 0)
+
+
+def is_flat_adb(adb_start: bytes) -> bool:
+    return adb_start.startswith(FLAT_ADB_MAGIC)
+
+
+def load_flat_adb_head(flat_adb: bytes) -> tuple[int,
+                                                 int,
+                                                 int,
+                                                 int,
+                                                 None | bool]:
+    magic, fmt_ver, fences_start, fences_size, bloom_start, bloom_size, flags = FLAT_ADB_HEAD.unpack_from(flat_adb)
+    if magic != FLAT_ADB_MAGIC:
+        raise ValueError('Not a flat index of antidb')
+    if fmt_ver < 2:
+        return fences_start, fences_size, bloom_start, bloom_size, None
+    return fences_start, fences_size, bloom_start, bloom_size, bool(flags & FLAT_ADB_KEY_ENC)
+
+
+def get_blk_pad(blk_end: int) -> bytes:
+    return b'\0' * (-blk_end % FLAT_ADB_BLK_ALIGN)
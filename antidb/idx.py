@@ -2,22 +2,60 @@
 import sys; sys.dont_write_bytecode = True
 # autopep8: on
 import os
+import re
+import gc
+import json
+import shutil
+from array import array
 from typing import (Callable,
                     Any,
-                    Generator)
+                    BinaryIO,
+                    Generator,
+                    Iterable)
 from datetime import datetime
+from time import (perf_counter,
+                  perf_counter_ns)
+from locale import getpreferredencoding
+from functools import partial
 from copy import deepcopy
 from zipfile import ZipFile
-from tempfile import TemporaryFile
+from tempfile import (TemporaryFile,
+                      NamedTemporaryFile,
+                      mkdtemp)
 from pickle import (dump,
+                    dumps,
                     load,
+                    loads,
                     HIGHEST_PROTOCOL)
 from heapq import merge
+from operator import itemgetter
 from io import TextIOWrapper
+from threading import Thread
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
 from .srt import SrtRules
+from .mtr import Metrics
+from .lstarts import (dump_lstarts_idx,
+                      load_any_lstarts_idx,
+                      zip_cols)
+from .bloom import (BloomFilter,
+                    calc_bloom_params,
+                    dump_bloom)
+from .key import enc_srt_rule
+from .flat import (FLAT_ADB_HEAD,
+                   dump_flat_adb_head,
+                   get_blk_pad,
+                   is_flat_adb)
+from bisect import bisect_right
+from .zst import (read_seek_table,
+                  split_by_frames,
+                  decompress_frames,
+                  scan_lines)
 from pyzstd import (CParameter,
                     SeekableZstdFile,
-                    ZstdFile)
+                    ZstdFile,
+                    compress,
+                    decompress)
 
 if __name__ == 'main':
     __version__ = 'v6.1.0'
@@ -29,7 +67,12 @@ if __name__ == 'main':
 def count_exec_time(any_func: Callable) -> Callable:
     def wrapper(*args: Any, **kwargs: Any):
         exec_time_start = datetime.now()
+        exec_time_start_ns = perf_counter_ns()
         any_func_res = any_func(*args, **kwargs)
+        if args \
+                and type(getattr(args[0], 'metrics', None)) is Metrics:
+            args[0].metrics.add_time(any_func.__name__,
+                                     perf_counter_ns() - exec_time_start_ns)
         return (any_func.__name__,
                 any_func_res,
                 str(datetime.now() -
@@ -37,20 +80,109 @@ def count_exec_time(any_func: Callable) -> Callable:
     return wrapper
 
 
+def parse_size(size: int | str) -> int:
+    if type(size) is int:
+        return size
+    size_match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMGT]?)B?',
+                              size.strip().upper())
+    if not size_match:
+        raise ValueError(f'Unparsable size: {size}')
+    return int(float(size_match.group(1)) *
+               1024 ** ' KMGT'.index(size_match.group(2) or ' '))
+
+
+def get_obj_size(obj: Any) -> int:
+    obj_size = sys.getsizeof(obj)
+    if type(obj) in (list, tuple):
+        obj_size += sum(map(get_obj_size, obj))
+    return obj_size
+
+
+def estim_obj_size(obj: Any,
+                   samples_quan: int = 32) -> int:
+    if type(obj) not in (list, tuple):
+        return sys.getsizeof(obj)
+    obj_size = sys.getsizeof(obj)
+    if len(obj) <= samples_quan:
+        return obj_size + sum(map(estim_obj_size, obj))
+    sample_step = len(obj) / samples_quan
+    sampled_size = sum(estim_obj_size(obj[int(sample_num * sample_step)])
+                       for sample_num in range(samples_quan))
+    return obj_size + sampled_size * len(obj) // samples_quan
+
+
+def call_wo_gc(any_func: Callable,
+               *args: Any,
+               **kwargs: Any) -> Any:
+    if not gc.isenabled():
+        return any_func(*args, **kwargs)
+    gc.disable()
+    try:
+        return any_func(*args, **kwargs)
+    finally:
+        gc.enable()
+
+
+def get_root_paths_idx_paths(adb_names: Iterable) -> list:
+    seg_nums = sorted(int(seg_root_match.group(1))
+                      for seg_root_match in map(re.compile(r'seg(\d+)/paths').fullmatch,
+                                                adb_names)
+                      if seg_root_match)
+    return ['paths'] + [f'seg{seg_num}/paths'
+                        for seg_num in seg_nums]
+
+
+def init_presrt_worker(idx_obj: 'Idx',
+                       presrt_dir_path: str) -> None:
+    global presrt_worker_idx_obj
+    presrt_worker_idx_obj = idx_obj
+    presrt_worker_idx_obj.presrt_named_flag = True
+    presrt_worker_idx_obj.temp_dir_path = presrt_dir_path
+    if presrt_worker_idx_obj.presrt_mem_limit:
+        presrt_worker_idx_obj.presrt_mem_limit = max(presrt_worker_idx_obj.presrt_mem_limit // presrt_worker_idx_obj.presrt_procs,
+                                                     1)
+
+
+def presrt_part_in_worker(part_start: int,
+                          part_end: int) -> tuple[list,
+                                                  bool,
+                                                  dict]:
+    presrt_worker_idx_obj.presrtd_idxs_opened.clear()
+    presrt_worker_idx_obj.metrics.reset()
+    stop_flag = presrt_worker_idx_obj.presrt_part(part_start,
+                                                  part_end)
+    presrtd_idx_paths = []
+    for presrtd_idx_opened in presrt_worker_idx_obj.presrtd_idxs_opened:
+        presrtd_idx_paths.append(presrtd_idx_opened.name)
+        presrtd_idx_opened.close()
+    return presrtd_idx_paths, stop_flag, dict(presrt_worker_idx_obj.metrics.counters)
+
+
 class Idx(SrtRules):
     def __init__(self,
                  db_file_path: str,
                  adb_name_prefix: str,
                  db_line_prs: Callable,
-                 adb_srt_rule: Callable,
+                 adb_srt_rule: Callable | str,
                  db_line_prs_kwargs: None | dict = None,
                  adb_srt_rule_kwargs: None | dict = None,
                  compr_level: int = 3,
                  compr_frame_size: int = 1024 * 1024,
-                 compr_chunk_size: int = 1024 * 1024 * 1024,
+                 compr_chunk_size: int = 16 * 1024 * 1024,
+                 compr_threads: int = 0,
                  presrt_chunk_len: int = 40000000,
+                 presrt_procs: int = 1,
+                 presrt_blk_len: int = 65536,
+                 presrt_mem_limit: None | int | str = None,
                  lstarts_idx_div: int = 1000,
-                 lstarts_idx_len: int = 40000):
+                 lstarts_idx_len: int = 40000,
+                 lstarts_idx_fmt: int = 1,
+                 db_line_pld: None | Callable = None,
+                 db_line_pld_kwargs: None | dict = None,
+                 bloom_fpr: None | float = None,
+                 adb_fmt: str = 'zip',
+                 key_enc: bool = False,
+                 ival_flag: bool = False):
         super().__init__()
         self.db_file_path = os.path.normpath(db_file_path)
         if self.db_file_path.endswith('.zst'):
@@ -61,7 +193,16 @@ class Idx(SrtRules):
             self.adb_path = f'{self.db_file_path}.{adb_name_prefix}.adb'
         self.temp_dir_path = os.path.dirname(self.db_file_path)
         self.db_line_prs = db_line_prs
-        self.adb_srt_rule = adb_srt_rule
+        if type(adb_srt_rule) is str:
+            self.adb_srt_rule = getattr(SrtRules,
+                                        adb_srt_rule)
+        else:
+            self.adb_srt_rule = adb_srt_rule
+        self.src_adb_srt_rule = self.adb_srt_rule
+        if key_enc:
+            self.adb_srt_rule = enc_srt_rule(self.adb_srt_rule)
+        self.key_enc = key_enc
+        self.ival_flag = ival_flag
         if db_line_prs_kwargs:
             self.db_line_prs_kwargs = db_line_prs_kwargs
         else:
@@ -70,92 +211,363 @@ class Idx(SrtRules):
             self.adb_srt_rule_kwargs = adb_srt_rule_kwargs
         else:
             self.adb_srt_rule_kwargs = {}
+        self.db_line_pld = db_line_pld
+        if db_line_pld_kwargs:
+            self.db_line_pld_kwargs = db_line_pld_kwargs
+        else:
+            self.db_line_pld_kwargs = {}
         self.presrtd_idxs_opened = []
         self.compr_settings = {CParameter.compressionLevel:
                                compr_level}
+        self.db_compr_settings = {CParameter.compressionLevel:
+                                  compr_level,
+                                  CParameter.nbWorkers:
+                                  compr_threads}
+        self.db_enc = getpreferredencoding(False)
         self.compr_frame_size = compr_frame_size
         self.compr_chunk_size = compr_chunk_size
         self.presrt_chunk_len = presrt_chunk_len
+        self.presrt_procs = presrt_procs
+        self.presrt_blk_len = presrt_blk_len
+        if presrt_mem_limit:
+            self.presrt_mem_limit = parse_size(presrt_mem_limit)
+        else:
+            self.presrt_mem_limit = None
+        self.presrt_sample_step = 64
+        self.sampled_vals_size = 0
+        self.sampled_vals_quan = 0
+        self.presrt_named_flag = False
         self.lstarts_idx_div = lstarts_idx_div
         if self.lstarts_idx_div < 2:
             self.lstarts_idx_div = 2
         self.lstarts_idx_len = lstarts_idx_len
+        self.lstarts_idx_fmt = lstarts_idx_fmt
+        if bloom_fpr:
+            calc_bloom_params(1,
+                              bloom_fpr)
+        self.bloom_fpr = bloom_fpr
+        if adb_fmt not in ('zip', 'flat'):
+            raise ValueError(f"adb_fmt must be 'zip' or 'flat', not {adb_fmt}")
+        self.adb_fmt = adb_fmt
         self.perf = []
+        self.metrics = Metrics()
 
     def idx(self) -> None:
+        presrt_in_compr_flag = False
         if not os.path.exists(self.db_zst_path):
-            self.perf.append(self.crt_db_zst())
+            presrt_in_compr_flag = self.presrt_procs <= 1 \
+                and not os.path.exists(self.adb_path)
+            self.perf.append(self.crt_db_zst(presrt_in_compr_flag))
         if not os.path.exists(self.adb_path):
-            self.perf.append(self.presrt_idxs())
+            if not presrt_in_compr_flag:
+                self.perf.append(self.presrt_idxs())
             self.perf.append(self.crt_adb())
         for presrtd_idx_opened in self.presrtd_idxs_opened:
             presrtd_idx_opened.close()
 
+    def get_metrics(self) -> dict:
+        return {**self.metrics.to_dict(),
+                'perf': self.perf}
+
+    def get_metrics_json(self,
+                         **json_kwargs: Any) -> str:
+        return json.dumps(self.get_metrics(),
+                          default=str,
+                          **json_kwargs)
+
+    @staticmethod
+    def write_db_chunks(db_file_chunks: Iterable,
+                        db_zst_opened: SeekableZstdFile,
+                        metrics: None | Metrics = None) -> Generator:
+        for db_file_chunk in db_file_chunks:
+            db_zst_opened.write(db_file_chunk)
+            if metrics is not None:
+                metrics.incr('bytes_compressed',
+                             len(db_file_chunk))
+            yield db_file_chunk
+
     @count_exec_time
-    def crt_db_zst(self) -> None:
-        with open(self.db_file_path) as db_file_opened:
-            with TextIOWrapper(SeekableZstdFile(self.db_zst_path,
-                                                mode='w',
-                                                level_or_option=self.compr_settings,
-                                                max_frame_content_size=self.compr_frame_size)) as db_zst_opened:
-                while True:
-                    db_file_chunk = db_file_opened.read(self.compr_chunk_size)
-                    if not db_file_chunk:
-                        break
-                    db_zst_opened.write(db_file_chunk)
+    def crt_db_zst(self,
+                   presrt_flag: bool = False,
+                   presrt_lines_func: None | Callable = None) -> None:
+        temp_db_zst_path = f'{self.db_zst_path}.tmp'
+        try:
+            with open(self.db_file_path, mode='rb') as db_file_opened:
+                with SeekableZstdFile(temp_db_zst_path,
+                                      mode='w',
+                                      level_or_option=self.db_compr_settings,
+                                      max_frame_content_size=self.compr_frame_size) as db_zst_opened:
+                    db_file_chunks = self.write_db_chunks(iter(partial(db_file_opened.read,
+                                                                       self.compr_chunk_size),
+                                                               b''),
+                                                          db_zst_opened,
+                                                          self.metrics)
+                    if presrt_flag:
+                        self.presrtd_idxs_opened.clear()
+                        (presrt_lines_func or self.presrt_lines)(self.skip_header(self.decode_lines(scan_lines(db_file_chunks))))
+                    for db_file_chunk in db_file_chunks:
+                        pass
+        except BaseException:
+            if os.path.exists(temp_db_zst_path):
+                os.remove(temp_db_zst_path)
+            raise
+        os.replace(temp_db_zst_path,
+                   self.db_zst_path)
+
+    def decode_lines(self,
+                     db_zst_lines: Iterable,
+                     part_start: int = 0,
+                     part_end: int | None = None) -> Generator:
+        for db_zst_lstart, db_zst_line in db_zst_lines:
+            if db_zst_lstart < part_start:
+                continue
+            if part_end is not None \
+                    and db_zst_lstart >= part_end:
+                break
+            yield db_zst_lstart, db_zst_line.decode(self.db_enc).rstrip()
+
+    @staticmethod
+    def skip_header(db_zst_lines: Iterable) -> Generator:
+        for db_zst_lstart, db_zst_line in db_zst_lines:
+            if not db_zst_line.startswith('#'):
+                yield db_zst_lstart, db_zst_line
+                break
+        yield from db_zst_lines
+
+    def sample_val_size(self,
+                        val: Any,
+                        val_overhead: int) -> int:
+        self.sampled_vals_size += get_obj_size(val)
+        self.sampled_vals_quan += 1
+        val_size = self.sampled_vals_size // self.sampled_vals_quan + val_overhead
+        return max(1,
+                   min(self.presrt_chunk_len,
+                       self.presrt_mem_limit // val_size))
 
     def presrt_idx(self,
-                   vals_n_lstarts: list) -> None:
-        vals_n_lstarts.sort()
-        presrtd_idx_opened = TemporaryFile(dir=self.temp_dir_path)
+                   vals: list,
+                   lstarts: array,
+                   plds: None | list = None,
+                   ends: None | list = None) -> None:
+        srtd_inds = sorted(range(len(vals)),
+                           key=vals.__getitem__)
+        self.metrics.incr('keys_emitted',
+                          len(vals))
+        self.metrics.incr('spill_runs')
+        if self.presrt_named_flag:
+            presrtd_idx_opened = NamedTemporaryFile(dir=self.temp_dir_path,
+                                                    delete=False)
+        else:
+            presrtd_idx_opened = TemporaryFile(dir=self.temp_dir_path)
         self.presrtd_idxs_opened.append(presrtd_idx_opened)
-        dump(len(vals_n_lstarts),
+        blk_starts = range(0,
+                           len(srtd_inds),
+                           self.presrt_blk_len)
+        dump([len(blk_starts),
+              len(srtd_inds)],
              presrtd_idx_opened)
-        for val_n_start in vals_n_lstarts:
-            dump(val_n_start,
-                 presrtd_idx_opened,
-                 HIGHEST_PROTOCOL)
+        for blk_start in blk_starts:
+            if ends:
+                cols = [vals, lstarts, ends] + [plds] * bool(plds)
+                dump([[col[srtd_ind] for col in cols]
+                      for srtd_ind in srtd_inds[blk_start:
+                                                blk_start + self.presrt_blk_len]],
+                     presrtd_idx_opened,
+                     HIGHEST_PROTOCOL)
+            elif plds:
+                dump([[vals[srtd_ind], lstarts[srtd_ind], plds[srtd_ind]]
+                      for srtd_ind in srtd_inds[blk_start:
+                                                blk_start + self.presrt_blk_len]],
+                     presrtd_idx_opened,
+                     HIGHEST_PROTOCOL)
+            else:
+                dump([[vals[srtd_ind], lstarts[srtd_ind]]
+                      for srtd_ind in srtd_inds[blk_start:
+                                                blk_start + self.presrt_blk_len]],
+                     presrtd_idx_opened,
+                     HIGHEST_PROTOCOL)
         presrtd_idx_opened.seek(0)
 
-    @count_exec_time
-    def presrt_idxs(self) -> None:
+    def init_presrt_buf(self) -> None:
+        self.presrt_buf_vals = []
+        self.presrt_buf_lstarts = array('Q')
+        self.presrt_buf_plds = []
+        self.presrt_buf_ends = []
+        self.presrt_spill_len = self.presrt_chunk_len
+        self.presrt_sample_len = 1
+
+    def spill_presrt_buf(self) -> None:
+        if self.presrt_buf_vals:
+            self.presrt_idx(self.presrt_buf_vals,
+                            self.presrt_buf_lstarts,
+                            self.presrt_buf_plds,
+                            self.presrt_buf_ends)
+            self.presrt_buf_vals.clear()
+            del self.presrt_buf_lstarts[:]
+            self.presrt_buf_plds.clear()
+            self.presrt_buf_ends.clear()
+        self.presrt_sample_len = 1
+
+    def presrt_line(self,
+                    db_zst_lstart: int,
+                    db_zst_line: str) -> None:
+        db_line_prs_out = self.db_line_prs(db_zst_line,
+                                           **self.db_line_prs_kwargs)
+        if not db_line_prs_out:
+            return
+        vals = self.presrt_buf_vals
+        ends = self.presrt_buf_ends
+        if self.ival_flag:
+            if type(db_line_prs_out) is tuple:
+                db_line_prs_out = [db_line_prs_out]
+            for ival_start, ival_end in db_line_prs_out:
+                val = self.adb_srt_rule(ival_start,
+                                        **self.adb_srt_rule_kwargs)
+                end = self.adb_srt_rule(ival_end,
+                                        **self.adb_srt_rule_kwargs)
+                if val > end:
+                    raise ValueError(f'Interval start {ival_start} is greater than its end {ival_end}')
+                vals.append(val)
+                ends.append(end)
+                self.presrt_buf_lstarts.append(db_zst_lstart)
+        elif type(db_line_prs_out) is tuple:
+            for db_line_prs_out_elem in db_line_prs_out:
+                vals.append(self.adb_srt_rule(db_line_prs_out_elem,
+                                              **self.adb_srt_rule_kwargs))
+                self.presrt_buf_lstarts.append(db_zst_lstart)
+        else:
+            vals.append(self.adb_srt_rule(db_line_prs_out,
+                                          **self.adb_srt_rule_kwargs))
+            self.presrt_buf_lstarts.append(db_zst_lstart)
+        plds = self.presrt_buf_plds
+        if self.db_line_pld:
+            db_line_pld_out = self.db_line_pld(db_zst_line,
+                                               **self.db_line_pld_kwargs)
+            plds.extend([db_line_pld_out] * (len(vals) - len(plds)))
+        if self.presrt_mem_limit \
+                and len(vals) >= self.presrt_sample_len:
+            if plds or ends:
+                self.presrt_spill_len = self.sample_val_size((vals[-1], *ends[-1:], *plds[-1:]),
+                                                             64)
+            else:
+                self.presrt_spill_len = self.sample_val_size(vals[-1],
+                                                             64)
+            self.presrt_sample_len = len(vals) + self.presrt_sample_step
+        if len(vals) >= self.presrt_spill_len:
+            self.spill_presrt_buf()
+
+    def presrt_lines(self,
+                     db_zst_lines: Iterable) -> bool:
+        self.init_presrt_buf()
+        stop_flag = False
+        lines_quan = 0
+        for db_zst_lstart, db_zst_line in db_zst_lines:
+            if not db_zst_line:
+                stop_flag = True
+                break
+            self.presrt_line(db_zst_lstart,
+                             db_zst_line)
+            lines_quan += 1
+        self.spill_presrt_buf()
+        self.metrics.incr('lines_scanned',
+                          lines_quan)
+        return stop_flag
+
+    def read_part_lines(self,
+                        part_start: int = 0,
+                        part_end: int | None = None) -> Generator:
+        frame_c_starts, frame_d_starts = read_seek_table(self.db_zst_path)
+        if part_start:
+            frame_ind = bisect_right(frame_d_starts,
+                                     part_start - 1) - 1
+        else:
+            frame_ind = 0
+        db_zst_lines = self.decode_lines(scan_lines(decompress_frames(self.db_zst_path,
+                                                                      frame_c_starts,
+                                                                      frame_d_starts,
+                                                                      frame_ind,
+                                                                      self.compr_chunk_size),
+                                                    frame_d_starts[frame_ind]),
+                                         part_start,
+                                         part_end)
+        if not part_start:
+            db_zst_lines = self.skip_header(db_zst_lines)
+        return db_zst_lines
+
+    def presrt_part(self,
+                    part_start: int = 0,
+                    part_end: int | None = None) -> bool:
+        return self.presrt_lines(self.read_part_lines(part_start,
+                                                      part_end))
+
+    def find_body_start(self) -> int:
         with TextIOWrapper(SeekableZstdFile(self.db_zst_path)) as db_zst_opened:
             while True:
                 db_zst_lstart = db_zst_opened.tell()
                 if not db_zst_opened.readline().startswith('#'):
-                    db_zst_opened.seek(db_zst_lstart)
-                    break
-            self.presrtd_idxs_opened.clear()
-            vals_n_lstarts = []
-            while True:
-                db_zst_lstart = db_zst_opened.tell()
-                db_zst_line = db_zst_opened.readline().rstrip()
-                if not db_zst_line:
-                    if vals_n_lstarts:
-                        self.presrt_idx(vals_n_lstarts)
-                    break
-                db_line_prs_out = self.db_line_prs(db_zst_line,
-                                                   **self.db_line_prs_kwargs)
-                if not db_line_prs_out:
-                    continue
-                elif type(db_line_prs_out) is tuple:
-                    for db_line_prs_out_elem in db_line_prs_out:
-                        vals_n_lstarts.append([self.adb_srt_rule(db_line_prs_out_elem,
-                                                                 **self.adb_srt_rule_kwargs),
-                                               db_zst_lstart])
-                else:
-                    vals_n_lstarts.append([self.adb_srt_rule(db_line_prs_out,
-                                                             **self.adb_srt_rule_kwargs),
-                                           db_zst_lstart])
-                if len(vals_n_lstarts) == self.presrt_chunk_len:
-                    self.presrt_idx(vals_n_lstarts)
-                    vals_n_lstarts.clear()
+                    return db_zst_lstart
+
+    def presrt_parts(self) -> None:
+        frame_d_starts = read_seek_table(self.db_zst_path)[1]
+        body_start = self.find_body_start()
+        parts_bords = [[max(part_start, body_start), part_end]
+                       for part_start, part_end in split_by_frames(frame_d_starts,
+                                                                   self.presrt_procs * 4)
+                       if part_end > body_start]
+        presrt_dir_path = mkdtemp(dir=self.temp_dir_path)
+        try:
+            with ProcessPoolExecutor(max_workers=self.presrt_procs,
+                                     mp_context=get_context('fork'),
+                                     initializer=init_presrt_worker,
+                                     initargs=(self,
+                                               presrt_dir_path)) as presrt_pool:
+                parts_res = [presrt_pool.submit(presrt_part_in_worker,
+                                                *part_bords)
+                             for part_bords in parts_bords]
+                try:
+                    stop_flag = False
+                    for part_res in parts_res:
+                        presrtd_idx_paths, part_stop_flag, part_counters = part_res.result()
+                        self.metrics.merge_counters(part_counters)
+                        for presrtd_idx_path in presrtd_idx_paths:
+                            if not stop_flag:
+                                self.presrtd_idxs_opened.append(open(presrtd_idx_path,
+                                                                     mode='rb'))
+                        stop_flag = stop_flag or part_stop_flag
+                except BaseException:
+                    presrt_pool.shutdown(cancel_futures=True)
+                    for presrtd_idx_opened in self.presrtd_idxs_opened:
+                        presrtd_idx_opened.close()
+                    self.presrtd_idxs_opened.clear()
+                    raise
+        finally:
+            shutil.rmtree(presrt_dir_path,
+                          ignore_errors=True)
+
+    @count_exec_time
+    def presrt_idxs(self,
+                    part_start: int = 0,
+                    part_end: int | None = None) -> None:
+        self.presrtd_idxs_opened.clear()
+        if self.presrt_procs > 1 \
+                and not part_start \
+                and part_end is None:
+            self.presrt_parts()
+        else:
+            self.presrt_part(part_start,
+                             part_end)
 
     @staticmethod
     def read_presrtd_idx(presrtd_idx_opened: TemporaryFile) -> Generator:
-        for obj_ind in range(load(presrtd_idx_opened)):
-            obj = load(presrtd_idx_opened)
-            yield obj
+        for blk_ind in range(load(presrtd_idx_opened)[0]):
+            yield from load(presrtd_idx_opened)
+
+    @staticmethod
+    def read_presrtd_vals_quan(presrtd_idx_opened: TemporaryFile) -> int:
+        presrtd_idx_opened.seek(0)
+        presrtd_vals_quan = load(presrtd_idx_opened)[1]
+        presrtd_idx_opened.seek(0)
+        return presrtd_vals_quan
 
     def crt_lstarts_idx(self,
                         vals_n_lstarts: list,
@@ -163,11 +575,18 @@ class Idx(SrtRules):
                         adb_opened_w: ZipFile) -> str:
         lstarts_idx_path = os.path.join(low_dir_path,
                                         'lstarts')
+        self.metrics.incr('leaves_written')
+        if self.lstarts_idx_fmt == 2:
+            with adb_opened_w.open(lstarts_idx_path,
+                                   mode='w') as lstarts_idx_opened:
+                lstarts_idx_opened.write(compress(dump_lstarts_idx(vals_n_lstarts),
+                                                  self.compr_settings))
+            return lstarts_idx_path
         with ZstdFile(adb_opened_w.open(lstarts_idx_path,
                                         mode='w'),
                       mode='w',
                       level_or_option=self.compr_settings) as lstarts_idx_opened:
-            dump(list(zip(*vals_n_lstarts)),
+            dump(zip_cols(vals_n_lstarts),
                  lstarts_idx_opened,
                  HIGHEST_PROTOCOL)
         return lstarts_idx_path
@@ -178,6 +597,7 @@ class Idx(SrtRules):
                       dir_path: str = '') -> str:
         paths_idx_path = os.path.join(dir_path,
                                       'paths')
+        self.metrics.incr('nodes_written')
         with adb_opened_w.open(paths_idx_path,
                                mode='w') as paths_idx_opened:
             dump(paths_idx_obj,
@@ -185,6 +605,22 @@ class Idx(SrtRules):
                  HIGHEST_PROTOCOL)
         return paths_idx_path
 
+    def init_paths_idx_obj(self) -> list:
+        if self.ival_flag:
+            return [[], [], [], []]
+        return [[], [], []]
+
+    def add_chi_any_idx(self,
+                        paths_idx_obj: list,
+                        chi_vals_n_lstarts: list,
+                        gchi_any_idx_path: str) -> None:
+        paths_idx_obj[0].append(chi_vals_n_lstarts[0][0])
+        paths_idx_obj[1].append(gchi_any_idx_path)
+        paths_idx_obj[2].append(len(chi_vals_n_lstarts))
+        if self.ival_flag:
+            paths_idx_obj[3].append(max(map(itemgetter(2),
+                                            chi_vals_n_lstarts)))
+
     def crt_dir_tree(self,
                      cur_dir_path: str,
                      cur_vals_n_lstarts: list,
@@ -212,7 +648,7 @@ class Idx(SrtRules):
                                                   chi_vals_n_lstarts_len)]
                               for bord_ind in bord_inds]
         chi_dir_num = 1
-        paths_idx_obj = [[], []]
+        paths_idx_obj = self.init_paths_idx_obj()
         for ind in range(len(chi_vals_n_lstarts)):
             chi_dir_path = os.path.join(cur_dir_path,
                                         str(chi_dir_num))
@@ -222,40 +658,410 @@ class Idx(SrtRules):
                                                   chi_vals_n_lstarts[ind],
                                                   adb_opened_w,
                                                   min_vals_n_lstarts_flag)
-            paths_idx_obj[0].append(chi_vals_n_lstarts[ind][0][0])
-            paths_idx_obj[1].append(gchi_any_idx_path)
+            self.add_chi_any_idx(paths_idx_obj,
+                                 chi_vals_n_lstarts[ind],
+                                 gchi_any_idx_path)
         paths_idx_path = self.crt_paths_idx(adb_opened_w,
                                             paths_idx_obj,
                                             cur_dir_path)
         return paths_idx_path
 
-    @count_exec_time
-    def crt_adb(self) -> None:
-        with ZipFile(self.adb_path,
-                     mode='w') as adb_opened_w:
+    def merge_presrtd_idxs(self,
+                           bloom_filter: None | BloomFilter = None,
+                           presrtd_idxs: None | list = None) -> Generator:
+        if presrtd_idxs is not None:
+            merged_vals_n_lstarts = merge(*presrtd_idxs,
+                                          key=itemgetter(0))
+        elif self.db_line_pld \
+                or self.ival_flag:
+            merged_vals_n_lstarts = merge(*map(self.read_presrtd_idx,
+                                               self.presrtd_idxs_opened),
+                                          key=itemgetter(0))
+        else:
+            merged_vals_n_lstarts = merge(*map(self.read_presrtd_idx,
+                                               self.presrtd_idxs_opened))
+        if bloom_filter is None:
+            yield from merged_vals_n_lstarts
+            return
+        prev_val = None
+        for val_n_lstart in merged_vals_n_lstarts:
+            if prev_val is None \
+                    or val_n_lstart[0] != prev_val:
+                bloom_filter.add(val_n_lstart[0])
+                prev_val = val_n_lstart[0]
+            yield val_n_lstart
+
+    def crt_zip_adb(self,
+                    merged_vals_n_lstarts: Iterable,
+                    bloom_filter: None | BloomFilter,
+                    adb_end: int,
+                    adb_path: None | str = None,
+                    seg_dir_path: str = '') -> int:
+        merged_vals_quan = 0
+        with ZipFile(adb_path or self.adb_path,
+                     mode='a' if seg_dir_path else 'w') as adb_opened_w:
+            if seg_dir_path:
+                adb_opened_w.mkdir(seg_dir_path)
             vals_n_lstarts = []
+            spill_len = self.presrt_chunk_len
+            sample_len = 1
             chi_dir_num = 1
-            paths_idx_obj = [[], []]
-            for val_n_lstart in merge(*map(self.read_presrtd_idx,
-                                           self.presrtd_idxs_opened)):
+            paths_idx_obj = self.init_paths_idx_obj()
+            for val_n_lstart in merged_vals_n_lstarts:
                 vals_n_lstarts.append(val_n_lstart)
-                if len(vals_n_lstarts) == self.presrt_chunk_len:
-                    chi_dir_name = str(chi_dir_num)
+                if self.presrt_mem_limit \
+                        and len(vals_n_lstarts) >= sample_len:
+                    if len(val_n_lstart) > 2:
+                        spill_len = self.sample_val_size((val_n_lstart[0], *val_n_lstart[2:]),
+                                                         120)
+                    else:
+                        spill_len = self.sample_val_size(val_n_lstart[0],
+                                                         120)
+                    sample_len = len(vals_n_lstarts) + self.presrt_sample_step
+                if len(vals_n_lstarts) >= spill_len:
+                    chi_dir_name = os.path.join(seg_dir_path,
+                                                str(chi_dir_num))
                     adb_opened_w.mkdir(chi_dir_name)
                     chi_dir_num += 1
                     gchi_any_idx_path = self.crt_dir_tree(chi_dir_name,
                                                           vals_n_lstarts,
                                                           adb_opened_w)
-                    paths_idx_obj[0].append(vals_n_lstarts[0][0])
-                    paths_idx_obj[1].append(gchi_any_idx_path)
+                    self.add_chi_any_idx(paths_idx_obj,
+                                         vals_n_lstarts,
+                                         gchi_any_idx_path)
+                    merged_vals_quan += len(vals_n_lstarts)
                     vals_n_lstarts.clear()
+                    sample_len = 1
             if vals_n_lstarts:
-                chi_dir_name = str(chi_dir_num)
+                chi_dir_name = os.path.join(seg_dir_path,
+                                            str(chi_dir_num))
                 adb_opened_w.mkdir(chi_dir_name)
                 gchi_any_idx_path = self.crt_dir_tree(chi_dir_name,
                                                       vals_n_lstarts,
                                                       adb_opened_w)
-                paths_idx_obj[0].append(vals_n_lstarts[0][0])
-                paths_idx_obj[1].append(gchi_any_idx_path)
+                self.add_chi_any_idx(paths_idx_obj,
+                                     vals_n_lstarts,
+                                     gchi_any_idx_path)
+                merged_vals_quan += len(vals_n_lstarts)
             self.crt_paths_idx(adb_opened_w,
-                               paths_idx_obj)
+                               paths_idx_obj,
+                               seg_dir_path)
+            if bloom_filter is not None:
+                adb_opened_w.writestr(os.path.join(seg_dir_path,
+                                                   'bloom'),
+                                      dump_bloom(bloom_filter))
+            adb_opened_w.writestr(os.path.join(seg_dir_path,
+                                               'end'),
+                                  dumps(adb_end))
+            adb_opened_w.writestr(os.path.join(seg_dir_path,
+                                               'meta'),
+                                  dumps({'key_enc': self.key_enc}))
+        return merged_vals_quan
+
+    def write_flat_blk(self,
+                       vals_n_lstarts: list,
+                       fences: list,
+                       adb_opened_w: BinaryIO) -> None:
+        blk = dump_lstarts_idx(vals_n_lstarts)
+        self.metrics.incr('leaves_written')
+        fences.append([vals_n_lstarts[0][0],
+                       adb_opened_w.tell(),
+                       len(blk),
+                       len(vals_n_lstarts)])
+        if self.ival_flag:
+            fences[-1].append(max(map(itemgetter(2),
+                                      vals_n_lstarts)))
+        adb_opened_w.write(blk)
+        adb_opened_w.write(get_blk_pad(adb_opened_w.tell()))
+
+    def crt_flat_adb(self,
+                     merged_vals_n_lstarts: Iterable,
+                     bloom_filter: None | BloomFilter = None) -> int:
+        merged_vals_quan = 0
+        with open(self.adb_path,
+                  mode='wb') as adb_opened_w:
+            adb_opened_w.write(dump_flat_adb_head())
+            adb_opened_w.write(get_blk_pad(adb_opened_w.tell()))
+            vals_n_lstarts = []
+            fences = []
+            for val_n_lstart in merged_vals_n_lstarts:
+                vals_n_lstarts.append(val_n_lstart)
+                if len(vals_n_lstarts) >= self.lstarts_idx_len:
+                    self.write_flat_blk(vals_n_lstarts,
+                                        fences,
+                                        adb_opened_w)
+                    merged_vals_quan += len(vals_n_lstarts)
+                    vals_n_lstarts.clear()
+            if vals_n_lstarts:
+                self.write_flat_blk(vals_n_lstarts,
+                                    fences,
+                                    adb_opened_w)
+                merged_vals_quan += len(vals_n_lstarts)
+            fences_start = adb_opened_w.tell()
+            adb_opened_w.write(dump_lstarts_idx(fences))
+            bloom_start = adb_opened_w.tell()
+            if bloom_filter is not None:
+                adb_opened_w.write(dump_bloom(bloom_filter))
+            bloom_end = adb_opened_w.tell()
+            adb_opened_w.seek(0)
+            adb_opened_w.write(dump_flat_adb_head(fences_start,
+                                                  bloom_start - fences_start,
+                                                  bloom_start,
+                                                  bloom_end - bloom_start,
+                                                  self.key_enc))
+        return merged_vals_quan
+
+    @count_exec_time
+    def crt_adb(self,
+                seg_dir_path: str = '') -> dict:
+        merge_start = perf_counter()
+        if self.bloom_fpr:
+            bloom_filter = BloomFilter(*calc_bloom_params(sum(map(self.read_presrtd_vals_quan,
+                                                                  self.presrtd_idxs_opened)),
+                                                          self.bloom_fpr))
+        else:
+            bloom_filter = None
+        merged_vals_n_lstarts = self.merge_presrtd_idxs(bloom_filter)
+        if self.adb_fmt == 'flat':
+            merged_vals_quan = self.crt_flat_adb(merged_vals_n_lstarts,
+                                                 bloom_filter)
+        else:
+            merged_vals_quan = self.crt_zip_adb(merged_vals_n_lstarts,
+                                                bloom_filter,
+                                                read_seek_table(self.db_zst_path)[1][-1],
+                                                seg_dir_path=seg_dir_path)
+        merge_time = perf_counter() - merge_start
+        self.metrics.incr('keys_merged',
+                          merged_vals_quan)
+        crt_adb_stats = {'merged_vals_quan': merged_vals_quan,
+                         'merged_vals_per_sec': round(merged_vals_quan /
+                                                      merge_time)}
+        if bloom_filter is not None:
+            crt_adb_stats['bloom_size'] = len(bloom_filter.bits)
+            crt_adb_stats['bloom_hashes_quan'] = bloom_filter.hashes_quan
+        return crt_adb_stats
+
+    def check_zip_adb(self) -> None:
+        with open(self.adb_path, mode='rb') as adb_opened_r:
+            if is_flat_adb(adb_opened_r.read(FLAT_ADB_HEAD.size)):
+                raise ValueError(f'Segments are supported only by zip indexes, {self.adb_path} is flat')
+
+    @staticmethod
+    def read_adb_ends(adb_opened_r: ZipFile) -> list:
+        return [loads(adb_opened_r.read(os.path.join(os.path.dirname(root_paths_idx_path),
+                                                     'end')))
+                for root_paths_idx_path in get_root_paths_idx_paths(adb_opened_r.namelist())
+                if os.path.join(os.path.dirname(root_paths_idx_path),
+                                'end') in adb_opened_r.NameToInfo]
+
+    def check_adb_layout(self,
+                         adb_opened_r: ZipFile) -> None:
+        for root_paths_idx_path in get_root_paths_idx_paths(adb_opened_r.namelist()):
+            paths_idx_obj = loads(adb_opened_r.read(root_paths_idx_path))
+            adb_ival_flag = len(paths_idx_obj) > 3
+            if adb_ival_flag != self.ival_flag:
+                raise ValueError(f'{root_paths_idx_path} of {self.adb_path} was created with ival_flag={adb_ival_flag}, not {self.ival_flag}')
+            meta_path = os.path.join(os.path.dirname(root_paths_idx_path),
+                                     'meta')
+            if meta_path in adb_opened_r.NameToInfo:
+                adb_key_enc = loads(adb_opened_r.read(meta_path))['key_enc']
+            else:
+                adb_key_enc = self.key_enc \
+                    and (not paths_idx_obj[0]
+                         or type(paths_idx_obj[0][0]) is bytes)
+            if adb_key_enc != self.key_enc:
+                raise ValueError(f'{root_paths_idx_path} of {self.adb_path} was created with key_enc={adb_key_enc}, not {self.key_enc}')
+            if not paths_idx_obj[1]:
+                continue
+            any_idx_path = paths_idx_obj[1][0]
+            while os.path.basename(any_idx_path) != 'lstarts':
+                any_idx_path = loads(adb_opened_r.read(any_idx_path))[1][0]
+            adb_pld_flag = len(load_any_lstarts_idx(decompress(adb_opened_r.read(any_idx_path)))) > 2 + self.ival_flag
+            if adb_pld_flag != bool(self.db_line_pld):
+                raise ValueError(f'{root_paths_idx_path} of {self.adb_path} was created {"with" if adb_pld_flag else "without"} db_line_pld')
+
+    @staticmethod
+    def read_adb_metas(adb_opened_r: ZipFile) -> list:
+        return [loads(adb_opened_r.read(os.path.join(os.path.dirname(root_paths_idx_path),
+                                                     'meta')))
+                for root_paths_idx_path in get_root_paths_idx_paths(adb_opened_r.namelist())
+                if os.path.join(os.path.dirname(root_paths_idx_path),
+                                'meta') in adb_opened_r.NameToInfo]
+
+    @count_exec_time
+    def append_db_zst(self,
+                      db_zst_end: int) -> None:
+        with open(self.db_file_path, mode='rb') as db_file_opened:
+            db_file_opened.seek(db_zst_end)
+            with SeekableZstdFile(self.db_zst_path,
+                                  mode='a',
+                                  level_or_option=self.db_compr_settings,
+                                  max_frame_content_size=self.compr_frame_size) as db_zst_opened:
+                for db_file_chunk in self.write_db_chunks(iter(partial(db_file_opened.read,
+                                                                       self.compr_chunk_size),
+                                                               b''),
+                                                          db_zst_opened,
+                                                          self.metrics):
+                    pass
+
+    def upd(self) -> None:
+        if not os.path.exists(self.db_zst_path) \
+                or not os.path.exists(self.adb_path):
+            self.idx()
+            return
+        if self.adb_fmt != 'zip':
+            raise ValueError(f'Segments are supported only by zip indexes, adb_fmt is {self.adb_fmt}')
+        self.check_zip_adb()
+        with ZipFile(self.adb_path) as adb_opened_r:
+            self.check_adb_layout(adb_opened_r)
+            segs_quan = len(get_root_paths_idx_paths(adb_opened_r.namelist())) - 1
+            adb_ends = self.read_adb_ends(adb_opened_r)
+        db_zst_end = read_seek_table(self.db_zst_path)[1][-1]
+        if adb_ends:
+            adb_end = max(adb_ends)
+        elif self.db_file_path.endswith('.zst'):
+            raise ValueError(f'{self.adb_path} does not store the indexed end of {self.db_zst_path}')
+        else:
+            adb_end = db_zst_end
+        if not self.db_file_path.endswith('.zst') \
+                and os.path.getsize(self.db_file_path) > db_zst_end:
+            self.perf.append(self.append_db_zst(db_zst_end))
+            db_zst_end = read_seek_table(self.db_zst_path)[1][-1]
+        if db_zst_end <= adb_end:
+            return
+        self.perf.append(self.presrt_idxs(adb_end,
+                                          db_zst_end))
+        self.perf.append(self.crt_adb(f'seg{segs_quan + 1}'))
+        for presrtd_idx_opened in self.presrtd_idxs_opened:
+            presrtd_idx_opened.close()
+
+    def read_adb_tree(self,
+                      adb_opened_r: ZipFile,
+                      any_idx_path: str) -> Generator:
+        if os.path.basename(any_idx_path) == 'lstarts':
+            yield from zip(*load_any_lstarts_idx(decompress(adb_opened_r.read(any_idx_path))))
+        else:
+            for chi_any_idx_path in loads(adb_opened_r.read(any_idx_path))[1]:
+                yield from self.read_adb_tree(adb_opened_r,
+                                              chi_any_idx_path)
+
+    def count_adb_tree(self,
+                       adb_opened_r: ZipFile,
+                       any_idx_path: str) -> int:
+        if os.path.basename(any_idx_path) == 'lstarts':
+            return len(load_any_lstarts_idx(decompress(adb_opened_r.read(any_idx_path)))[0])
+        paths_idx_obj = loads(adb_opened_r.read(any_idx_path))
+        if len(paths_idx_obj) > 2:
+            return sum(paths_idx_obj[2])
+        return sum(self.count_adb_tree(adb_opened_r,
+                                       chi_any_idx_path)
+                   for chi_any_idx_path in paths_idx_obj[1])
+
+    @count_exec_time
+    def cmpct_segs(self) -> dict:
+        self.check_zip_adb()
+        cmpctd_adb_path = f'{self.adb_path}.cmpct'
+        with ZipFile(self.adb_path) as adb_opened_r:
+            self.check_adb_layout(adb_opened_r)
+            root_paths_idx_paths = get_root_paths_idx_paths(adb_opened_r.namelist())
+            if len(root_paths_idx_paths) == 1:
+                return {'segs_quan': 0,
+                        'merged_vals_quan': 0}
+            if self.bloom_fpr:
+                bloom_filter = BloomFilter(*calc_bloom_params(sum(self.count_adb_tree(adb_opened_r,
+                                                                                      root_paths_idx_path)
+                                                                  for root_paths_idx_path in root_paths_idx_paths),
+                                                              self.bloom_fpr))
+            else:
+                bloom_filter = None
+            merged_vals_n_lstarts = self.merge_presrtd_idxs(bloom_filter,
+                                                            [self.read_adb_tree(adb_opened_r,
+                                                                                root_paths_idx_path)
+                                                             for root_paths_idx_path in root_paths_idx_paths])
+            merged_vals_quan = self.crt_zip_adb(merged_vals_n_lstarts,
+                                                bloom_filter,
+                                                max(self.read_adb_ends(adb_opened_r)),
+                                                cmpctd_adb_path)
+        os.replace(cmpctd_adb_path,
+                   self.adb_path)
+        return {'segs_quan': len(root_paths_idx_paths) - 1,
+                'merged_vals_quan': merged_vals_quan}
+
+    def cmpct(self,
+              bg_flag: bool = False) -> None | Thread:
+        if bg_flag:
+            cmpct_thread = Thread(target=self.cmpct)
+            cmpct_thread.start()
+            return cmpct_thread
+        self.perf.append(self.cmpct_segs())
+
+
+class MultiIdx():
+    def __init__(self,
+                 idx_objs: list[Idx]):
+        if len({idx_obj.db_zst_path
+                for idx_obj in idx_objs}) > 1:
+            raise ValueError('All indexes must be built for the same database file')
+        self.idx_objs = idx_objs
+        self.perf = []
+        self.metrics = Metrics()
+
+    def get_metrics(self) -> dict:
+        return {**self.metrics.to_dict(),
+                'perf': self.perf,
+                'idxs': {idx_obj.adb_path: idx_obj.get_metrics()
+                         for idx_obj in self.idx_objs}}
+
+    def get_metrics_json(self,
+                         **json_kwargs: Any) -> str:
+        return json.dumps(self.get_metrics(),
+                          default=str,
+                          **json_kwargs)
+
+    def get_neces_idx_objs(self) -> list[Idx]:
+        return [idx_obj
+                for idx_obj in self.idx_objs
+                if not os.path.exists(idx_obj.adb_path)]
+
+    def presrt_lines(self,
+                     db_zst_lines: Iterable) -> bool:
+        neces_idx_objs = self.get_neces_idx_objs()
+        for idx_obj in neces_idx_objs:
+            idx_obj.presrtd_idxs_opened.clear()
+            idx_obj.init_presrt_buf()
+        stop_flag = False
+        lines_quan = 0
+        for db_zst_lstart, db_zst_line in db_zst_lines:
+            if not db_zst_line:
+                stop_flag = True
+                break
+            for idx_obj in neces_idx_objs:
+                idx_obj.presrt_line(db_zst_lstart,
+                                    db_zst_line)
+            lines_quan += 1
+        for idx_obj in neces_idx_objs:
+            idx_obj.spill_presrt_buf()
+            idx_obj.metrics.incr('lines_scanned',
+                                 lines_quan)
+        self.metrics.incr('lines_scanned',
+                          lines_quan)
+        return stop_flag
+
+    @count_exec_time
+    def presrt_idxs(self) -> None:
+        self.presrt_lines(self.idx_objs[0].read_part_lines())
+
+    def idx(self) -> None:
+        neces_idx_objs = self.get_neces_idx_objs()
+        presrt_in_compr_flag = False
+        if not os.path.exists(self.idx_objs[0].db_zst_path):
+            presrt_in_compr_flag = bool(neces_idx_objs)
+            self.perf.append(self.idx_objs[0].crt_db_zst(presrt_in_compr_flag,
+                                                         self.presrt_lines))
+        if neces_idx_objs:
+            if not presrt_in_compr_flag:
+                self.perf.append(self.presrt_idxs())
+            for idx_obj in neces_idx_objs:
+                idx_obj.perf.append(idx_obj.crt_adb())
+                for presrtd_idx_opened in idx_obj.presrtd_idxs_opened:
+                    presrtd_idx_opened.close()
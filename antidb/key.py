@@ -0,0 +1,173 @@
+from typing import (Callable,
+                    Any)
+from struct import Struct
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+KEY_END = 0x10
+KEY_NUM = 0x20
+KEY_STR = 0x40
+KEY_BYTES = 0x50
+KEY_LIST = 0x60
+KEY_DELTA_ZERO = 0x80
+KEY_DOUBLE = Struct('>d')
+KEY_UINT64 = Struct('>Q')
+KEY_SIGN_BIT = 1 << 63
+KEY_UINT64_MASK = (1 << 64) - 1
+KEY_DOUBLE_MAX = 1.7976931348623157e308
+
+
+def enc_num(num: int | float,
+            key: bytearray) -> None:
+    if type(num) is float:
+        dbl = num + 0.0
+        delta = 0
+    else:
+        num = int(num)
+        try:
+            dbl = float(num)
+        except OverflowError:
+            dbl = KEY_DOUBLE_MAX if num > 0 else -KEY_DOUBLE_MAX
+        delta = num - int(dbl)
+    bits = KEY_UINT64.unpack(KEY_DOUBLE.pack(dbl))[0]
+    if bits & KEY_SIGN_BIT:
+        bits ^= KEY_UINT64_MASK
+    else:
+        bits |= KEY_SIGN_BIT
+    key.append(KEY_NUM)
+    key += KEY_UINT64.pack(bits)
+    if not delta:
+        key.append(KEY_DELTA_ZERO)
+        return
+    delta_size = (abs(delta).bit_length() + 7) // 8
+    if delta_size >= KEY_DELTA_ZERO:
+        raise ValueError(f'Integer {num} is too large to encode')
+    if delta > 0:
+        key.append(KEY_DELTA_ZERO + delta_size)
+        key += delta.to_bytes(delta_size,
+                              'big')
+    else:
+        key.append(KEY_DELTA_ZERO - delta_size)
+        key += (~-delta & ((1 << delta_size * 8) - 1)).to_bytes(delta_size,
+                                                                'big')
+
+
+def enc_val(val: Any,
+            key: bytearray) -> None:
+    if type(val) is str:
+        key.append(KEY_STR)
+        key += val.encode('utf-8',
+                          'surrogatepass').replace(b'\0', b'\0\xff')
+        key += b'\0\0'
+    elif type(val) in (list, tuple):
+        key.append(KEY_LIST)
+        for elem in val:
+            enc_val(elem,
+                    key)
+        key.append(KEY_END)
+    elif isinstance(val, (int, float)):
+        enc_num(val,
+                key)
+    elif type(val) is bytes:
+        key.append(KEY_BYTES)
+        key += val.replace(b'\0', b'\0\xff')
+        key += b'\0\0'
+    else:
+        raise TypeError(f'Key element of type {type(val).__name__} can not be encoded')
+
+
+def enc_key(val: Any) -> bytes:
+    key = bytearray()
+    enc_val(val,
+            key)
+    return bytes(key)
+
+
+def dec_escaped(key: bytes,
+                pos: int) -> tuple[bytes,
+                                   int]:
+    parts = []
+    while True:
+        zero_pos = key.index(b'\0',
+                             pos)
+        parts.append(key[pos:zero_pos])
+        if key[zero_pos + 1] != 0xff:
+            return b'\0'.join(parts), zero_pos + 2
+        pos = zero_pos + 2
+
+
+def dec_val(key: bytes,
+            pos: int) -> tuple[Any,
+                               int]:
+    tag = key[pos]
+    if tag == KEY_NUM:
+        bits = KEY_UINT64.unpack_from(key,
+                                      pos + 1)[0]
+        if bits & KEY_SIGN_BIT:
+            bits ^= KEY_SIGN_BIT
+        else:
+            bits ^= KEY_UINT64_MASK
+        dbl = KEY_DOUBLE.unpack(KEY_UINT64.pack(bits))[0]
+        delta_head = key[pos + 9]
+        delta_size = abs(delta_head - KEY_DELTA_ZERO)
+        pos += 10
+        delta = int.from_bytes(key[pos:pos + delta_size],
+                               'big')
+        if delta_head < KEY_DELTA_ZERO:
+            delta = -(~delta & ((1 << delta_size * 8) - 1))
+        pos += delta_size
+        if delta:
+            return int(dbl) + delta, pos
+        if dbl.is_integer():
+            return int(dbl), pos
+        return dbl, pos
+    elif tag == KEY_STR:
+        val, pos = dec_escaped(key,
+                               pos + 1)
+        return val.decode('utf-8',
+                          'surrogatepass'), pos
+    elif tag == KEY_BYTES:
+        return dec_escaped(key,
+                           pos + 1)
+    elif tag == KEY_LIST:
+        pos += 1
+        vals = []
+        while key[pos] != KEY_END:
+            val, pos = dec_val(key,
+                               pos)
+            vals.append(val)
+        return vals, pos + 1
+    raise ValueError(f'Unknown key tag {tag} at position {pos}')
+
+
+def dec_key(key: bytes) -> Any:
+    return dec_val(key,
+                   0)[0]
+
+
+def get_pfx_end(prepd_pfx: Any) -> Any:
+    if type(prepd_pfx) is str:
+        pfx_stem = prepd_pfx.rstrip(chr(0x10ffff))
+        if pfx_stem:
+            return pfx_stem[:-1] + chr(ord(pfx_stem[-1]) + 1)
+    elif type(prepd_pfx) is bytes:
+        pfx_stem = prepd_pfx.rstrip(b'\xff')
+        if pfx_stem:
+            return pfx_stem[:-1] + bytes([pfx_stem[-1] + 1])
+    elif type(prepd_pfx) in (list, tuple) \
+            and prepd_pfx:
+        return type(prepd_pfx)([*prepd_pfx[:-1],
+                                get_pfx_end(prepd_pfx[-1])])
+    raise ValueError(f'Prefix {prepd_pfx} must end with a non-empty string after adb_srt_rule')
+
+
+def enc_srt_rule(adb_srt_rule: Callable) -> Callable:
+    def adb_srt_rule_enc(val: Any,
+                         **adb_srt_rule_kwargs: Any) -> bytes:
+        return enc_key(adb_srt_rule(val,
+                                    **adb_srt_rule_kwargs))
+    return adb_srt_rule_enc
@@ -0,0 +1,61 @@
+from typing import (Any,
+                    Hashable)
+from collections import OrderedDict
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+
+class LruCache():
+    def __init__(self,
+                 max_size: int):
+        self.max_size = max_size
+        self.cur_size = 0
+        self.objs_n_sizes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.objs_n_sizes)
+
+    def __contains__(self,
+                     key: Hashable) -> bool:
+        return key in self.objs_n_sizes
+
+    def get(self,
+            key: Hashable) -> Any:
+        obj_n_size = self.objs_n_sizes.get(key)
+        if obj_n_size is None:
+            self.misses += 1
+            return None
+        self.objs_n_sizes.move_to_end(key)
+        self.hits += 1
+        return obj_n_size[0]
+
+    def put(self,
+            key: Hashable,
+            obj: Any,
+            obj_size: int) -> bool:
+        if obj_size > self.max_size:
+            return False
+        if key in self.objs_n_sizes:
+            self.cur_size -= self.objs_n_sizes.pop(key)[1]
+        self.objs_n_sizes[key] = [obj, obj_size]
+        self.cur_size += obj_size
+        while self.cur_size > self.max_size:
+            self.cur_size -= self.objs_n_sizes.popitem(last=False)[1][1]
+        return True
+
+    def clear(self) -> None:
+        self.objs_n_sizes.clear()
+        self.cur_size = 0
+
+    def get_stats(self) -> dict:
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'objs_quan': len(self.objs_n_sizes),
+                'cur_size': self.cur_size,
+                'max_size': self.max_size}
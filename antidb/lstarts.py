@@ -0,0 +1,164 @@
+import sys
+from os.path import commonprefix
+from array import array
+from struct import Struct
+from pickle import (dumps,
+                    loads,
+                    HIGHEST_PROTOCOL)
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+LSTARTS_IDX_MAGIC = b'ADBL'
+LSTARTS_IDX_HEAD = Struct('<4sBBQ')
+COL_HEAD = Struct('<cQ')
+
+
+def dump_col(col: tuple | list) -> tuple[bytes,
+                                         bytes]:
+    col_types = set(map(type, col))
+    if col_types == {int}:
+        try:
+            return b'q', dump_arr(array('q', col))
+        except OverflowError:
+            pass
+    elif col_types == {float}:
+        return b'd', dump_arr(array('d', col))
+    elif col_types == {str}:
+        if not any('\0' in val for val in col):
+            return b's', '\0'.join(col).encode()
+    elif col_types == {bytes}:
+        return b'b', dump_front_coded(col)
+    elif col_types == {type(None)}:
+        return b'n', b''
+    return b'p', dumps(list(col),
+                       HIGHEST_PROTOCOL)
+
+
+def dump_arr(arr: array) -> bytes:
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def dump_front_coded(col: tuple | list) -> bytes:
+    prefix_lens = array('I')
+    suffix_lens = array('I')
+    suffixes = []
+    prev_val = b''
+    for val in col:
+        prefix_len = len(commonprefix([prev_val,
+                                       val]))
+        prefix_lens.append(prefix_len)
+        suffix_lens.append(len(val) - prefix_len)
+        suffixes.append(val[prefix_len:])
+        prev_val = val
+    return dump_arr(prefix_lens) + dump_arr(suffix_lens) + b''.join(suffixes)
+
+
+def load_front_coded(col_bytes: memoryview,
+                     vals_quan: int) -> list:
+    lens_size = vals_quan * array('I').itemsize
+    prefix_lens = load_arr('I',
+                           col_bytes[:lens_size])
+    suffix_lens = load_arr('I',
+                           col_bytes[lens_size:
+                                     lens_size * 2])
+    suffixes = bytes(col_bytes[lens_size * 2:])
+    vals = []
+    val = b''
+    suffix_start = 0
+    for prefix_len, suffix_len in zip(prefix_lens,
+                                      suffix_lens):
+        val = val[:prefix_len] + suffixes[suffix_start:
+                                          suffix_start + suffix_len]
+        vals.append(val)
+        suffix_start += suffix_len
+    return vals
+
+
+def load_arr(arr_type: str,
+             arr_bytes: memoryview,
+             view_flag: bool = False) -> array | memoryview:
+    if view_flag \
+            and sys.byteorder == 'little':
+        return arr_bytes.cast(arr_type)
+    arr = array(arr_type)
+    arr.frombytes(arr_bytes)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+def load_col(col_type: bytes,
+             col_bytes: memoryview,
+             vals_quan: int,
+             view_flag: bool = False) -> array | memoryview | list:
+    if col_type in (b'q', b'd'):
+        return load_arr(col_type.decode(),
+                        col_bytes,
+                        view_flag)
+    elif col_type == b's':
+        if not vals_quan:
+            return []
+        return str(col_bytes, 'utf-8').split('\0')
+    elif col_type == b'b':
+        return load_front_coded(col_bytes,
+                                vals_quan)
+    elif col_type == b'n':
+        return [None] * vals_quan
+    return loads(col_bytes)
+
+
+def zip_cols(vals_n_lstarts: list) -> list:
+    rows_lens = set(map(len,
+                        vals_n_lstarts))
+    if len(rows_lens) > 1:
+        raise ValueError(f'Rows of different widths {sorted(rows_lens)} can not be stored in one index file')
+    return list(zip(*vals_n_lstarts))
+
+
+def dump_lstarts_idx(vals_n_lstarts: list) -> bytes:
+    cols = zip_cols(vals_n_lstarts)
+    lstarts_idx = [LSTARTS_IDX_HEAD.pack(LSTARTS_IDX_MAGIC,
+                                         2,
+                                         len(cols),
+                                         len(vals_n_lstarts))]
+    for col in cols:
+        col_type, col_bytes = dump_col(col)
+        lstarts_idx.append(COL_HEAD.pack(col_type,
+                                         len(col_bytes)))
+        lstarts_idx.append(col_bytes)
+    return b''.join(lstarts_idx)
+
+
+def is_compact(lstarts_idx: bytes) -> bool:
+    return lstarts_idx.startswith(LSTARTS_IDX_MAGIC)
+
+
+def load_lstarts_idx(lstarts_idx: bytes,
+                     view_flag: bool = False) -> list:
+    lstarts_idx_view = memoryview(lstarts_idx)
+    magic, fmt_ver, cols_quan, vals_quan = LSTARTS_IDX_HEAD.unpack_from(lstarts_idx_view)
+    col_start = LSTARTS_IDX_HEAD.size
+    cols = []
+    for col_num in range(cols_quan):
+        col_type, col_size = COL_HEAD.unpack_from(lstarts_idx_view,
+                                                  col_start)
+        col_start += COL_HEAD.size
+        cols.append(load_col(col_type,
+                             lstarts_idx_view[col_start:
+                                              col_start + col_size],
+                             vals_quan,
+                             view_flag))
+        col_start += col_size
+    return cols
+
+
+def load_any_lstarts_idx(lstarts_idx: bytes) -> list:
+    if is_compact(lstarts_idx):
+        return load_lstarts_idx(lstarts_idx)
+    return loads(lstarts_idx)
@@ -0,0 +1,81 @@
+from typing import (Any,
+                    Callable)
+from collections import defaultdict
+from time import perf_counter_ns
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+
+class Metrics():
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.timers = {}
+        self.trace_funcs = []
+
+    def incr(self,
+             counter_name: str,
+             val: int = 1) -> None:
+        self.counters[counter_name] += val
+
+    def add_time(self,
+                 timer_name: str,
+                 exec_time_ns: int) -> None:
+        timer = self.timers.setdefault(timer_name,
+                                       [0, 0])
+        timer[0] += 1
+        timer[1] += exec_time_ns
+
+    def add_trace_func(self,
+                       trace_func: Callable) -> None:
+        self.trace_funcs.append(trace_func)
+
+    def del_trace_func(self,
+                       trace_func: Callable) -> None:
+        self.trace_funcs.remove(trace_func)
+
+    def start_span(self) -> tuple[int,
+                                  None | dict]:
+        if self.trace_funcs:
+            return perf_counter_ns(), dict(self.counters)
+        return perf_counter_ns(), None
+
+    def end_span(self,
+                 span: tuple[int,
+                             None | dict],
+                 span_name: str,
+                 **span_attrs: Any) -> None:
+        exec_time_ns = perf_counter_ns() - span[0]
+        timer = self.timers.get(span_name)
+        if timer is None:
+            timer = self.timers[span_name] = [0, 0]
+        timer[0] += 1
+        timer[1] += exec_time_ns
+        span_start_counters = span[1]
+        if span_start_counters is None:
+            return
+        span_attrs['time_ns'] = exec_time_ns
+        span_attrs['counters'] = {counter_name: counter_val - span_start_counters.get(counter_name, 0)
+                                  for counter_name, counter_val in self.counters.items()
+                                  if counter_val != span_start_counters.get(counter_name, 0)}
+        for trace_func in self.trace_funcs:
+            trace_func(span_name,
+                       span_attrs)
+
+    def merge_counters(self,
+                       counters: dict) -> None:
+        for counter_name, counter_val in counters.items():
+            self.counters[counter_name] += counter_val
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.timers.clear()
+
+    def to_dict(self) -> dict:
+        return {'counters': dict(self.counters),
+                'timers': {timer_name: {'calls': calls_quan,
+                                        'total_ns': total_ns}
+                           for timer_name, (calls_quan, total_ns) in self.timers.items()}}
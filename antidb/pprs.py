@@ -0,0 +1,186 @@
+# autopep8: off
+import sys; sys.dont_write_bytecode = True
+# autopep8: on
+import os
+from typing import (Callable,
+                    Any,
+                    Generator,
+                    Iterable)
+from itertools import islice
+from operator import itemgetter
+from heapq import merge
+from collections import deque
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from .prs import Prs
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+
+def init_prs_worker(prs_kwargs: dict) -> None:
+    global prs_worker_obj
+    prs_worker_obj = Prs(**prs_kwargs)
+
+
+def eq_in_worker(queries: list) -> list[str]:
+    return list(prs_worker_obj.eq(*queries))
+
+
+def eq_batch_in_worker(queries: list) -> list[tuple]:
+    return list(prs_worker_obj.eq_batch(queries))
+
+
+def rng_in_worker(prepd_query_bords: list[Any,
+                                          Any],
+                  neces_lstarts_idx_paths: list[str],
+                  lines_flag: bool) -> list[tuple]:
+    vals_n_lstarts = []
+    for neces_lstarts_idx_path in neces_lstarts_idx_paths:
+        lstarts_idx_slc = prs_worker_obj.slc_lstarts_idx(prepd_query_bords,
+                                                         neces_lstarts_idx_path)
+        if lstarts_idx_slc is None:
+            continue
+        neces_lstarts_idx_obj, start_lstart_ind, end_lstart_ind = lstarts_idx_slc
+        vals_n_lstarts.extend(zip(neces_lstarts_idx_obj[0][start_lstart_ind:
+                                                           end_lstart_ind],
+                                  neces_lstarts_idx_obj[1][start_lstart_ind:
+                                                           end_lstart_ind]))
+    if not lines_flag:
+        return vals_n_lstarts
+    lines_by_lstarts = dict(prs_worker_obj.read_srtd_lines(sorted(set(map(itemgetter(1),
+                                                                          vals_n_lstarts)))))
+    return [(val, lines_by_lstarts[lstart])
+            for val, lstart in vals_n_lstarts]
+
+
+def split_into_chunks(any_iter: Iterable,
+                      chunk_len: int) -> Generator:
+    any_iter = iter(any_iter)
+    while chunk := list(islice(any_iter,
+                               chunk_len)):
+        yield chunk
+
+
+class ParPrs(Prs):
+    def __init__(self,
+                 db_file_path: str,
+                 adb_name_prefix: str,
+                 adb_srt_rule: Callable | str,
+                 adb_srt_rule_kwargs: None | dict = None,
+                 cache_size: int | str = '64M',
+                 cache_warm_lvls: int = 0,
+                 frame_cache_size: int | str = '32M',
+                 key_enc: bool = False,
+                 procs: int | None = None,
+                 queries_chunk_len: int = 10000,
+                 lstarts_idxs_chunk_len: int = 8,
+                 mp_start_method: str = 'fork'):
+        self.prs_kwargs = {'db_file_path': db_file_path,
+                           'adb_name_prefix': adb_name_prefix,
+                           'adb_srt_rule': adb_srt_rule,
+                           'adb_srt_rule_kwargs': adb_srt_rule_kwargs,
+                           'cache_size': cache_size,
+                           'cache_warm_lvls': cache_warm_lvls,
+                           'frame_cache_size': frame_cache_size,
+                           'key_enc': key_enc}
+        super().__init__(**self.prs_kwargs)
+        self.procs = procs or os.cpu_count()
+        self.queries_chunk_len = queries_chunk_len
+        self.lstarts_idxs_chunk_len = lstarts_idxs_chunk_len
+        self.mp_start_method = mp_start_method
+        self.executor = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.procs,
+                                                mp_context=get_context(self.mp_start_method),
+                                                initializer=init_prs_worker,
+                                                initargs=(self.prs_kwargs,))
+        return self.executor
+
+    def run_chunks(self,
+                   worker_func: Callable,
+                   args_chunks: Iterable) -> Generator:
+        executor = self.get_executor()
+        futures = deque()
+        for args_chunk in args_chunks:
+            futures.append(executor.submit(worker_func,
+                                           *args_chunk))
+            if len(futures) >= self.procs * 2:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+    def eq(self,
+           *queries: Any) -> Generator:
+        for lines in self.run_chunks(eq_in_worker,
+                                     ([queries_chunk]
+                                      for queries_chunk in split_into_chunks(queries,
+                                                                             self.queries_chunk_len))):
+            yield from lines
+
+    def eq_batch(self,
+                 queries: Iterable,
+                 ordr: str = 'input') -> Generator:
+        if ordr != 'input':
+            raise ValueError(f"ordr must be 'input', not {ordr}")
+        for queries_n_lines in self.run_chunks(eq_batch_in_worker,
+                                               ([queries_chunk]
+                                                for queries_chunk in split_into_chunks(queries,
+                                                                                       self.queries_chunk_len))):
+            yield from queries_n_lines
+
+    def rng_in_tree(self,
+                    prepd_query_bords: list[Any,
+                                            Any],
+                    lines_flag: bool,
+                    root_paths_idx_path: str = 'paths') -> Generator:
+        for vals_n_rows in self.run_chunks(rng_in_worker,
+                                           ([prepd_query_bords,
+                                             neces_lstarts_idx_paths,
+                                             lines_flag]
+                                            for neces_lstarts_idx_paths in split_into_chunks(self.walk_dir_tree(prepd_query_bords,
+                                                                                                                root_paths_idx_path),
+                                                                                             self.lstarts_idxs_chunk_len))):
+            yield from vals_n_rows
+
+    def rng_vals_n_rows(self,
+                        query_start: Any,
+                        query_end: Any,
+                        lines_flag: bool) -> Generator:
+        prepd_query_bords = self.prep_query(query_start,
+                                            query_end)
+        if len(self.root_paths_idx_paths) == 1:
+            return self.rng_in_tree(prepd_query_bords,
+                                    lines_flag)
+        return merge(*[self.rng_in_tree(prepd_query_bords,
+                                        lines_flag,
+                                        root_paths_idx_path)
+                       for root_paths_idx_path in self.root_paths_idx_paths],
+                     key=itemgetter(0))
+
+    def rng(self,
+            query_start: Any,
+            query_end: Any) -> Generator:
+        for val, line in self.rng_vals_n_rows(query_start,
+                                              query_end,
+                                              True):
+            yield line
+
+    def rng_lstarts(self,
+                    query_start: Any,
+                    query_end: Any) -> Generator:
+        for val, lstart in self.rng_vals_n_rows(query_start,
+                                                query_end,
+                                                False):
+            yield lstart
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        super().close()
@@ -4,17 +4,50 @@ import sys; sys.dont_write_bytecode = True
 import os
 from typing import (Callable,
                     Any,
-                    Generator)
+                    Generator,
+                    Iterable)
 from zipfile import ZipFile
-from pickle import load
-from io import TextIOWrapper
+from mmap import (mmap,
+                  ACCESS_READ)
+from pickle import (dump,
+                    loads,
+                    HIGHEST_PROTOCOL)
+from tempfile import TemporaryFile
 from math import inf
 from bisect import (bisect_left,
                     bisect_right)
-from .idx import Idx
-from .err import QueryStartGtEndError
-from pyzstd import (SeekableZstdFile,
-                    ZstdFile)
+from array import array
+from operator import itemgetter
+from itertools import (groupby,
+                       islice,
+                       chain,
+                       takewhile)
+from heapq import merge
+from .idx import (Idx,
+                  parse_size,
+                  estim_obj_size,
+                  call_wo_gc,
+                  get_root_paths_idx_paths)
+from .lru import LruCache
+from .bloom import load_bloom
+from .key import (enc_key,
+                  dec_key,
+                  enc_srt_rule,
+                  get_pfx_end)
+from .flat import (FLAT_ADB_HEAD,
+                   is_flat_adb,
+                   load_flat_adb_head)
+from .zst import read_seek_table
+from .err import (QueryStartGtEndError,
+                  NoPldsError,
+                  NoIvalsError)
+from .lstarts import (load_lstarts_idx,
+                      load_any_lstarts_idx)
+from pyzstd import decompress
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 if __name__ == 'main':
     __version__ = 'v6.1.0'
@@ -27,15 +60,134 @@ class Prs(Idx):
     def __init__(self,
                  db_file_path: str,
                  adb_name_prefix: str,
-                 adb_srt_rule: Callable,
-                 adb_srt_rule_kwargs: None | dict = None):
+                 adb_srt_rule: Callable | str,
+                 adb_srt_rule_kwargs: None | dict = None,
+                 cache_size: int | str = '64M',
+                 cache_warm_lvls: int = 0,
+                 frame_cache_size: int | str = '32M',
+                 key_enc: bool = False):
         super().__init__(db_file_path=db_file_path,
                          adb_name_prefix=adb_name_prefix,
                          db_line_prs=None,
                          adb_srt_rule=adb_srt_rule,
-                         adb_srt_rule_kwargs=adb_srt_rule_kwargs)
-        self.adb_opened_r = ZipFile(self.adb_path)
-        self.db_zst_opened_r = TextIOWrapper(SeekableZstdFile(self.db_zst_path))
+                         adb_srt_rule_kwargs=adb_srt_rule_kwargs,
+                         key_enc=key_enc)
+        with open(self.adb_path, mode='rb') as adb_opened_r:
+            adb_start = adb_opened_r.read(FLAT_ADB_HEAD.size)
+        if is_flat_adb(adb_start):
+            self.adb_opened_r = None
+            with open(self.adb_path, mode='rb') as adb_opened_r:
+                self.adb_mmap = mmap(adb_opened_r.fileno(),
+                                     0,
+                                     access=ACCESS_READ)
+        else:
+            self.adb_opened_r = ZipFile(self.adb_path)
+            self.adb_mmap = None
+        self.db_zst_opened_r = None
+        self.frame_c_starts = self.frame_d_starts = None
+        self.frame_cache = LruCache(parse_size(frame_cache_size))
+        self.adb_cache = LruCache(parse_size(cache_size))
+        if self.adb_mmap is not None:
+            self.read_flat_adb_head()
+        else:
+            self.read_zip_adb_roots()
+        if self.adb_key_enc is not None \
+                and self.adb_key_enc != self.key_enc:
+            self.key_enc = self.adb_key_enc
+            if self.key_enc:
+                self.adb_srt_rule = enc_srt_rule(self.src_adb_srt_rule)
+            else:
+                self.adb_srt_rule = self.src_adb_srt_rule
+        self.root_paths_idx_obj = self.root_paths_idx_objs['paths']
+        self.ival_flag = len(self.root_paths_idx_obj) > 3
+        self.pld_col_ind = 3 if self.ival_flag else 2
+        self.bloom_filter = self.bloom_filters.get('paths')
+        if cache_warm_lvls > 1:
+            self.warm_cache(cache_warm_lvls)
+
+    def close(self) -> None:
+        if self.adb_opened_r is not None:
+            self.adb_opened_r.close()
+        if self.adb_mmap is not None:
+            self.adb_cache.clear()
+            try:
+                self.adb_mmap.close()
+            except BufferError:
+                pass
+        if self.db_zst_opened_r is not None:
+            self.db_zst_opened_r.close()
+            self.db_zst_opened_r = None
+
+    def get_metrics(self) -> dict:
+        prs_metrics = super().get_metrics()
+        prs_metrics['adb_cache'] = self.adb_cache.get_stats()
+        prs_metrics['frame_cache'] = self.frame_cache.get_stats()
+        prs_metrics['bloom_filters'] = {root_paths_idx_path: bloom_filter.get_stats()
+                                        for root_paths_idx_path, bloom_filter in self.bloom_filters.items()}
+        return prs_metrics
+
+    def read_flat_adb_head(self) -> None:
+        fences_start, fences_size, bloom_start, bloom_size, self.adb_key_enc = load_flat_adb_head(self.adb_mmap)
+        fences_cols = load_lstarts_idx(self.adb_mmap[fences_start:
+                                                     fences_start + fences_size])
+        if not fences_cols:
+            fences_cols = [[], [], [], []]
+        fences, self.flat_blk_starts, self.flat_blk_sizes, blk_lens = fences_cols[:4]
+        self.root_paths_idx_paths = ['paths']
+        self.root_paths_idx_objs = {'paths': [fences,
+                                              [f'{blk_ind}/lstarts'
+                                               for blk_ind in range(len(fences))],
+                                              blk_lens] + fences_cols[4:]}
+        self.bloom_filters = {}
+        if bloom_size:
+            self.bloom_filters['paths'] = load_bloom(self.adb_mmap[bloom_start:
+                                                                   bloom_start + bloom_size])
+
+    def read_zip_adb_roots(self) -> None:
+        self.root_paths_idx_paths = get_root_paths_idx_paths(self.adb_opened_r.namelist())
+        self.root_paths_idx_objs = {}
+        self.bloom_filters = {}
+        for root_paths_idx_path in self.root_paths_idx_paths:
+            self.root_paths_idx_objs[root_paths_idx_path] = loads(self.adb_opened_r.read(root_paths_idx_path))
+            bloom_path = os.path.join(os.path.dirname(root_paths_idx_path),
+                                      'bloom')
+            if bloom_path in self.adb_opened_r.NameToInfo:
+                self.bloom_filters[root_paths_idx_path] = load_bloom(self.adb_opened_r.read(bloom_path))
+        adb_metas = self.read_adb_metas(self.adb_opened_r)
+        self.adb_key_enc = adb_metas[0]['key_enc'] if adb_metas else None
+
+    def warm_cache(self,
+                   cache_warm_lvls: int) -> None:
+        lvl_any_idx_paths = [chi_any_idx_path
+                             for root_paths_idx_path in self.root_paths_idx_paths
+                             for chi_any_idx_path in self.root_paths_idx_objs[root_paths_idx_path][1]]
+        for lvl_num in range(2, cache_warm_lvls + 1):
+            chi_any_idx_paths = []
+            for any_idx_path in lvl_any_idx_paths:
+                if self.adb_cache.cur_size >= self.adb_cache.max_size:
+                    return
+                if os.path.basename(any_idx_path) == 'lstarts':
+                    self.read_lstarts_idx(any_idx_path)
+                else:
+                    chi_any_idx_paths += self.read_paths_idx(any_idx_path)[1]
+            lvl_any_idx_paths = chi_any_idx_paths
+
+    def read_paths_idx(self,
+                       paths_idx_path: str) -> list:
+        if paths_idx_path in self.root_paths_idx_objs:
+            return self.root_paths_idx_objs[paths_idx_path]
+        paths_idx_obj = self.adb_cache.get(paths_idx_path)
+        if paths_idx_obj is None:
+            paths_idx = self.adb_opened_r.read(paths_idx_path)
+            paths_idx_obj = call_wo_gc(loads,
+                                       paths_idx)
+            self.metrics.incr('nodes_loaded')
+            self.metrics.incr('adb_bytes_read',
+                              len(paths_idx))
+            self.adb_cache.put(paths_idx_path,
+                               paths_idx_obj,
+                               estim_obj_size(paths_idx_obj))
+        return paths_idx_obj
 
     def prep_query(self,
                    query_start: Any,
@@ -61,8 +213,7 @@ class Prs(Idx):
         if os.path.basename(any_idx_path) == 'lstarts':
             yield any_idx_path
         else:
-            with self.adb_opened_r.open(any_idx_path) as paths_idx_opened:
-                paths_idx_obj = load(paths_idx_opened)
+            paths_idx_obj = self.read_paths_idx(any_idx_path)
             start_gchi_any_idx_ind = bisect_left(paths_idx_obj[0],
                                                  prepd_query_bords[0]) - 1
             if start_gchi_any_idx_ind < 0:
@@ -78,54 +229,703 @@ class Prs(Idx):
 
     def read_lstarts_idx(self,
                          lstarts_idx_path: str) -> list:
-        with ZstdFile(self.adb_opened_r.
-                      open(lstarts_idx_path)) as lstarts_idx_opened:
-            lstarts_idx = load(lstarts_idx_opened)
-            return lstarts_idx
+        lstarts_idx_obj = self.adb_cache.get(lstarts_idx_path)
+        if lstarts_idx_obj is None \
+                and self.adb_mmap is not None:
+            blk_ind = int(os.path.dirname(lstarts_idx_path))
+            blk_start = self.flat_blk_starts[blk_ind]
+            lstarts_idx_obj = load_lstarts_idx(memoryview(self.adb_mmap)[blk_start:
+                                                                         blk_start + self.flat_blk_sizes[blk_ind]],
+                                               view_flag=True)
+            self.adb_cache.put(lstarts_idx_path,
+                               lstarts_idx_obj,
+                               estim_obj_size(lstarts_idx_obj))
+            self.metrics.incr('leaves_loaded')
+            self.metrics.incr('adb_bytes_read',
+                              self.flat_blk_sizes[blk_ind])
+        elif lstarts_idx_obj is None:
+            compr_lstarts_idx = self.adb_opened_r.read(lstarts_idx_path)
+            lstarts_idx = decompress(compr_lstarts_idx)
+            lstarts_idx_obj = call_wo_gc(load_any_lstarts_idx,
+                                         lstarts_idx)
+            self.metrics.incr('leaves_loaded')
+            self.metrics.incr('adb_bytes_read',
+                              len(compr_lstarts_idx))
+            self.metrics.incr('adb_bytes_decompressed',
+                              len(lstarts_idx))
+            self.adb_cache.put(lstarts_idx_path,
+                               lstarts_idx_obj,
+                               estim_obj_size(lstarts_idx_obj))
+        return lstarts_idx_obj
+
+    def walk_dir_tree_batch(self,
+                            prepd_queries: list,
+                            lo: int,
+                            hi: int,
+                            any_idx_path: str = 'paths') -> Generator:
+        if os.path.basename(any_idx_path) == 'lstarts':
+            yield any_idx_path, lo, hi
+            return
+        paths_idx_obj = self.read_paths_idx(any_idx_path)
+        gchi_any_idxs_quan = len(paths_idx_obj[0])
+        neces_gchi_any_idx_inds = []
+        for prepd_query_ind in range(lo, hi):
+            start_gchi_any_idx_ind = bisect_left(paths_idx_obj[0],
+                                                 prepd_queries[prepd_query_ind]) - 1
+            if neces_gchi_any_idx_inds \
+                    and start_gchi_any_idx_ind <= neces_gchi_any_idx_inds[-1]:
+                start_gchi_any_idx_ind = neces_gchi_any_idx_inds[-1] + 1
+            elif start_gchi_any_idx_ind < 0:
+                start_gchi_any_idx_ind = 0
+            end_gchi_any_idx_ind = bisect_right(paths_idx_obj[0],
+                                                prepd_queries[prepd_query_ind]) - 1
+            neces_gchi_any_idx_inds.extend(range(start_gchi_any_idx_ind,
+                                                 end_gchi_any_idx_ind + 1))
+        for gchi_any_idx_ind in neces_gchi_any_idx_inds:
+            gchi_lo = bisect_left(prepd_queries,
+                                  paths_idx_obj[0][gchi_any_idx_ind],
+                                  lo,
+                                  hi)
+            if gchi_any_idx_ind + 1 < gchi_any_idxs_quan:
+                gchi_hi = bisect_right(prepd_queries,
+                                       paths_idx_obj[0][gchi_any_idx_ind + 1],
+                                       lo,
+                                       hi)
+            else:
+                gchi_hi = hi
+            if gchi_lo < gchi_hi:
+                yield from self.walk_dir_tree_batch(prepd_queries,
+                                                    gchi_lo,
+                                                    gchi_hi,
+                                                    paths_idx_obj[1][gchi_any_idx_ind])
+
+    @staticmethod
+    def find_lstart_inds_batch(lstarts_idx_vals: Any,
+                               prepd_queries: list,
+                               lo: int,
+                               hi: int) -> Generator:
+        if numpy \
+                and (type(lstarts_idx_vals) is array
+                     and lstarts_idx_vals.typecode == 'q'
+                     or type(lstarts_idx_vals) is memoryview
+                     and lstarts_idx_vals.format == 'q') \
+                and all(type(prepd_query) is int
+                        for prepd_query in prepd_queries[lo:hi]):
+            lstarts_idx_vals_np = numpy.frombuffer(lstarts_idx_vals,
+                                                   dtype=numpy.int64)
+            try:
+                prepd_queries_np = numpy.array(prepd_queries[lo:hi],
+                                               dtype=numpy.int64)
+            except OverflowError:
+                prepd_queries_np = None
+            if prepd_queries_np is not None:
+                start_lstart_inds = numpy.searchsorted(lstarts_idx_vals_np,
+                                                       prepd_queries_np,
+                                                       side='left')
+                end_lstart_inds = numpy.searchsorted(lstarts_idx_vals_np,
+                                                     prepd_queries_np,
+                                                     side='right')
+                for prepd_query_ind in numpy.flatnonzero(end_lstart_inds >
+                                                         start_lstart_inds).tolist():
+                    yield (lo + prepd_query_ind,
+                           int(start_lstart_inds[prepd_query_ind]),
+                           int(end_lstart_inds[prepd_query_ind]))
+                return
+        start_lstart_ind = end_lstart_ind = 0
+        for prepd_query_ind in range(lo, hi):
+            if prepd_query_ind == lo \
+                    or prepd_queries[prepd_query_ind] != prepd_queries[prepd_query_ind - 1]:
+                start_lstart_ind = bisect_left(lstarts_idx_vals,
+                                               prepd_queries[prepd_query_ind],
+                                               end_lstart_ind)
+                end_lstart_ind = bisect_right(lstarts_idx_vals,
+                                              prepd_queries[prepd_query_ind],
+                                              start_lstart_ind)
+            if start_lstart_ind < end_lstart_ind:
+                yield prepd_query_ind, start_lstart_ind, end_lstart_ind
+
+    def eq_lstarts_batch(self,
+                         queries: list) -> Generator:
+        prepd_queries_n_inds = sorted([[self.adb_srt_rule(query,
+                                                          **self.adb_srt_rule_kwargs),
+                                        query_ind]
+                                       for query_ind, query in enumerate(queries)],
+                                      key=itemgetter(0))
+        for root_paths_idx_path in self.root_paths_idx_paths:
+            yield from self.eq_lstarts_batch_in_tree(prepd_queries_n_inds,
+                                                     root_paths_idx_path)
+
+    def eq_lstarts_batch_in_tree(self,
+                                 prepd_queries_n_inds: list,
+                                 root_paths_idx_path: str = 'paths') -> Generator:
+        bloom_filter = self.bloom_filters.get(root_paths_idx_path)
+        if bloom_filter is not None:
+            prepd_queries_quan = len(prepd_queries_n_inds)
+            prepd_queries_n_inds = [prepd_query_n_ind
+                                    for prepd_query_n_ind in prepd_queries_n_inds
+                                    if prepd_query_n_ind[0] in bloom_filter]
+            bloom_filter.rejects += prepd_queries_quan - len(prepd_queries_n_inds)
+            found_query_inds = set()
+        prepd_queries = list(map(itemgetter(0),
+                                 prepd_queries_n_inds))
+        for neces_lstarts_idx_path, lo, hi in self.walk_dir_tree_batch(prepd_queries,
+                                                                       0,
+                                                                       len(prepd_queries),
+                                                                       root_paths_idx_path):
+            neces_lstarts_idx_obj = self.read_lstarts_idx(neces_lstarts_idx_path)
+            for prepd_query_ind, start_lstart_ind, end_lstart_ind in self.find_lstart_inds_batch(neces_lstarts_idx_obj[0],
+                                                                                                 prepd_queries,
+                                                                                                 lo,
+                                                                                                 hi):
+                query_ind = prepd_queries_n_inds[prepd_query_ind][1]
+                if bloom_filter is not None:
+                    found_query_inds.add(query_ind)
+                for lstart_ind in range(start_lstart_ind,
+                                        end_lstart_ind):
+                    yield query_ind, neces_lstarts_idx_obj[1][lstart_ind]
+        if bloom_filter is not None:
+            bloom_filter.fps += len(prepd_queries_n_inds) - len(found_query_inds)
+
+    def eq_batch(self,
+                 queries: Iterable,
+                 ordr: str = 'input') -> Generator:
+        queries = list(queries)
+        span = self.metrics.start_span()
+        if ordr == 'fetch':
+            for query_ind, lstart in self.eq_lstarts_batch(queries):
+                yield queries[query_ind], self.read_line(lstart)
+        elif ordr == 'input':
+            lstarts_by_queries = [[] for query in queries]
+            for query_ind, lstart in self.eq_lstarts_batch(queries):
+                lstarts_by_queries[query_ind].append(lstart)
+            for query_ind, lstarts in enumerate(lstarts_by_queries):
+                for lstart in lstarts:
+                    yield queries[query_ind], self.read_line(lstart)
+        else:
+            raise ValueError(f"ordr must be 'input' or 'fetch', not {ordr}")
+        self.metrics.end_span(span,
+                              'eq_batch',
+                              queries_quan=len(queries))
+
+    def spill_join_recs(self,
+                        prepd_keys_n_recs: list) -> TemporaryFile:
+        prepd_keys_n_recs.sort(key=itemgetter(0))
+        join_run_opened = TemporaryFile(dir=self.temp_dir_path)
+        blk_starts = range(0,
+                           len(prepd_keys_n_recs),
+                           self.presrt_blk_len)
+        dump([len(blk_starts),
+              len(prepd_keys_n_recs)],
+             join_run_opened)
+        for blk_start in blk_starts:
+            dump(prepd_keys_n_recs[blk_start:
+                                   blk_start + self.presrt_blk_len],
+                 join_run_opened,
+                 HIGHEST_PROTOCOL)
+        join_run_opened.seek(0)
+        return join_run_opened
+
+    def srt_join_recs(self,
+                      recs: Iterable,
+                      rec_key: Callable,
+                      recs_chunk_len: int) -> Generator:
+        recs = iter(recs)
+        join_runs_opened = []
+        try:
+            while prepd_keys_n_recs := [[self.adb_srt_rule(rec_key(rec),
+                                                           **self.adb_srt_rule_kwargs),
+                                         rec]
+                                        for rec in islice(recs,
+                                                          recs_chunk_len)]:
+                if not join_runs_opened \
+                        and len(prepd_keys_n_recs) < recs_chunk_len:
+                    prepd_keys_n_recs.sort(key=itemgetter(0))
+                    yield from prepd_keys_n_recs
+                    return
+                join_runs_opened.append(self.spill_join_recs(prepd_keys_n_recs))
+            yield from merge(*map(self.read_presrtd_idx,
+                                  join_runs_opened),
+                             key=itemgetter(0))
+        finally:
+            for join_run_opened in join_runs_opened:
+                join_run_opened.close()
+
+    @staticmethod
+    def get_rec_as_key(rec: Any) -> Any:
+        return rec
+
+    def join(self,
+             recs: Iterable,
+             rec_key: None | Callable = None,
+             srtd_flag: bool = False,
+             recs_chunk_len: int = 100000) -> Generator:
+        if rec_key is None:
+            rec_key = self.get_rec_as_key
+        if srtd_flag:
+            prepd_keys_n_recs = ([self.adb_srt_rule(rec_key(rec),
+                                                    **self.adb_srt_rule_kwargs),
+                                  rec]
+                                 for rec in recs)
+        else:
+            prepd_keys_n_recs = self.srt_join_recs(recs,
+                                                   rec_key,
+                                                   recs_chunk_len)
+        while prepd_keys_n_recs_chunk := list(islice(prepd_keys_n_recs,
+                                                     recs_chunk_len)):
+            if srtd_flag:
+                prepd_keys_n_recs_chunk.sort(key=itemgetter(0))
+            prepd_queries_n_inds = [[prepd_key_n_rec[0], rec_ind]
+                                    for rec_ind, prepd_key_n_rec in enumerate(prepd_keys_n_recs_chunk)]
+            lstarts_by_recs = [[] for prepd_key_n_rec in prepd_keys_n_recs_chunk]
+            for root_paths_idx_path in self.root_paths_idx_paths:
+                for rec_ind, lstart in self.eq_lstarts_batch_in_tree(prepd_queries_n_inds,
+                                                                     root_paths_idx_path):
+                    lstarts_by_recs[rec_ind].append(lstart)
+            lines_by_lstarts = dict(self.read_srtd_lines(sorted(set(chain.from_iterable(lstarts_by_recs)))))
+            for prepd_key_n_rec, lstarts in zip(prepd_keys_n_recs_chunk,
+                                                lstarts_by_recs):
+                if not lstarts:
+                    yield prepd_key_n_rec[1], None
+                for lstart in lstarts:
+                    yield prepd_key_n_rec[1], lines_by_lstarts[lstart]
+
+    def open_db_zst(self) -> None:
+        if self.db_zst_opened_r is None:
+            self.frame_c_starts, self.frame_d_starts = read_seek_table(self.db_zst_path)
+            self.db_zst_opened_r = open(self.db_zst_path, mode='rb')
+
+    def read_frame(self,
+                   frame_ind: int) -> bytes:
+        frame = self.frame_cache.get(frame_ind)
+        self.metrics.counters['frames_touched'] += 1
+        if frame is None:
+            self.db_zst_opened_r.seek(self.frame_c_starts[frame_ind])
+            frame = decompress(self.db_zst_opened_r.read(self.frame_c_starts[frame_ind + 1] -
+                                                         self.frame_c_starts[frame_ind]))
+            self.metrics.incr('frames_decompressed')
+            self.metrics.incr('bytes_decompressed',
+                              len(frame))
+            self.frame_cache.put(frame_ind,
+                                 frame,
+                                 len(frame))
+        return frame
+
+    def cut_line(self,
+                 lstart: int,
+                 frame_ind: int,
+                 frame: bytes) -> tuple[str,
+                                        int,
+                                        bytes]:
+        lstart_in_frame = lstart - self.frame_d_starts[frame_ind]
+        lend_in_frame = frame.find(b'\n',
+                                   lstart_in_frame)
+        if lend_in_frame != -1:
+            line = frame[lstart_in_frame:
+                         lend_in_frame + 1]
+        else:
+            line_parts = [frame[lstart_in_frame:]]
+            while frame_ind + 2 < len(self.frame_d_starts):
+                frame_ind += 1
+                frame = self.read_frame(frame_ind)
+                lend_in_frame = frame.find(b'\n')
+                if lend_in_frame != -1:
+                    line_parts.append(frame[:lend_in_frame + 1])
+                    break
+                line_parts.append(frame)
+            line = b''.join(line_parts)
+        if line.endswith(b'\r\n'):
+            line = line[:-2] + b'\n'
+        return line.decode(self.db_enc), frame_ind, frame
+
+    def read_line(self,
+                  lstart: int) -> str:
+        self.open_db_zst()
+        self.metrics.counters['seeks'] += 1
+        frame_ind = bisect_right(self.frame_d_starts,
+                                 lstart) - 1
+        if frame_ind >= len(self.frame_d_starts) - 1:
+            return ''
+        self.metrics.counters['lines_returned'] += 1
+        return self.cut_line(lstart,
+                             frame_ind,
+                             self.read_frame(frame_ind))[0]
+
+    def read_srtd_lines(self,
+                        srtd_lstarts: Iterable) -> Generator:
+        self.open_db_zst()
+        frames_quan = len(self.frame_d_starts) - 1
+        frame_ind, frame = -1, None
+        for lstart in srtd_lstarts:
+            if frame is None \
+                    or lstart >= self.frame_d_starts[frame_ind + 1]:
+                self.metrics.counters['seeks'] += 1
+                frame_ind = bisect_right(self.frame_d_starts,
+                                         lstart,
+                                         max(frame_ind, 0)) - 1
+                if frame_ind >= frames_quan:
+                    yield lstart, ''
+                    continue
+                frame = self.read_frame(frame_ind)
+            line, frame_ind, frame = self.cut_line(lstart,
+                                                   frame_ind,
+                                                   frame)
+            self.metrics.counters['lines_returned'] += 1
+            yield lstart, line
+
+    def fetch(self,
+              lstarts: Iterable,
+              ordr: str = 'file') -> Generator:
+        if ordr == 'file':
+            for lstart, line in self.read_srtd_lines(sorted(set(lstarts))):
+                yield line
+        elif ordr == 'key':
+            lstarts = list(dict.fromkeys(lstarts))
+            lines_by_lstarts = dict(self.read_srtd_lines(sorted(lstarts)))
+            for lstart in lstarts:
+                yield lines_by_lstarts[lstart]
+        else:
+            raise ValueError(f"ordr must be 'file' or 'key', not {ordr}")
 
     def eq(self,
            *queries: Any) -> Generator:
+        for lstart in self.eq_lstarts(*queries):
+            yield self.read_line(lstart)
+
+    def eq_lstarts(self,
+                   *queries: Any) -> Generator:
+        for query, neces_lstarts_idx_obj, start_lstart_ind, end_lstart_ind in self.eq_lstarts_idx_slcs(*queries):
+            yield from neces_lstarts_idx_obj[1][start_lstart_ind:
+                                                end_lstart_ind]
+
+    def eq_plds(self,
+                *queries: Any) -> Generator:
+        for query, neces_lstarts_idx_obj, start_lstart_ind, end_lstart_ind in self.eq_lstarts_idx_slcs(*queries):
+            if len(neces_lstarts_idx_obj) <= self.pld_col_ind:
+                raise NoPldsError(self.adb_path)
+            for pld in neces_lstarts_idx_obj[self.pld_col_ind][start_lstart_ind:
+                                                               end_lstart_ind]:
+                yield query, pld
+
+    def eq_lstarts_idx_slcs(self,
+                            *queries: Any) -> Generator:
         for query in queries:
+            span = self.metrics.start_span()
             prepd_query_bords = self.prep_query(query)
-            for neces_lstarts_idx_path in self.walk_dir_tree(prepd_query_bords):
-                neces_lstarts_idx_obj = self.read_lstarts_idx(neces_lstarts_idx_path)
-                start_lstart_ind = bisect_left(neces_lstarts_idx_obj[0],
-                                               prepd_query_bords[0])
-                if start_lstart_ind == len(neces_lstarts_idx_obj[0]) \
-                        or prepd_query_bords[0] != neces_lstarts_idx_obj[0][start_lstart_ind]:
-                    continue
-                end_lstart_ind = bisect_right(neces_lstarts_idx_obj[0],
-                                              prepd_query_bords[1]) - 1
-                if prepd_query_bords[1] != neces_lstarts_idx_obj[0][end_lstart_ind]:
-                    continue
-                for lstart_ind in range(start_lstart_ind,
-                                        end_lstart_ind + 1):
-                    self.db_zst_opened_r.seek(neces_lstarts_idx_obj[1][lstart_ind])
-                    found_line = self.db_zst_opened_r.readline()
-                    yield found_line
+            for root_paths_idx_path in self.root_paths_idx_paths:
+                yield from self.eq_lstarts_idx_slcs_in_tree(query,
+                                                            prepd_query_bords,
+                                                            root_paths_idx_path)
+            self.metrics.end_span(span,
+                                  'eq',
+                                  query=query)
+
+    def eq_lstarts_idx_slcs_in_tree(self,
+                                    query: Any,
+                                    prepd_query_bords: list[Any,
+                                                            Any],
+                                    root_paths_idx_path: str = 'paths') -> Generator:
+        bloom_filter = self.bloom_filters.get(root_paths_idx_path)
+        fp_flag = False
+        if bloom_filter is not None:
+            if prepd_query_bords[0] not in bloom_filter:
+                bloom_filter.rejects += 1
+                return
+            fp_flag = True
+        for neces_lstarts_idx_path in self.walk_dir_tree(prepd_query_bords,
+                                                         root_paths_idx_path):
+            neces_lstarts_idx_obj = self.read_lstarts_idx(neces_lstarts_idx_path)
+            start_lstart_ind = bisect_left(neces_lstarts_idx_obj[0],
+                                           prepd_query_bords[0])
+            if start_lstart_ind == len(neces_lstarts_idx_obj[0]) \
+                    or prepd_query_bords[0] != neces_lstarts_idx_obj[0][start_lstart_ind]:
+                continue
+            end_lstart_ind = bisect_right(neces_lstarts_idx_obj[0],
+                                          prepd_query_bords[1]) - 1
+            if prepd_query_bords[1] != neces_lstarts_idx_obj[0][end_lstart_ind]:
+                continue
+            fp_flag = False
+            yield query, neces_lstarts_idx_obj, start_lstart_ind, end_lstart_ind + 1
+        if fp_flag:
+            bloom_filter.fps += 1
 
     def rng(self,
             query_start: Any,
             query_end: Any) -> Generator:
+        for lstart in self.rng_lstarts(query_start,
+                                       query_end):
+            yield self.read_line(lstart)
+
+    def slc_lstarts_idx(self,
+                        prepd_query_bords: list[Any,
+                                                Any],
+                        neces_lstarts_idx_path: str) -> None | tuple[list,
+                                                                     int,
+                                                                     int]:
+        neces_lstarts_idx_obj = self.read_lstarts_idx(neces_lstarts_idx_path)
+        if prepd_query_bords[0] <= neces_lstarts_idx_obj[0][0]:
+            start_lstart_ind = 0
+        else:
+            start_lstart_ind = bisect_left(neces_lstarts_idx_obj[0],
+                                           prepd_query_bords[0])
+        neces_lstarts_quan = len(neces_lstarts_idx_obj[0])
+        if start_lstart_ind == neces_lstarts_quan:
+            return None
+        if neces_lstarts_idx_obj[0][-1] <= prepd_query_bords[1]:
+            end_lstart_ind = neces_lstarts_quan
+        else:
+            end_lstart_ind = bisect_right(neces_lstarts_idx_obj[0],
+                                          prepd_query_bords[1])
+        return neces_lstarts_idx_obj, start_lstart_ind, end_lstart_ind
+
+    def rng_lstarts_idx_slcs(self,
+                             prepd_query_bords: list[Any,
+                                                     Any],
+                             root_paths_idx_path: str = 'paths') -> Generator:
+        for neces_lstarts_idx_path in self.walk_dir_tree(prepd_query_bords,
+                                                         root_paths_idx_path):
+            lstarts_idx_slc = self.slc_lstarts_idx(prepd_query_bords,
+                                                   neces_lstarts_idx_path)
+            if lstarts_idx_slc is not None:
+                yield lstarts_idx_slc
+
+    def rng_lstarts(self,
+                    query_start: Any,
+                    query_end: Any) -> Generator:
+        span = self.metrics.start_span()
         prepd_query_bords = self.prep_query(query_start,
                                             query_end)
-        for neces_lstarts_idx_path in self.walk_dir_tree(prepd_query_bords):
+        if len(self.root_paths_idx_paths) > 1:
+            for val, lstart in self.rng_cols(prepd_query_bords,
+                                             1):
+                yield lstart
+        else:
+            for neces_lstarts_idx_obj, start_lstart_ind, end_lstart_ind in self.rng_lstarts_idx_slcs(prepd_query_bords):
+                yield from neces_lstarts_idx_obj[1][start_lstart_ind:
+                                                    end_lstart_ind]
+        self.metrics.end_span(span,
+                              'rng',
+                              query_start=query_start,
+                              query_end=query_end)
+
+    def rng_cols_in_tree(self,
+                         prepd_query_bords: list[Any,
+                                                 Any],
+                         col_ind: int,
+                         root_paths_idx_path: str = 'paths') -> Generator:
+        for neces_lstarts_idx_obj, start_lstart_ind, end_lstart_ind in self.rng_lstarts_idx_slcs(prepd_query_bords,
+                                                                                                 root_paths_idx_path):
+            if col_ind >= len(neces_lstarts_idx_obj):
+                raise NoPldsError(self.adb_path)
+            yield from zip(neces_lstarts_idx_obj[0][start_lstart_ind:
+                                                    end_lstart_ind],
+                           neces_lstarts_idx_obj[col_ind][start_lstart_ind:
+                                                          end_lstart_ind])
+
+    def rng_cols(self,
+                 prepd_query_bords: list[Any,
+                                         Any],
+                 col_ind: int) -> Generator:
+        if len(self.root_paths_idx_paths) == 1:
+            return self.rng_cols_in_tree(prepd_query_bords,
+                                         col_ind)
+        return merge(*[self.rng_cols_in_tree(prepd_query_bords,
+                                             col_ind,
+                                             root_paths_idx_path)
+                       for root_paths_idx_path in self.root_paths_idx_paths],
+                     key=itemgetter(0))
+
+    def rng_plds(self,
+                 query_start: Any,
+                 query_end: Any) -> Generator:
+        prepd_query_bords = self.prep_query(query_start,
+                                            query_end)
+        if not self.key_enc:
+            yield from self.rng_cols(prepd_query_bords,
+                                     self.pld_col_ind)
+            return
+        for val, pld in self.rng_cols(prepd_query_bords,
+                                      self.pld_col_ind):
+            yield dec_key(val), pld
+
+    def pfx_cols(self,
+                 pfx: Any,
+                 col_ind: int,
+                 limit: None | int = None) -> Generator:
+        prepd_pfx = self.src_adb_srt_rule(pfx,
+                                          **self.adb_srt_rule_kwargs)
+        prepd_pfx_end = get_pfx_end(prepd_pfx)
+        if self.key_enc:
+            prepd_pfx = enc_key(prepd_pfx)
+            prepd_pfx_end = enc_key(prepd_pfx_end)
+        vals_n_cols = takewhile(lambda val_n_col: val_n_col[0] < prepd_pfx_end,
+                                self.rng_cols([prepd_pfx,
+                                               prepd_pfx_end],
+                                              col_ind))
+        return islice(vals_n_cols,
+                      limit)
+
+    def pfx_lstarts(self,
+                    pfx: Any,
+                    limit: None | int = None) -> Generator:
+        for val, lstart in self.pfx_cols(pfx,
+                                         1,
+                                         limit):
+            yield lstart
+
+    def pfx(self,
+            pfx: Any,
+            limit: None | int = None) -> Generator:
+        for lstart in self.pfx_lstarts(pfx,
+                                       limit):
+            yield self.read_line(lstart)
+
+    def walk_dir_tree_ovlp(self,
+                           prepd_query_bords: list[Any,
+                                                   Any],
+                           any_idx_path: str = 'paths') -> Generator:
+        if os.path.basename(any_idx_path) == 'lstarts':
+            yield any_idx_path
+            return
+        paths_idx_obj = self.read_paths_idx(any_idx_path)
+        end_gchi_any_idx_ind = bisect_right(paths_idx_obj[0],
+                                            prepd_query_bords[1])
+        for gchi_any_idx_ind in range(end_gchi_any_idx_ind):
+            if paths_idx_obj[3][gchi_any_idx_ind] >= prepd_query_bords[0]:
+                yield from self.walk_dir_tree_ovlp(prepd_query_bords,
+                                                   paths_idx_obj[1][gchi_any_idx_ind])
+
+    def ovlp_cols_in_tree(self,
+                          prepd_query_bords: list[Any,
+                                                  Any],
+                          col_ind: int,
+                          root_paths_idx_path: str = 'paths') -> Generator:
+        for neces_lstarts_idx_path in self.walk_dir_tree_ovlp(prepd_query_bords,
+                                                              root_paths_idx_path):
             neces_lstarts_idx_obj = self.read_lstarts_idx(neces_lstarts_idx_path)
-            if prepd_query_bords[0] <= neces_lstarts_idx_obj[0][0]:
-                start_lstart_ind = 0
+            end_lstart_ind = bisect_right(neces_lstarts_idx_obj[0],
+                                          prepd_query_bords[1])
+            for lstart_ind in range(end_lstart_ind):
+                if neces_lstarts_idx_obj[2][lstart_ind] >= prepd_query_bords[0]:
+                    yield neces_lstarts_idx_obj[0][lstart_ind], neces_lstarts_idx_obj[col_ind][lstart_ind]
+
+    def ovlp_cols(self,
+                  prepd_query_bords: list[Any,
+                                          Any],
+                  col_ind: int) -> Generator:
+        if not self.ival_flag:
+            raise NoIvalsError(self.adb_path)
+        if len(self.root_paths_idx_paths) == 1:
+            return self.ovlp_cols_in_tree(prepd_query_bords,
+                                          col_ind)
+        return merge(*[self.ovlp_cols_in_tree(prepd_query_bords,
+                                              col_ind,
+                                              root_paths_idx_path)
+                       for root_paths_idx_path in self.root_paths_idx_paths],
+                     key=itemgetter(0))
+
+    def ovlp_lstarts(self,
+                     query_start: Any,
+                     query_end: Any = None) -> Generator:
+        prepd_query_bords = self.prep_query(query_start,
+                                            query_end)
+        for val, lstart in self.ovlp_cols(prepd_query_bords,
+                                          1):
+            yield lstart
+
+    def ovlp(self,
+             query_start: Any,
+             query_end: Any = None) -> Generator:
+        for lstart in self.ovlp_lstarts(query_start,
+                                        query_end):
+            yield self.read_line(lstart)
+
+    def count_all_vals(self,
+                       any_idx_path: str = 'paths') -> int:
+        if os.path.basename(any_idx_path) == 'lstarts':
+            return len(self.read_lstarts_idx(any_idx_path)[0])
+        paths_idx_obj = self.read_paths_idx(any_idx_path)
+        if len(paths_idx_obj) > 2:
+            return sum(paths_idx_obj[2])
+        return sum(map(self.count_all_vals,
+                       paths_idx_obj[1]))
+
+    def count_dir_tree(self,
+                       prepd_query_bords: list[Any,
+                                               Any],
+                       any_idx_path: str = 'paths',
+                       any_idx_end: Any = None) -> int:
+        if os.path.basename(any_idx_path) == 'lstarts':
+            lstarts_idx_vals = self.read_lstarts_idx(any_idx_path)[0]
+            return bisect_right(lstarts_idx_vals,
+                                prepd_query_bords[1]) - bisect_left(lstarts_idx_vals,
+                                                                    prepd_query_bords[0])
+        paths_idx_obj = self.read_paths_idx(any_idx_path)
+        gchi_any_idxs_quan = len(paths_idx_obj[0])
+        start_gchi_any_idx_ind = bisect_left(paths_idx_obj[0],
+                                             prepd_query_bords[0]) - 1
+        if start_gchi_any_idx_ind < 0:
+            start_gchi_any_idx_ind = 0
+        end_gchi_any_idx_ind = bisect_right(paths_idx_obj[0],
+                                            prepd_query_bords[1]) - 1
+        vals_quan = 0
+        for gchi_any_idx_ind in range(start_gchi_any_idx_ind,
+                                      end_gchi_any_idx_ind + 1):
+            if gchi_any_idx_ind + 1 < gchi_any_idxs_quan:
+                gchi_any_idx_end = paths_idx_obj[0][gchi_any_idx_ind + 1]
             else:
-                start_lstart_ind = bisect_left(neces_lstarts_idx_obj[0],
-                                               prepd_query_bords[0])
-            neces_lstarts_quan = len(neces_lstarts_idx_obj[0])
-            if start_lstart_ind == neces_lstarts_quan:
-                continue
-            if neces_lstarts_idx_obj[0][-1] <= prepd_query_bords[1]:
-                end_lstart_ind = neces_lstarts_quan - 1
+                gchi_any_idx_end = any_idx_end
+            if len(paths_idx_obj) > 2 \
+                    and gchi_any_idx_end is not None \
+                    and prepd_query_bords[0] <= paths_idx_obj[0][gchi_any_idx_ind] \
+                    and gchi_any_idx_end <= prepd_query_bords[1]:
+                vals_quan += paths_idx_obj[2][gchi_any_idx_ind]
             else:
-                end_lstart_ind = bisect_right(neces_lstarts_idx_obj[0],
-                                              prepd_query_bords[1]) - 1
-            for lstart_ind in range(start_lstart_ind,
-                                    end_lstart_ind + 1):
-                self.db_zst_opened_r.seek(neces_lstarts_idx_obj[1][lstart_ind])
-                found_line = self.db_zst_opened_r.readline()
-                yield found_line
+                vals_quan += self.count_dir_tree(prepd_query_bords,
+                                                 paths_idx_obj[1][gchi_any_idx_ind],
+                                                 gchi_any_idx_end)
+        return vals_quan
+
+    def count(self,
+              query_start: Any = None,
+              query_end: Any = None) -> int:
+        if query_start is None:
+            return sum(map(self.count_all_vals,
+                           self.root_paths_idx_paths))
+        prepd_query_bords = self.prep_query(query_start,
+                                            query_end)
+        vals_quan = 0
+        for root_paths_idx_path in self.root_paths_idx_paths:
+            bloom_filter = self.bloom_filters.get(root_paths_idx_path)
+            if query_end is None \
+                    and bloom_filter is not None \
+                    and prepd_query_bords[0] not in bloom_filter:
+                bloom_filter.rejects += 1
+                continue
+            vals_quan += self.count_dir_tree(prepd_query_bords,
+                                             root_paths_idx_path)
+        return vals_quan
+
+    def exists(self,
+               query: Any) -> bool:
+        return next(self.eq_lstarts(query),
+                    None) is not None
+
+    def hist(self,
+             query_start: Any,
+             query_end: Any = None) -> Generator:
+        prepd_query_bords = self.prep_query(query_start,
+                                            query_end)
+        vals = map(itemgetter(0),
+                   self.rng_cols(prepd_query_bords,
+                                 0))
+        for val, same_vals in groupby(vals):
+            if self.key_enc:
+                val = dec_key(val)
+            yield val, sum(1 for same_val in same_vals)
+
+    def distinct(self,
+                 query_start: Any,
+                 query_end: Any = None) -> Generator:
+        for val, vals_quan in self.hist(query_start,
+                                        query_end):
+            yield val
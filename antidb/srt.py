@@ -1,5 +1,9 @@
 import re
-from collections.abc import Iterable
+from typing import (Callable,
+                    Any)
+from collections.abc import (Iterable,
+                             Hashable)
+from functools import lru_cache
 
 if __name__ == 'main':
     __version__ = 'v5.0.2'
@@ -8,6 +12,47 @@ if __name__ == 'main':
                     'years': '2023-2025'}]
 
 
+NATUR_SPLIT_CELL = {'.': re.compile(r'(-?\d+(?:\.\d*)?(?:[Ee][+-]?\d+)?)').split,
+                    ',': re.compile(r'(-?\d+(?:,\d*)?(?:[Ee][+-]?\d+)?)').split}
+LETTS_NUMS = re.compile(r'([a-zA-Z]+)(\d+)$').match
+FLOAT_WORDS = {'inf', 'nan', 'infinity'}
+
+
+def conv_natur_subcell(subcell: str,
+                       dec_delimiter: str) -> int | float | str:
+    try:
+        return int(subcell)
+    except ValueError:
+        try:
+            return float(subcell)
+        except ValueError:
+            if dec_delimiter == ',':
+                try:
+                    return float(subcell.replace(',', '.'))
+                except ValueError:
+                    pass
+    return subcell
+
+
+def memo_srt_rule(adb_srt_rule: Callable,
+                  max_size: int = 65536) -> Callable:
+    @lru_cache(maxsize=max_size)
+    def memo_adb_srt_rule(val: Hashable,
+                          adb_srt_rule_kwargs: tuple) -> Any:
+        return adb_srt_rule(val,
+                            **dict(adb_srt_rule_kwargs))
+
+    def adb_srt_rule_memo(val: Any,
+                          **adb_srt_rule_kwargs: Any) -> Any:
+        if type(val) is not str:
+            return adb_srt_rule(val,
+                                **adb_srt_rule_kwargs)
+        return memo_adb_srt_rule(val,
+                                 tuple(sorted(adb_srt_rule_kwargs.items())))
+    adb_srt_rule_memo.cache_info = memo_adb_srt_rule.cache_info
+    return adb_srt_rule_memo
+
+
 class SrtRules():
     @staticmethod
     def natur(src_str_or_row: str | Iterable,
@@ -19,28 +64,29 @@ class SrtRules():
                         Iterable):
             src_row = list(map(str,
                                src_str_or_row))
-        if dec_delimiter == '.':
-            natur_split_cell = r'(-?\d+(?:\.\d*)?(?:[Ee][+-]?\d+)?)'
-        elif dec_delimiter == ',':
-            natur_split_cell = r'(-?\d+(?:,\d*)?(?:[Ee][+-]?\d+)?)'
+        natur_split_cell = NATUR_SPLIT_CELL[dec_delimiter]
         spl_row = []
         for cell in src_row:
-            subcells = list(filter(lambda subcell:
-                                   subcell,
-                                   re.split(natur_split_cell,
-                                            cell)))
-            for subcell_ind in range(len(subcells)):
-                try:
-                    subcells[subcell_ind] = int(subcells[subcell_ind])
-                except ValueError:
-                    try:
-                        subcells[subcell_ind] = float(subcells[subcell_ind])
-                    except ValueError:
-                        if dec_delimiter == ',':
-                            try:
-                                subcells[subcell_ind] = float(subcells[subcell_ind].replace(',', '.'))
-                            except ValueError:
-                                pass
+            if cell.isdecimal():
+                spl_row.append([int(cell)])
+                continue
+            if cell.isalpha() \
+                    and cell.lower() not in FLOAT_WORDS:
+                if nums_first:
+                    spl_row.append([float('+inf'), cell])
+                else:
+                    spl_row.append([float('-inf'), cell])
+                continue
+            subcells = []
+            for subcell_ind, subcell in enumerate(natur_split_cell(cell)):
+                if not subcell:
+                    continue
+                if subcell_ind % 2 \
+                        or not subcell.isalpha() \
+                        or subcell.lower() in FLOAT_WORDS:
+                    subcell = conv_natur_subcell(subcell,
+                                                 dec_delimiter)
+                subcells.append(subcell)
             if type(subcells[0]) is str:
                 if nums_first:
                     subcells.insert(0, float('+inf'))
@@ -49,11 +95,24 @@ class SrtRules():
             spl_row.append(subcells)
         return spl_row
 
+    @staticmethod
+    def natur_batch(src_strs_or_rows: Iterable,
+                    dec_delimiter: str = '.',
+                    nums_first: bool = True) -> list:
+        natur = SrtRules.natur
+        return [natur(src_str_or_row,
+                      dec_delimiter,
+                      nums_first)
+                for src_str_or_row in src_strs_or_rows]
+
     @staticmethod
     def letts_nums(src_srt: str) -> list:
-        letts = re.search(r'^[a-zA-Z]+',
-                          src_srt).group()
-        nums = int(re.search(f'(?<=^{letts})\\d+$',
-                             src_srt).group())
-        spl_row = [letts, nums]
+        letts, nums = LETTS_NUMS(src_srt).groups()
+        spl_row = [letts, int(nums)]
         return spl_row
+
+    @staticmethod
+    def letts_nums_batch(src_srts: Iterable) -> list:
+        letts_nums = SrtRules.letts_nums
+        return [letts_nums(src_srt)
+                for src_srt in src_srts]
@@ -0,0 +1,95 @@
+from array import array
+from struct import Struct
+from typing import (Generator,
+                    Iterable)
+from pyzstd import decompress
+
+if __name__ == 'main':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+SEEK_TABLE_ENTRY = Struct('<II')
+SEEK_TABLE_FOOTER = Struct('<IBI')
+SEEK_TABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+
+
+def read_seek_table(db_zst_path: str) -> tuple[array,
+                                               array]:
+    frame_c_starts = array('q', [0])
+    frame_d_starts = array('q', [0])
+    with open(db_zst_path, 'rb') as db_zst_opened:
+        db_zst_size = db_zst_opened.seek(0, 2)
+        if db_zst_size == 0:
+            return frame_c_starts, frame_d_starts
+        db_zst_opened.seek(-SEEK_TABLE_FOOTER.size, 2)
+        frames_quan, descr, magic = SEEK_TABLE_FOOTER.unpack(db_zst_opened.read(SEEK_TABLE_FOOTER.size))
+        if magic != SEEKABLE_MAGIC:
+            raise ValueError(f'{db_zst_path} is not Zstandard Seekable file')
+        entry_size = 12 if descr & 0b10000000 else 8
+        seek_table_size = 8 + frames_quan * entry_size + SEEK_TABLE_FOOTER.size
+        db_zst_opened.seek(-seek_table_size, 2)
+        seek_table = db_zst_opened.read(seek_table_size)
+    if SEEK_TABLE_ENTRY.unpack_from(seek_table, 0)[0] != SEEK_TABLE_MAGIC:
+        raise ValueError(f'{db_zst_path} has broken seek table')
+    for entry_start in range(8,
+                             8 + frames_quan * entry_size,
+                             entry_size):
+        frame_c_size, frame_d_size = SEEK_TABLE_ENTRY.unpack_from(seek_table,
+                                                                  entry_start)
+        if not frame_c_size:
+            continue
+        frame_c_starts.append(frame_c_starts[-1] + frame_c_size)
+        frame_d_starts.append(frame_d_starts[-1] + frame_d_size)
+    return frame_c_starts, frame_d_starts
+
+
+def split_by_frames(frame_d_starts: array,
+                    parts_quan: int) -> list[list[int]]:
+    db_zst_d_size = frame_d_starts[-1]
+    part_bords = [0]
+    frame_ind = 0
+    for part_num in range(1, parts_quan):
+        targ_d_start = db_zst_d_size * part_num // parts_quan
+        while frame_d_starts[frame_ind] < targ_d_start:
+            frame_ind += 1
+        if frame_d_starts[frame_ind] > part_bords[-1]:
+            part_bords.append(frame_d_starts[frame_ind])
+    if db_zst_d_size > part_bords[-1]:
+        part_bords.append(db_zst_d_size)
+    return [[part_bords[ind], part_bords[ind + 1]]
+            for ind in range(len(part_bords) - 1)]
+
+
+def decompress_frames(db_zst_path: str,
+                      frame_c_starts: array,
+                      frame_d_starts: array,
+                      frame_ind: int = 0,
+                      chunk_size: int = 16 * 1024 * 1024) -> Generator:
+    frames_quan = len(frame_c_starts) - 1
+    with open(db_zst_path, 'rb') as db_zst_opened:
+        db_zst_opened.seek(frame_c_starts[frame_ind])
+        while frame_ind < frames_quan:
+            end_frame_ind = frame_ind + 1
+            while end_frame_ind < frames_quan \
+                    and frame_d_starts[end_frame_ind + 1] - frame_d_starts[frame_ind] <= chunk_size:
+                end_frame_ind += 1
+            yield decompress(db_zst_opened.read(frame_c_starts[end_frame_ind] -
+                                                frame_c_starts[frame_ind]))
+            frame_ind = end_frame_ind
+
+
+def scan_lines(chunks: Iterable,
+               chunks_start: int = 0) -> Generator:
+    lstart = chunks_start
+    tail = b''
+    for chunk in chunks:
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            yield lstart, line
+            lstart += len(line) + 1
+    if tail:
+        yield lstart, tail
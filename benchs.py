@@ -0,0 +1,423 @@
+# autopep8: off
+import sys; sys.dont_write_bytecode = True
+# autopep8: on
+import os
+import json
+import random
+import platform
+import subprocess
+import resource
+from typing import Callable
+from argparse import (ArgumentParser,
+                      SUPPRESS)
+from io import TextIOWrapper
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from datetime import datetime
+from antidb.idx import (Idx,
+                        count_exec_time)
+from antidb.prs import Prs
+from antidb.srt import (SrtRules,
+                        memo_srt_rule)
+from antidb.zst import (read_seek_table,
+                        decompress_frames,
+                        scan_lines)
+from pyzstd import SeekableZstdFile
+
+if __name__ == '__main__':
+    __version__ = 'v1.0.0'
+    __authors__ = [{'name': 'Platon Bykadorov',
+                    'email': 'platon.work@gmail.com',
+                    'years': '2025'}]
+
+
+def gen_vcf(vcf_path: str,
+            lines_quan: int) -> None:
+    rand = random.Random(0)
+    with open(vcf_path, 'w') as vcf_opened:
+        vcf_opened.write('##fileformat=VCFv4.2\n')
+        vcf_opened.write('#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n')
+        for line_num in range(lines_quan):
+            vcf_opened.write(f'NC_000001.11\t{line_num * 10 + 1}\trs{rand.randrange(10 ** 9)}\t'
+                             f'{rand.choice("ACGT")}\t{rand.choice("ACGT")}\t.\t.\t'
+                             f'RS={line_num};dbSNPBuildID={rand.randrange(200)};VC=SNV\n')
+
+
+def gen_rsmerged(rsmerged_path: str,
+                 lines_quan: int) -> None:
+    rand = random.Random(1)
+    with open(rsmerged_path, 'w') as rsmerged_opened:
+        for line_num in range(lines_quan):
+            rsmerged_obj = {'refsnp_id': str(rand.randrange(10 ** 9)),
+                            'last_update_date': f'20{rand.randrange(10, 25)}-0{rand.randrange(1, 10)}-1{rand.randrange(10)}',
+                            'last_update_build_id': str(rand.randrange(140, 157)),
+                            'merged_snapshot_data': {'proxy_time': None,
+                                                     'proxy_build_id': str(rand.randrange(140, 157)),
+                                                     'merged_into': [str(rand.randrange(10 ** 9))
+                                                                     for rsid_num in range(rand.randrange(1, 4))]}}
+            rsmerged_opened.write(json.dumps(rsmerged_obj) + '\n')
+
+
+def prs_dbsnp_line(dbsnp_zst_line: str) -> str:
+    return dbsnp_zst_line.split('\t')[2]
+
+
+def prs_rsmerged_line(rsmerged_zst_line: str) -> tuple:
+    rsmerged_zst_obj = json.loads(rsmerged_zst_line)
+    return tuple(f'rs{rsid}'
+                 for rsid in [rsmerged_zst_obj['refsnp_id']] +
+                 rsmerged_zst_obj['merged_snapshot_data']['merged_into'])
+
+
+IDX_BENCH_STEP_NAMES = ['crt_db_zst', 'presrt_idxs', 'crt_adb']
+BENCH_SRCS = {'dbsnp': ['dbsnp.vcf', gen_vcf, prs_dbsnp_line],
+              'rsmerged': ['rsmerged.json', gen_rsmerged, prs_rsmerged_line]}
+
+
+def get_peak_rss() -> int:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+
+
+def crt_bench_res(exec_time: float,
+                  items_quan: int) -> dict:
+    return {'wall_time': exec_time,
+            'peak_rss': get_peak_rss(),
+            'items_quan': items_quan,
+            'throughput': items_quan / exec_time if exec_time else None}
+
+
+def time_bench_step(any_func: Callable,
+                    *args) -> tuple:
+    exec_time_start = perf_counter()
+    any_func_res = any_func(*args)
+    return any_func_res, perf_counter() - exec_time_start
+
+
+def get_bench_queries(db_file_path: str,
+                      db_line_prs: Callable,
+                      queries_quan: int) -> list:
+    rand = random.Random(2)
+    with open(db_file_path) as db_file_opened:
+        db_file_lines = [db_file_line
+                         for db_file_line in db_file_opened
+                         if not db_file_line.startswith('#')]
+    queries = []
+    for db_file_line in rand.sample(db_file_lines,
+                                    min(queries_quan,
+                                        len(db_file_lines))):
+        queries.append(db_line_prs(db_file_line))
+        if type(queries[-1]) is tuple:
+            queries[-1] = queries[-1][0]
+    return queries
+
+
+def run_idx_bench(src_name: str,
+                  work_dir_path: str,
+                  idx_step_name: str) -> dict:
+    src_file_name, gen_src, db_line_prs = BENCH_SRCS[src_name]
+    idx_obj = Idx(db_file_path=os.path.join(work_dir_path,
+                                            src_file_name),
+                  adb_name_prefix='bench',
+                  db_line_prs=db_line_prs,
+                  adb_srt_rule='natur')
+    with open(idx_obj.db_file_path) as db_file_opened:
+        lines_quan = sum(1 for db_file_line in db_file_opened
+                         if not db_file_line.startswith('#'))
+    presrtd_idx_paths_path = os.path.join(work_dir_path,
+                                          f'{src_name}.presrtd.json')
+    if idx_step_name == 'crt_db_zst':
+        idx_step_res, exec_time = time_bench_step(idx_obj.crt_db_zst)
+    elif idx_step_name == 'presrt_idxs':
+        idx_obj.presrt_named_flag = True
+        idx_step_res, exec_time = time_bench_step(idx_obj.presrt_idxs)
+        with open(presrtd_idx_paths_path, 'w') as presrtd_idx_paths_opened:
+            json.dump([presrtd_idx_opened.name
+                       for presrtd_idx_opened in idx_obj.presrtd_idxs_opened],
+                      presrtd_idx_paths_opened)
+    else:
+        with open(presrtd_idx_paths_path) as presrtd_idx_paths_opened:
+            presrtd_idx_paths = json.load(presrtd_idx_paths_opened)
+        idx_obj.presrtd_idxs_opened = [open(presrtd_idx_path, mode='rb')
+                                       for presrtd_idx_path in presrtd_idx_paths]
+        idx_step_res, exec_time = time_bench_step(idx_obj.crt_adb)
+        for presrtd_idx_path in presrtd_idx_paths:
+            os.remove(presrtd_idx_path)
+        os.remove(presrtd_idx_paths_path)
+    for presrtd_idx_opened in idx_obj.presrtd_idxs_opened:
+        presrtd_idx_opened.close()
+    return {f'{src_name}.{idx_step_name}': crt_bench_res(exec_time,
+                                                         lines_quan)}
+
+
+def run_eq_bench(prs_obj: Prs,
+                 queries: list) -> int:
+    lines_quan = 0
+    for query in queries:
+        for db_zst_line in prs_obj.eq(query):
+            lines_quan += 1
+    return lines_quan
+
+
+def run_eq_batch_bench(prs_obj: Prs,
+                       queries: list) -> int:
+    return sum(1 for query_n_line in prs_obj.eq_batch(queries))
+
+
+def run_rngs_bench(prs_obj: Prs,
+                   query_bords: list) -> int:
+    return sum(1 for query_start, query_end in query_bords
+               for db_zst_line in prs_obj.rng(query_start,
+                                              query_end))
+
+
+def run_prs_bench(src_name: str,
+                  work_dir_path: str,
+                  prs_bench_name: str) -> dict:
+    src_file_name, gen_src, db_line_prs = BENCH_SRCS[src_name]
+    db_file_path = os.path.join(work_dir_path,
+                                src_file_name)
+    with open(os.path.join(work_dir_path,
+                           f'{src_name}.queries.json')) as queries_opened:
+        queries = json.load(queries_opened)
+    prs_obj = Prs(db_file_path=db_file_path,
+                  adb_name_prefix='bench',
+                  adb_srt_rule='natur')
+    if prs_bench_name == 'eq_cold':
+        queries = queries[:max(len(queries) // 100,
+                               1)]
+        lines_quan, exec_time = time_bench_step(run_eq_bench,
+                                                prs_obj,
+                                                queries)
+        items_quan = len(queries)
+    elif prs_bench_name == 'eq':
+        lines_quan, exec_time = time_bench_step(run_eq_bench,
+                                                prs_obj,
+                                                queries)
+        items_quan = len(queries)
+    elif prs_bench_name == 'eq_batch':
+        lines_quan, exec_time = time_bench_step(run_eq_batch_bench,
+                                                prs_obj,
+                                                queries)
+        items_quan = len(queries)
+    else:
+        srtd_queries = sorted(queries,
+                              key=SrtRules.natur)
+        if prs_bench_name == 'rng_narrow':
+            query_bords = list(zip(srtd_queries[::2],
+                                   srtd_queries[1::2]))
+        else:
+            query_bords = [[srtd_queries[0],
+                            srtd_queries[len(srtd_queries) // 2]]]
+        lines_quan, exec_time = time_bench_step(run_rngs_bench,
+                                                prs_obj,
+                                                query_bords)
+        items_quan = lines_quan
+    prs_obj.close()
+    return {f'{src_name}.{prs_bench_name}': crt_bench_res(exec_time,
+                                                          items_quan)}
+
+
+def run_bench_in_subproc(*bench_args: str) -> dict:
+    subproc_res = subprocess.run([sys.executable,
+                                  os.path.abspath(__file__),
+                                  '--bench-step',
+                                  *bench_args],
+                                 capture_output=True,
+                                 text=True,
+                                 check=True)
+    return json.loads(subproc_res.stdout)
+
+
+def bench_suite(lines_quan: int,
+                queries_quan: int,
+                work_dir_path: None | str = None,
+                res_file_path: None | str = None) -> dict:
+    with TemporaryDirectory() as temp_dir_path:
+        work_dir_path = work_dir_path or temp_dir_path
+        os.makedirs(work_dir_path,
+                    exist_ok=True)
+        bench_ress = {}
+        for src_name, (src_file_name, gen_src, db_line_prs) in BENCH_SRCS.items():
+            db_file_path = os.path.join(work_dir_path,
+                                        src_file_name)
+            for any_file_path in [db_file_path,
+                                  f'{db_file_path}.zst',
+                                  f'{db_file_path}.bench.adb']:
+                if os.path.exists(any_file_path):
+                    os.remove(any_file_path)
+            gen_src(db_file_path,
+                    lines_quan)
+            for idx_step_name in IDX_BENCH_STEP_NAMES:
+                bench_ress.update(run_bench_in_subproc(idx_step_name,
+                                                       src_name,
+                                                       work_dir_path))
+            with open(os.path.join(work_dir_path,
+                                   f'{src_name}.queries.json'), 'w') as queries_opened:
+                json.dump(get_bench_queries(db_file_path,
+                                            db_line_prs,
+                                            queries_quan),
+                          queries_opened)
+            for prs_bench_name in ['eq_cold', 'eq', 'eq_batch', 'rng_narrow', 'rng_wide']:
+                bench_ress.update(run_bench_in_subproc(prs_bench_name,
+                                                       src_name,
+                                                       work_dir_path))
+    bench_suite_res = {'meta': {'date': str(datetime.now()),
+                                'python': platform.python_version(),
+                                'platform': platform.platform(),
+                                'cpus_quan': os.cpu_count(),
+                                'lines_quan': lines_quan,
+                                'queries_quan': queries_quan},
+                       'benchs': bench_ress}
+    for bench_name, bench_res in bench_ress.items():
+        print(f'{bench_name}: {bench_res["wall_time"]:.3f} s, '
+              f'{bench_res["peak_rss"] / 1024 ** 2:.1f} MiB, '
+              f'{bench_res["throughput"] or 0:.0f} items/s')
+    if res_file_path:
+        with open(res_file_path, 'w') as res_file_opened:
+            json.dump(bench_suite_res, res_file_opened, indent=4)
+    return bench_suite_res
+
+
+def cmp_bench_ress(old_res_file_path: str,
+                   new_res_file_path: str,
+                   tolerance: float) -> list:
+    with open(old_res_file_path) as old_res_file_opened:
+        old_bench_ress = json.load(old_res_file_opened)['benchs']
+    with open(new_res_file_path) as new_res_file_opened:
+        new_bench_ress = json.load(new_res_file_opened)['benchs']
+    regrs = []
+    for bench_name in sorted(old_bench_ress.keys() & new_bench_ress.keys()):
+        for metric_name in ['wall_time', 'peak_rss']:
+            old_metric_val = old_bench_ress[bench_name][metric_name]
+            new_metric_val = new_bench_ress[bench_name][metric_name]
+            ratio = new_metric_val / old_metric_val if old_metric_val else 1.0
+            regr_flag = ratio > 1 + tolerance
+            print(f'{bench_name} {metric_name}: {old_metric_val:.6g} -> {new_metric_val:.6g} '
+                  f'({ratio:.2f}x){" REGRESSION" if regr_flag else ""}')
+            if regr_flag:
+                regrs.append([bench_name,
+                              metric_name,
+                              ratio])
+    return regrs
+
+
+@count_exec_time
+def read_lines_txt(db_zst_path: str) -> int:
+    lines_quan = 0
+    with TextIOWrapper(SeekableZstdFile(db_zst_path)) as db_zst_opened:
+        while True:
+            db_zst_lstart = db_zst_opened.tell()
+            db_zst_line = db_zst_opened.readline().rstrip()
+            if not db_zst_line:
+                break
+            lines_quan += 1
+    return lines_quan
+
+
+@count_exec_time
+def read_lines_bin(idx_obj: Idx) -> int:
+    lines_quan = 0
+    frame_c_starts, frame_d_starts = read_seek_table(idx_obj.db_zst_path)
+    for db_zst_lstart, db_zst_line in idx_obj.decode_lines(scan_lines(decompress_frames(idx_obj.db_zst_path,
+                                                                                        frame_c_starts,
+                                                                                        frame_d_starts,
+                                                                                        chunk_size=idx_obj.compr_chunk_size))):
+        if not db_zst_line:
+            break
+        lines_quan += 1
+    return lines_quan
+
+
+def bench_scan_lines(lines_quan: int) -> None:
+    with TemporaryDirectory() as temp_dir_path:
+        vcf_path = os.path.join(temp_dir_path,
+                                'bench.vcf')
+        gen_vcf(vcf_path,
+                lines_quan)
+        idx_obj = Idx(db_file_path=vcf_path,
+                      adb_name_prefix='bench',
+                      db_line_prs=None,
+                      adb_srt_rule=None)
+        idx_obj.crt_db_zst()
+        print(read_lines_txt(idx_obj.db_zst_path))
+        print(read_lines_bin(idx_obj))
+
+
+def gen_srt_rules_vals(vals_quan: int) -> dict:
+    rand = random.Random(0)
+    return {'rsids': [f'rs{rand.randrange(10 ** 9)}'
+                      for val_num in range(vals_quan)],
+            'chrom_poss': [f'chr{rand.choice(["1", "14", "X", "MT"])}:{rand.randrange(10 ** 8)}'
+                           for val_num in range(vals_quan)],
+            'poss': [str(rand.randrange(10 ** 8))
+                     for val_num in range(vals_quan)]}
+
+
+def time_srt_rule(srt_rule_func: Callable,
+                  vals: list,
+                  batch_flag: bool = False) -> float:
+    exec_time_start = perf_counter()
+    if batch_flag:
+        srtd_vals = srt_rule_func(vals)
+    else:
+        srtd_vals = [srt_rule_func(val)
+                     for val in vals]
+    return (perf_counter() - exec_time_start) / len(vals) * 10 ** 6
+
+
+def bench_srt_rules(vals_quan: int) -> None:
+    vals_by_kinds = gen_srt_rules_vals(vals_quan)
+    for vals_kind, vals in vals_by_kinds.items():
+        print(f'natur {vals_kind}: {time_srt_rule(SrtRules.natur, vals):.2f} us/val')
+        print(f'natur_batch {vals_kind}: {time_srt_rule(SrtRules.natur_batch, vals, True):.2f} us/val')
+        repeated_vals = vals[:max(len(vals) // 10, 1)] * 10
+        print(f'natur memo (10 repeats) {vals_kind}: {time_srt_rule(memo_srt_rule(SrtRules.natur), repeated_vals):.2f} us/val')
+    print(f'letts_nums rsids: {time_srt_rule(SrtRules.letts_nums, vals_by_kinds["rsids"]):.2f} us/val')
+    print(f'letts_nums_batch rsids: {time_srt_rule(SrtRules.letts_nums_batch, vals_by_kinds["rsids"], True):.2f} us/val')
+
+
+if __name__ == '__main__':
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument('-l', '--lines-quan', metavar='1000000', default=1000000, dest='lines_quan', type=int,
+                            help='Quantity of lines in generated VCF')
+    arg_parser.add_argument('-b', '--bench', choices=['scan_lines', 'srt_rules', 'suite'], default='scan_lines', dest='bench',
+                            help='Benchmark to run')
+    arg_parser.add_argument('-v', '--vals-quan', metavar='200000', default=200000, dest='vals_quan', type=int,
+                            help='Quantity of generated values for srt_rules benchmark')
+    arg_parser.add_argument('-q', '--queries-quan', metavar='10000', default=10000, dest='queries_quan', type=int,
+                            help='Quantity of queries for suite benchmark')
+    arg_parser.add_argument('-w', '--work-dir-path', metavar='str', dest='work_dir_path', type=str,
+                            help='Path to directory for generated files of suite benchmark (temporary by default)')
+    arg_parser.add_argument('-o', '--res-file-path', metavar='str', dest='res_file_path', type=str,
+                            help='Path to JSON with suite benchmark results')
+    arg_parser.add_argument('-c', '--cmp', nargs=2, metavar=('old.json', 'new.json'), dest='cmp_res_file_paths', type=str,
+                            help='Compare two JSONs with suite benchmark results and exit with code 1 on regressions')
+    arg_parser.add_argument('-t', '--tolerance', metavar='0.1', default=0.1, dest='tolerance', type=float,
+                            help='Allowed relative increase of wall time and peak RSS when comparing results')
+    arg_parser.add_argument('--bench-step', nargs='+', dest='bench_step', help=SUPPRESS)
+    args = arg_parser.parse_args()
+    if args.bench_step:
+        if args.bench_step[0] in IDX_BENCH_STEP_NAMES:
+            print(json.dumps(run_idx_bench(args.bench_step[1],
+                                           args.bench_step[2],
+                                           args.bench_step[0])))
+        else:
+            print(json.dumps(run_prs_bench(args.bench_step[1],
+                                           args.bench_step[2],
+                                           args.bench_step[0])))
+    elif args.cmp_res_file_paths:
+        if cmp_bench_ress(*args.cmp_res_file_paths,
+                          args.tolerance):
+            sys.exit(1)
+    elif args.bench == 'suite':
+        bench_suite(args.lines_quan,
+                    args.queries_quan,
+                    args.work_dir_path,
+                    args.res_file_path)
+    elif args.bench == 'srt_rules':
+        bench_srt_rules(args.vals_quan)
+    else:
+        bench_scan_lines(args.lines_quan)
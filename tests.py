@@ -2,9 +2,20 @@
 import sys; sys.dont_write_bytecode = True
 # autopep8: on
 import unittest
+from contextlib import aclosing
 from antidb.srt import *
 from antidb.idx import *
 from antidb.prs import *
+from antidb.zst import *
+from antidb.lstarts import *
+from antidb.lru import *
+from antidb.bloom import *
+from antidb.flat import *
+from antidb.aprs import *
+from antidb.pprs import *
+from antidb.key import *
+from antidb.err import *
+from antidb.mtr import *
 
 if __name__ == 'main':
     __version__ = 'v5.1.0'
@@ -56,10 +67,15 @@ class BedTests(unittest.TestCase):
                                    line.split('\t')[-1]),
                       adb_srt_rule=SrtRules.natur,
                       presrt_chunk_len=8,
+                      presrt_blk_len=3,
                       lstarts_idx_div=2,
                       lstarts_idx_len=5)
         idx_obj.idx()
         self.assertEqual(len(idx_obj.presrtd_idxs_opened), 2)
+        self.assertEqual(idx_obj.perf[-1][0],
+                         'crt_adb')
+        self.assertEqual(idx_obj.perf[-1][1]['merged_vals_quan'],
+                         16)
         self.assertTrue(os.path.isfile(self.src_file_path))
         self.assertTrue(os.path.isfile(self.db_zst_path))
         self.assertTrue(os.path.isfile(adb_path))
@@ -82,7 +98,11 @@ class BedTests(unittest.TestCase):
                               '2/1/lstarts',
                               '2/2/lstarts'])
             self.assertEqual(len(adb_content),
-                             13)
+                             15)
+            self.assertIn('end',
+                          adb_content)
+            self.assertEqual(Idx.read_adb_metas(adb_opened_r),
+                             [{'key_enc': False}])
             root_paths_idx_path = 'paths'
             with adb_opened_r.open(root_paths_idx_path) as root_paths_idx_opened:
                 root_paths_idx_obj = load(root_paths_idx_opened)
@@ -94,8 +114,10 @@ class BedTests(unittest.TestCase):
                                  '1/paths')
                 self.assertEqual(root_paths_idx_obj[1][1],
                                  '2/paths')
+                self.assertEqual(root_paths_idx_obj[2],
+                                 [8, 8])
                 self.assertEqual(len(root_paths_idx_obj),
-                                 2)
+                                 3)
                 self.assertEqual(len(root_paths_idx_obj[0]),
                                  2)
                 self.assertEqual(len(root_paths_idx_obj[1]),
@@ -111,8 +133,10 @@ class BedTests(unittest.TestCase):
                                  '1/1/lstarts')
                 self.assertEqual(fir_paths_idx_obj[1][1],
                                  '1/2/lstarts')
+                self.assertEqual(fir_paths_idx_obj[2],
+                                 [4, 4])
                 self.assertEqual(len(fir_paths_idx_obj),
-                                 2)
+                                 3)
                 self.assertEqual(len(fir_paths_idx_obj[0]),
                                  2)
                 self.assertEqual(len(fir_paths_idx_obj[1]),
@@ -128,8 +152,10 @@ class BedTests(unittest.TestCase):
                                  '2/1/lstarts')
                 self.assertEqual(sec_paths_idx_obj[1][1],
                                  '2/2/lstarts')
+                self.assertEqual(sec_paths_idx_obj[2],
+                                 [4, 4])
                 self.assertEqual(len(sec_paths_idx_obj),
-                                 2)
+                                 3)
                 self.assertEqual(len(sec_paths_idx_obj[0]),
                                  2)
                 self.assertEqual(len(sec_paths_idx_obj[1]),
@@ -463,6 +489,8 @@ class BedTests(unittest.TestCase):
                                 namelist()),
                          ['1/',
                           '1/lstarts',
+                          'end',
+                          'meta',
                           'paths'])
         self.assertEqual(list(prs_obj.eq('1')),
                          self.src_bed)
@@ -566,6 +594,327 @@ class BedTests(unittest.TestCase):
                   self.db_zst_path,
                   adb_path)
 
+    def test_adb_cache(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'bed.bed.cache.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_bed_line in self.src_bed:
+                src_file_opened.write(src_bed_line)
+        del_files(self.db_zst_path,
+                  adb_path)
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='cache',
+                      db_line_prs=(lambda line:
+                                   line.rstrip().split('\t')[-1]),
+                      adb_srt_rule=SrtRules.natur,
+                      presrt_chunk_len=8,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=5)
+        idx_obj.idx()
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='cache',
+                      adb_srt_rule=SrtRules.natur,
+                      cache_warm_lvls=3)
+        self.assertEqual(prs_obj.adb_cache.get_stats()['objs_quan'],
+                         6)
+        self.assertEqual(prs_obj.adb_cache.cur_size,
+                         sum(get_obj_size(obj_n_size[0])
+                             for obj_n_size in prs_obj.adb_cache.objs_n_sizes.values()))
+        self.assertEqual(prs_obj.adb_cache.misses,
+                         6)
+        for rep_num in range(2):
+            self.assertEqual(list(prs_obj.eq('rs11581176')),
+                             [self.src_bed[8],
+                              self.src_bed[8]])
+        self.assertEqual(prs_obj.adb_cache.misses,
+                         6)
+        self.assertGreater(prs_obj.adb_cache.hits,
+                           0)
+        nocache_prs_obj = Prs(db_file_path=self.src_file_path,
+                              adb_name_prefix='cache',
+                              adb_srt_rule=SrtRules.natur,
+                              cache_size=0)
+        self.assertEqual(list(nocache_prs_obj.rng('rs0', 'rs999999999')),
+                         list(prs_obj.rng('rs0', 'rs999999999')))
+        self.assertEqual(len(nocache_prs_obj.adb_cache),
+                         0)
+        lru_cache = LruCache(10)
+        lru_cache.put('a', 1, 4)
+        lru_cache.put('b', 2, 4)
+        lru_cache.get('a')
+        lru_cache.put('c', 3, 4)
+        self.assertEqual(list(lru_cache.objs_n_sizes),
+                         ['a', 'c'])
+        self.assertFalse(lru_cache.put('d', 4, 11))
+        self.assertEqual(call_wo_gc(gc.isenabled),
+                         False)
+        self.assertTrue(gc.isenabled())
+        natur_keys = [SrtRules.natur(f'rs{val_num * 7919 % 100003}')
+                      for val_num in range(10000)]
+        self.assertAlmostEqual(estim_obj_size([natur_keys, array('q', range(10000))]) /
+                               get_obj_size([natur_keys, array('q', range(10000))]),
+                               1,
+                               delta=0.05)
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
+    def test_eq_batch(self):
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_bed_line in self.src_bed:
+                src_file_opened.write(src_bed_line)
+        del_files(self.db_zst_path)
+        adb_paths = []
+        for adb_name_prefix, db_line_prs, adb_srt_rule, queries in [['batch_len',
+                                                                     lambda line: len(line.split('\t')[3]),
+                                                                     lambda val: val,
+                                                                     [10, 8, 11, 9, 10, 0, 2 ** 70]],
+                                                                    ['batch_rsids',
+                                                                     lambda line: line.rstrip().split('\t')[3],
+                                                                     SrtRules.natur,
+                                                                     ['rs952084', 'rs11804321', 'rs0',
+                                                                      'rs479341', 'rs11804321', 'rs17380378',
+                                                                      'rs99999999', 'rs11581176']]]:
+            adb_path = os.path.join(os.getcwd(),
+                                    f'bed.bed.{adb_name_prefix}.adb')
+            adb_paths.append(adb_path)
+            del_files(adb_path)
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=db_line_prs,
+                          adb_srt_rule=adb_srt_rule,
+                          presrt_chunk_len=8,
+                          lstarts_idx_div=3,
+                          lstarts_idx_len=3,
+                          lstarts_idx_fmt=2)
+            idx_obj.idx()
+            prs_obj = Prs(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          adb_srt_rule=adb_srt_rule)
+            queries_n_lines = list(prs_obj.eq_batch(queries))
+            self.assertEqual(list(map(itemgetter(1),
+                                      queries_n_lines)),
+                             list(prs_obj.eq(*queries)))
+            self.assertEqual([query_n_line[0] for query_n_line in queries_n_lines],
+                             [query
+                              for query in queries
+                              for line in prs_obj.eq(query)])
+            self.assertEqual(sorted(prs_obj.eq_batch(iter(queries),
+                                                     ordr='fetch')),
+                             sorted(queries_n_lines))
+        self.assertEqual(len(queries_n_lines),
+                         11)
+        self.assertRaises(ValueError,
+                          lambda: list(prs_obj.eq_batch(queries,
+                                                        ordr='random')))
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_flat_adb(self):
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_bed_line in self.src_bed:
+                src_file_opened.write(src_bed_line)
+        del_files(self.db_zst_path)
+        self.assertRaises(ValueError,
+                          Idx,
+                          db_file_path=self.src_file_path,
+                          adb_name_prefix='flat',
+                          db_line_prs=None,
+                          adb_srt_rule=None,
+                          adb_fmt='tar')
+        adb_paths = []
+        for db_line_prs, adb_srt_rule, query_start, query_end in [[lambda line: int(line.split('\t')[1]),
+                                                                   lambda val: val,
+                                                                   86876786,
+                                                                   154527612],
+                                                                  [lambda line: line.rstrip().split('\t')[3],
+                                                                   SrtRules.natur,
+                                                                   'rs1000000',
+                                                                   'rs12000000']]:
+            prs_objs = []
+            for adb_fmt in ['zip', 'flat']:
+                adb_name_prefix = f'{adb_fmt}{len(adb_paths)}'
+                adb_paths.append(os.path.join(os.getcwd(),
+                                              f'bed.bed.{adb_name_prefix}.adb'))
+                del_files(adb_paths[-1])
+                idx_obj = Idx(db_file_path=self.src_file_path,
+                              adb_name_prefix=adb_name_prefix,
+                              db_line_prs=db_line_prs,
+                              adb_srt_rule=adb_srt_rule,
+                              presrt_chunk_len=8,
+                              lstarts_idx_div=2,
+                              lstarts_idx_len=5,
+                              lstarts_idx_fmt=2,
+                              bloom_fpr=0.01,
+                              adb_fmt=adb_fmt)
+                idx_obj.idx()
+                self.assertEqual(idx_obj.perf[-1][1]['merged_vals_quan'],
+                                 16)
+                prs_objs.append(Prs(db_file_path=self.src_file_path,
+                                    adb_name_prefix=adb_name_prefix,
+                                    adb_srt_rule=adb_srt_rule))
+            zip_prs_obj, flat_prs_obj = prs_objs
+            with open(adb_paths[-1], mode='rb') as adb_opened_r:
+                self.assertTrue(is_flat_adb(adb_opened_r.read(4)))
+            self.assertIsNone(zip_prs_obj.adb_mmap)
+            self.assertEqual(len(flat_prs_obj.root_paths_idx_obj[0]),
+                             4)
+            for src_bed_line in self.src_bed:
+                query = db_line_prs(src_bed_line)
+                self.assertEqual(list(flat_prs_obj.eq(query)),
+                                 list(zip_prs_obj.eq(query)))
+            self.assertEqual(list(flat_prs_obj.rng(query_start, query_end)),
+                             list(zip_prs_obj.rng(query_start, query_end)))
+            self.assertEqual(flat_prs_obj.count(query_start, query_end),
+                             zip_prs_obj.count(query_start, query_end))
+            self.assertEqual(flat_prs_obj.count(),
+                             16)
+            self.assertEqual(list(flat_prs_obj.hist(query_start, query_end)),
+                             list(zip_prs_obj.hist(query_start, query_end)))
+            self.assertEqual(list(flat_prs_obj.eq_batch([query_start, query_end, query_start])),
+                             list(zip_prs_obj.eq_batch([query_start, query_end, query_start])))
+            self.assertEqual(flat_prs_obj.bloom_filter.get_stats()['size'],
+                             zip_prs_obj.bloom_filter.get_stats()['size'])
+        self.assertEqual(type(prs_objs[1].read_lstarts_idx('0/lstarts')[1]),
+                         memoryview)
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_compact_lstarts(self):
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_bed_line in self.src_bed:
+                src_file_opened.write(src_bed_line)
+        adb_paths = []
+        for adb_name_prefix, db_line_prs, adb_srt_rule, keys_type in [['starts',
+                                                                       lambda line: int(line.split('\t')[1]),
+                                                                       lambda val: val,
+                                                                       array],
+                                                                      ['rsids',
+                                                                       lambda line: line.rstrip().split('\t')[3],
+                                                                       lambda val: val,
+                                                                       list],
+                                                                      ['natur',
+                                                                       lambda line: line.rstrip().split('\t')[3],
+                                                                       SrtRules.natur,
+                                                                       list]]:
+            adb_path = os.path.join(os.getcwd(),
+                                    f'bed.bed.{adb_name_prefix}.adb')
+            adb_paths.append(adb_path)
+            del_files(adb_path)
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=db_line_prs,
+                          adb_srt_rule=adb_srt_rule,
+                          presrt_chunk_len=8,
+                          lstarts_idx_div=2,
+                          lstarts_idx_len=5,
+                          lstarts_idx_fmt=2)
+            idx_obj.idx()
+            prs_obj = Prs(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          adb_srt_rule=adb_srt_rule)
+            lstarts_idx_obj = prs_obj.read_lstarts_idx('1/1/lstarts')
+            self.assertEqual(type(lstarts_idx_obj[0]),
+                             keys_type)
+            self.assertEqual(type(lstarts_idx_obj[1]),
+                             array)
+            self.assertEqual(list(prs_obj.rng(db_line_prs(self.src_bed[0]),
+                                              db_line_prs(self.src_bed[0]))),
+                             [self.src_bed[0]])
+            self.assertEqual(list(prs_obj.eq(db_line_prs(self.src_bed[5]))),
+                             [self.src_bed[5]] * 3)
+        self.assertEqual(list(prs_obj.rng('rs12000000',
+                                          'rs17371561')),
+                         ['1\t116545156\t116545157\trs12044852\n',
+                          '1\t201015351\t201015352\trs12122721\n',
+                          '1\t92515681\t92515682\trs17371561\n'])
+        vals_n_lstarts = [[-2 ** 63, 0], [-0.5, 2 ** 64 - 1],
+                          ['a\0b', 3], [None, 4], [2 ** 64, 5],
+                          [b'\0ab', 6], [b'\0abc', 7], [b'b', 8], [b'', 9]]
+        for vals_n_lstarts_slice in [vals_n_lstarts[:1], vals_n_lstarts[1:2],
+                                     vals_n_lstarts[2:3], vals_n_lstarts[3:4],
+                                     vals_n_lstarts[4:5], vals_n_lstarts[5:],
+                                     vals_n_lstarts]:
+            self.assertEqual(list(map(list,
+                                      load_lstarts_idx(dump_lstarts_idx(vals_n_lstarts_slice)))),
+                             list(map(list,
+                                      zip(*vals_n_lstarts_slice))))
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_bloom(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'bed.bed.bloom.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_bed_line in self.src_bed:
+                src_file_opened.write(src_bed_line)
+        del_files(self.db_zst_path,
+                  adb_path)
+        self.assertRaises(ValueError,
+                          Idx,
+                          db_file_path=self.src_file_path,
+                          adb_name_prefix='bloom',
+                          db_line_prs=None,
+                          adb_srt_rule=None,
+                          bloom_fpr=1.5)
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='bloom',
+                      db_line_prs=(lambda line:
+                                   line.rstrip().split('\t')[-1]),
+                      adb_srt_rule=SrtRules.natur,
+                      presrt_chunk_len=8,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=5,
+                      bloom_fpr=0.001)
+        idx_obj.idx()
+        self.assertEqual(idx_obj.perf[-1][1]['bloom_size'],
+                         29)
+        self.assertEqual(idx_obj.perf[-1][1]['bloom_hashes_quan'],
+                         10)
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='bloom',
+                      adb_srt_rule=SrtRules.natur)
+        for src_bed_line in self.src_bed:
+            self.assertTrue(prs_obj.exists(src_bed_line.rstrip().split('\t')[-1]))
+        self.assertEqual(list(prs_obj.eq('rs11804321', 'rs1', 'rs2', 'rs3')),
+                         [self.src_bed[5]] * 3)
+        self.assertEqual(prs_obj.bloom_filter.rejects,
+                         3)
+        self.assertEqual(list(prs_obj.eq_batch(['rs4', 'rs952084', 'rs5'])),
+                         [('rs952084', self.src_bed[1])])
+        self.assertEqual(prs_obj.count('rs6'),
+                         0)
+        self.assertEqual(prs_obj.bloom_filter.get_stats(),
+                         {'size': 29,
+                          'hashes_quan': 10,
+                          'rejects': 6,
+                          'fps': 0})
+        prs_obj.bloom_filter.bits[:] = b'\xff' * 29
+        self.assertEqual(list(prs_obj.eq('rs1')),
+                         [])
+        self.assertEqual(list(prs_obj.eq_batch(['rs2', 'rs3'])),
+                         [])
+        self.assertEqual(prs_obj.bloom_filter.fps,
+                         3)
+        self.assertEqual(Prs(db_file_path=self.src_file_path,
+                             adb_name_prefix='bloom',
+                             adb_srt_rule=SrtRules.natur,
+                             cache_size=0).bloom_filter.get_stats()['size'],
+                         29)
+        bloom_filter = BloomFilter(*calc_bloom_params(3,
+                                                      0.01))
+        bloom_filter.add([1.0, 'a', (2, True)])
+        self.assertIn([1, 'a', [2.0, 1]],
+                      bloom_filter)
+        self.assertIn([1, 'a', [2.0, 1]],
+                      load_bloom(dump_bloom(bloom_filter)))
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
 
 class VcfTests(unittest.TestCase):
     src_vcf = ['##fileformat=VCFv4.1\n',
@@ -677,6 +1026,129 @@ class VcfTests(unittest.TestCase):
                   self.db_zst_path,
                   adb_path)
 
+    def test_ival(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in ['ivalzip', 'ivalflat', 'ivalseg']]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_ival(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return ([vcf_row[0], int(vcf_row[1])],
+                    [vcf_row[0], int(vcf_row[1]) + len(vcf_row[3]) - 1])
+
+        def get_ref(vcf_line: str):
+            return vcf_line.split('\t')[3]
+
+        def ovlp_brute(query_start, query_end):
+            return [src_vcf_line
+                    for src_vcf_line in sorted(self.src_vcf[8:],
+                                               key=lambda src_vcf_line: SrtRules.natur(get_ival(src_vcf_line)[0]))
+                    if SrtRules.natur(get_ival(src_vcf_line)[0]) <= SrtRules.natur(query_end)
+                    and SrtRules.natur(get_ival(src_vcf_line)[1]) >= SrtRules.natur(query_start)]
+
+        for adb_name_prefix, adb_fmt in [['ivalzip', 'zip'],
+                                         ['ivalflat', 'flat']]:
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=get_ival,
+                          adb_srt_rule=SrtRules.natur,
+                          presrt_chunk_len=5,
+                          lstarts_idx_div=2,
+                          lstarts_idx_len=3,
+                          db_line_pld=get_ref,
+                          adb_fmt=adb_fmt,
+                          ival_flag=True)
+            idx_obj.idx()
+        os.remove(self.db_zst_path)
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf[:18]:
+                src_file_opened.write(src_vcf_line)
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='ivalseg',
+                      db_line_prs=get_ival,
+                      adb_srt_rule=SrtRules.natur,
+                      presrt_chunk_len=5,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3,
+                      ival_flag=True)
+        idx_obj.upd()
+        with open(self.src_file_path, 'a') as src_file_opened:
+            for src_vcf_line in self.src_vcf[18:]:
+                src_file_opened.write(src_vcf_line)
+        idx_obj.upd()
+        queries = [[['chr1', 567240], ['chr1', 567240]],
+                   [['chr1', 567241], ['chr1', 725515]],
+                   [['chr1', 768120], ['chr1', 768121]],
+                   [['chr1', 0], ['chr1', 10 ** 9]],
+                   [['chr14', 56564015], ['chr14', 56664634]],
+                   [['chr14', 57002116], ['chr15', 0]],
+                   [['chr14', 57002117], ['chr99', 0]]]
+        for adb_name_prefix in ['ivalzip', 'ivalflat', 'ivalseg']:
+            prs_obj = Prs(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          adb_srt_rule=SrtRules.natur)
+            self.assertTrue(prs_obj.ival_flag)
+            for query_start, query_end in queries:
+                self.assertEqual(list(prs_obj.ovlp(query_start,
+                                                   query_end)),
+                                 ovlp_brute(query_start,
+                                            query_end))
+            self.assertEqual(list(prs_obj.eq(['chr1', 768116])),
+                             [self.src_vcf[16]])
+            self.assertEqual(prs_obj.count(),
+                             20)
+            prs_obj.close()
+        self.assertEqual(len(list(prs_obj.ovlp(['chr14', 57002116]))),
+                         1)
+        self.assertEqual(len(prs_obj.root_paths_idx_paths),
+                         2)
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='ivalzip',
+                      adb_srt_rule=SrtRules.natur)
+        self.assertEqual(list(prs_obj.eq_plds(['chr1', 768116])),
+                         [(['chr1', 768116], 'AGTTTT')])
+        self.assertEqual(list(prs_obj.rng_plds(['chr14', 56868236],
+                                               ['chr14', 56898904])),
+                         [(SrtRules.natur(['chr14', 56868236]), 'TA'),
+                          (SrtRules.natur(['chr14', 56898904]), 'TTTCC')])
+        prs_obj.close()
+        idx_obj.cmpct()
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='ivalseg',
+                      adb_srt_rule=SrtRules.natur)
+        self.assertEqual(list(prs_obj.ovlp(['chr1', 768120],
+                                           ['chr1', 768121])),
+                         ovlp_brute(['chr1', 768120],
+                                    ['chr1', 768121]))
+        prs_obj.close()
+        self.assertRaises(ValueError,
+                          Idx(db_file_path=self.src_file_path,
+                              adb_name_prefix='ivalseg',
+                              db_line_prs=lambda vcf_line: get_ival(vcf_line)[0],
+                              adb_srt_rule=SrtRules.natur).upd)
+        self.assertRaises(ValueError,
+                          Idx(db_file_path=self.src_file_path,
+                              adb_name_prefix='ivalerr',
+                              db_line_prs=lambda vcf_line: (1, 0),
+                              adb_srt_rule=lambda val: val,
+                              ival_flag=True).presrt_lines,
+                          [[0, self.src_vcf[0]]])
+        noival_prs_obj = Prs(db_file_path=self.src_file_path,
+                             adb_name_prefix='ivalzip',
+                             adb_srt_rule=SrtRules.natur)
+        noival_prs_obj.ival_flag = False
+        self.assertRaises(NoIvalsError,
+                          lambda: list(noival_prs_obj.ovlp(['chr1', 0])))
+        noival_prs_obj.close()
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
     def test_mtd(self):
         adb_path = os.path.join(os.getcwd(),
                                 'vcf.vcf.mtd.adb')
@@ -717,10 +1189,1085 @@ class VcfTests(unittest.TestCase):
         self.assertEqual(len(list(prs_obj.rng('aaa', 'zzzzzzz'))), 84)
         self.assertEqual(len(list(prs_obj.rng('freebayes', 'gatk'))), 29)
         self.assertEqual(len(list(prs_obj.rng('isaac', 'isaac'))), 11)
+        cnt_prs_obj = Prs(db_file_path=self.src_file_path,
+                          adb_name_prefix='mtd',
+                          adb_srt_rule=lambda val: val)
+        self.assertEqual(cnt_prs_obj.count(), 84)
+        self.assertEqual(cnt_prs_obj.count('bwa'), 19)
+        self.assertEqual(cnt_prs_obj.count('aaa', 'zzzzzzz'), 84)
+        self.assertEqual(cnt_prs_obj.count('freebayes', 'gatk'), 29)
+        self.assertEqual(cnt_prs_obj.count('freebayet', 'gatj'), 0)
+        self.assertTrue(cnt_prs_obj.exists('cgi'))
+        self.assertFalse(cnt_prs_obj.exists('cgj'))
+        self.assertEqual(list(cnt_prs_obj.hist('aaa', 'zzzzzzz')),
+                         [('bwa', 19),
+                          ('cgi', 1),
+                          ('freebayes', 12),
+                          ('gatk', 17),
+                          ('isaac', 11),
+                          ('platypus', 13),
+                          ('strelka', 11)])
+        self.assertEqual(list(cnt_prs_obj.distinct('c', 'h')),
+                         ['cgi',
+                          'freebayes',
+                          'gatk'])
+        self.assertEqual(cnt_prs_obj.frame_cache.get_stats()['misses'], 0)
+        self.assertEqual(cnt_prs_obj.frame_cache.get_stats()['hits'], 0)
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
+    def test_par_presrt(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in ['seq', 'par']]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_pos(vcf_line: str):
+            return int(vcf_line.split('\t')[1])
+
+        for adb_name_prefix, presrt_procs in [['seq', 1],
+                                              ['par', 3]]:
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=get_pos,
+                          adb_srt_rule=lambda val: val,
+                          compr_frame_size=256,
+                          compr_threads=2,
+                          presrt_chunk_len=4,
+                          presrt_procs=presrt_procs,
+                          lstarts_idx_div=2,
+                          lstarts_idx_len=3)
+            idx_obj.idx()
+        self.assertGreater(len(read_seek_table(self.db_zst_path)[1]), 5)
+        seq_prs_obj = Prs(db_file_path=self.src_file_path,
+                          adb_name_prefix='seq',
+                          adb_srt_rule=lambda val: val)
+        par_prs_obj = Prs(db_file_path=self.src_file_path,
+                          adb_name_prefix='par',
+                          adb_srt_rule=lambda val: val)
+        self.assertEqual(list(par_prs_obj.rng(0, inf)),
+                         sorted(self.src_vcf[8:],
+                                key=get_pos))
+        self.assertEqual(list(par_prs_obj.rng(0, inf)),
+                         list(seq_prs_obj.rng(0, inf)))
+        self.assertEqual(list(par_prs_obj.eq(56551760)),
+                         [self.src_vcf[20]])
+
+        def get_pos_err(vcf_line: str):
+            if vcf_line.split('\t')[1] == '56664634':
+                raise ValueError(vcf_line)
+            return get_pos(vcf_line)
+
+        dir_names = sorted(os.listdir(os.getcwd()))
+        err_idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix='parerr',
+                          db_line_prs=get_pos_err,
+                          adb_srt_rule=lambda val: val,
+                          presrt_chunk_len=2,
+                          presrt_procs=3)
+        self.assertRaises(ValueError,
+                          err_idx_obj.idx)
+        self.assertEqual(sorted(os.listdir(os.getcwd())),
+                         dir_names)
+        self.assertEqual(err_idx_obj.presrtd_idxs_opened,
+                         [])
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_presrt_mem_limit(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in ['unlim', 'lim']]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        prs_objs = []
+        for adb_name_prefix, presrt_mem_limit in [['unlim', None],
+                                                  ['lim', '4K']]:
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=get_alleles,
+                          adb_srt_rule=SrtRules.natur,
+                          presrt_mem_limit=presrt_mem_limit,
+                          lstarts_idx_div=3,
+                          lstarts_idx_len=4)
+            idx_obj.idx()
+            prs_objs.append(Prs(db_file_path=self.src_file_path,
+                                adb_name_prefix=adb_name_prefix,
+                                adb_srt_rule=SrtRules.natur))
+        self.assertEqual(len(idx_obj.presrtd_idxs_opened), 4)
+        self.assertEqual(list(prs_objs[1].rng('chr1', 'chr99')),
+                         list(prs_objs[0].rng('chr1', 'chr99')))
+        self.assertEqual(len(list(prs_objs[1].rng('chr1', 'chr99'))),
+                         28)
+        self.assertEqual(list(prs_objs[1].eq('chr14:56783534:G')),
+                         [self.src_vcf[24]])
+        par_idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix='lim',
+                          db_line_prs=get_alleles,
+                          adb_srt_rule=SrtRules.natur,
+                          presrt_procs=4,
+                          presrt_mem_limit='4K')
+        init_presrt_worker(par_idx_obj,
+                           os.getcwd())
+        self.assertEqual(par_idx_obj.presrt_mem_limit,
+                         1024)
+        self.assertEqual(parse_size(' 4k'), 4096)
+        self.assertEqual(parse_size('1.5GB'), 1610612736)
+        self.assertEqual(parse_size(100), 100)
+        self.assertRaises(ValueError,
+                          parse_size,
+                          '4 parrots')
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_scan_lines(self):
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line.replace('PASS',
+                                                           'ПРОЙДЕНО'))
+        del_files(self.db_zst_path)
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='scan',
+                      db_line_prs=None,
+                      adb_srt_rule=None,
+                      compr_frame_size=100)
+        idx_obj.crt_db_zst()
+        frame_c_starts, frame_d_starts = read_seek_table(self.db_zst_path)
+        self.assertEqual(frame_d_starts[-1],
+                         os.path.getsize(self.src_file_path))
+        scanned_lines = list(idx_obj.decode_lines(scan_lines(decompress_frames(self.db_zst_path,
+                                                                               frame_c_starts,
+                                                                               frame_d_starts,
+                                                                               chunk_size=300))))
+        read_lines = []
+        with TextIOWrapper(SeekableZstdFile(self.db_zst_path)) as db_zst_opened:
+            while True:
+                db_zst_lstart = db_zst_opened.tell()
+                db_zst_line = db_zst_opened.readline()
+                if not db_zst_line:
+                    break
+                read_lines.append((db_zst_lstart,
+                                   db_zst_line.rstrip()))
+        self.assertEqual(scanned_lines,
+                         read_lines)
+        self.assertEqual(list(idx_obj.decode_lines(scan_lines(decompress_frames(self.db_zst_path,
+                                                                                frame_c_starts,
+                                                                                frame_d_starts)),
+                                                   read_lines[9][0],
+                                                   read_lines[11][0])),
+                         read_lines[9:11])
+        del_files(self.src_file_path,
+                  self.db_zst_path)
+
+    def test_frame_cache(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'vcf.vcf.frames.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line.replace('PASS',
+                                                           'ПРОЙДЕНО'))
+        del_files(self.db_zst_path,
+                  adb_path)
+
+        def get_mtds(vcf_line: str):
+            return tuple(vcf_line.split('\t')[7].split(';')[0][4:].split(','))
+
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='frames',
+                      db_line_prs=get_mtds,
+                      adb_srt_rule=SrtRules.natur,
+                      compr_frame_size=100,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3)
+        idx_obj.idx()
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='frames',
+                      adb_srt_rule=SrtRules.natur)
+        frames_quan = len(read_seek_table(self.db_zst_path)[1]) - 1
+        with TextIOWrapper(SeekableZstdFile(self.db_zst_path)) as db_zst_opened:
+            while True:
+                db_zst_lstart = db_zst_opened.tell()
+                db_zst_line = db_zst_opened.readline()
+                self.assertEqual(prs_obj.read_line(db_zst_lstart),
+                                 db_zst_line)
+                if not db_zst_line:
+                    break
+        self.assertEqual(prs_obj.frame_cache.misses,
+                         frames_quan)
+        self.assertGreater(prs_obj.frame_cache.hits,
+                           0)
+        nocache_prs_obj = Prs(db_file_path=self.src_file_path,
+                              adb_name_prefix='frames',
+                              adb_srt_rule=SrtRules.natur,
+                              frame_cache_size=0)
+        self.assertEqual(list(nocache_prs_obj.rng('a', 'z')),
+                         list(prs_obj.rng('a', 'z')))
+        self.assertEqual(len(list(prs_obj.rng('a', 'z'))),
+                         54)
+        self.assertEqual(len(nocache_prs_obj.frame_cache),
+                         0)
+        self.assertEqual(prs_obj.frame_cache.misses,
+                         frames_quan)
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
+    def test_fetch(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'vcf.vcf.fetch.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  adb_path)
+
+        def get_mtds(vcf_line: str):
+            return tuple(vcf_line.split('\t')[7].split(';')[0][4:].split(','))
+
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='fetch',
+                      db_line_prs=get_mtds,
+                      adb_srt_rule=SrtRules.natur,
+                      compr_frame_size=100,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3)
+        idx_obj.idx()
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='fetch',
+                      adb_srt_rule=SrtRules.natur,
+                      frame_cache_size=0)
+        lstarts = list(prs_obj.rng_lstarts('a', 'z'))
+        self.assertEqual(list(map(prs_obj.read_line,
+                                  lstarts)),
+                         list(prs_obj.rng('a', 'z')))
+        self.assertEqual(list(map(prs_obj.read_line,
+                                  prs_obj.eq_lstarts('cgi'))),
+                         [self.src_vcf[15]])
+        prs_obj.frame_cache.misses = 0
+        self.assertEqual(list(prs_obj.fetch(lstarts)),
+                         self.src_vcf[8:])
+        self.assertEqual(prs_obj.frame_cache.misses,
+                         len(prs_obj.frame_d_starts) -
+                         bisect_right(prs_obj.frame_d_starts,
+                                      min(lstarts)))
+        self.assertEqual(list(prs_obj.fetch(lstarts,
+                                            ordr='key')),
+                         list(dict.fromkeys(prs_obj.rng('a', 'z'))))
+        self.assertEqual(list(prs_obj.fetch([])),
+                         [])
+        self.assertRaises(ValueError,
+                          list,
+                          prs_obj.fetch(lstarts,
+                                        ordr='input'))
         del_files(self.src_file_path,
                   self.db_zst_path,
                   adb_path)
 
+    def test_plds(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in ['pld1', 'pld2', 'nopld']]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        def get_ref_n_alt(vcf_line: str):
+            return tuple(vcf_line.split('\t')[3:5])
+
+        for adb_name_prefix, lstarts_idx_fmt, db_line_pld in [['pld1', 1, get_ref_n_alt],
+                                                              ['pld2', 2, get_ref_n_alt],
+                                                              ['nopld', 2, None]]:
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=get_alleles,
+                          adb_srt_rule=SrtRules.natur,
+                          presrt_chunk_len=5,
+                          lstarts_idx_div=2,
+                          lstarts_idx_len=3,
+                          lstarts_idx_fmt=lstarts_idx_fmt,
+                          db_line_pld=db_line_pld)
+            idx_obj.idx()
+        for adb_name_prefix in ['pld1', 'pld2']:
+            prs_obj = Prs(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          adb_srt_rule=SrtRules.natur)
+            self.assertEqual(list(prs_obj.eq_plds('chr1:724137:TAATGGAATGG',
+                                                  'chr1:1:A')),
+                             [('chr1:724137:TAATGGAATGG',
+                               ('TAATGG', 'TAATGGAATGGAATGGAATGG,TAATGGAATGG'))])
+            rng_plds = list(prs_obj.rng_plds('chr14', 'chr14:99999999'))
+            self.assertEqual(len(rng_plds),
+                             15)
+            self.assertEqual(rng_plds[0][1],
+                             ('G', 'GCATACATA'))
+            self.assertEqual(list(map(itemgetter(1),
+                                      rng_plds)),
+                             [get_ref_n_alt(vcf_line)
+                              for vcf_line in prs_obj.rng('chr14', 'chr14:99999999')])
+            self.assertIsNone(Prs(db_file_path=self.src_file_path,
+                                  adb_name_prefix=adb_name_prefix,
+                                  adb_srt_rule=SrtRules.natur).db_zst_opened_r)
+        nopld_prs_obj = Prs(db_file_path=self.src_file_path,
+                            adb_name_prefix='nopld',
+                            adb_srt_rule=SrtRules.natur)
+        self.assertEqual(list(nopld_prs_obj.eq('chr1:724137:TAATGGAATGG')),
+                         [self.src_vcf[10]])
+        self.assertRaises(NoPldsError,
+                          list,
+                          nopld_prs_obj.eq_plds('chr1:724137:TAATGGAATGG'))
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_upd(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  adb_file_name)
+                     for adb_file_name in ['vcf.vcf.upd.adb', 'full.vcf.full.adb']]
+        full_db_zst_path = os.path.join(os.getcwd(),
+                                        'full.vcf.zst')
+        del_files(self.db_zst_path,
+                  full_db_zst_path,
+                  *adb_paths)
+
+        def get_pos(vcf_line: str):
+            return int(vcf_line.split('\t')[1])
+
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='upd',
+                      db_line_prs=get_pos,
+                      adb_srt_rule=lambda val: val,
+                      compr_frame_size=256,
+                      presrt_chunk_len=4,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3,
+                      bloom_fpr=0.01)
+        for src_vcf_start, src_vcf_end in [[0, 14], [14, 22], [22, 28], [28, 28]]:
+            with open(self.src_file_path, 'a') as src_file_opened:
+                for src_vcf_line in self.src_vcf[src_vcf_start:
+                                                 src_vcf_end]:
+                    src_file_opened.write(src_vcf_line)
+            idx_obj.upd()
+        self.assertEqual(idx_obj.perf[-1][0],
+                         'crt_adb')
+        self.assertEqual(idx_obj.perf[-1][1]['merged_vals_quan'],
+                         6)
+        self.assertEqual(SeekableZstdFile(self.db_zst_path).read().decode(),
+                         ''.join(self.src_vcf))
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='upd',
+                      adb_srt_rule=lambda val: val)
+        self.assertEqual(prs_obj.root_paths_idx_paths,
+                         ['paths',
+                          'seg1/paths',
+                          'seg2/paths'])
+        srtd_src_vcf = sorted(self.src_vcf[8:],
+                              key=get_pos)
+        self.assertEqual(list(prs_obj.rng(0, inf)),
+                         srtd_src_vcf)
+        self.assertEqual(list(prs_obj.eq(126113, 56551760, 57002112)),
+                         [self.src_vcf[8],
+                          self.src_vcf[20],
+                          self.src_vcf[27]])
+        self.assertEqual(list(prs_obj.eq_batch([57002112, 126113])),
+                         [(57002112, self.src_vcf[27]),
+                          (126113, self.src_vcf[8])])
+        self.assertEqual(prs_obj.count(),
+                         20)
+        self.assertEqual(prs_obj.count(700000, 56600000),
+                         12)
+        self.assertEqual(list(prs_obj.hist(56868236, 57002112)),
+                         [(56868236, 1),
+                          (56898904, 1),
+                          (57002112, 1)])
+        self.assertEqual(len(prs_obj.bloom_filters),
+                         3)
+        cmpct_thread = idx_obj.cmpct(bg_flag=True)
+        cmpct_thread.join()
+        self.assertEqual(idx_obj.perf[-1][0],
+                         'cmpct_segs')
+        self.assertEqual(idx_obj.perf[-1][1],
+                         {'segs_quan': 2,
+                          'merged_vals_quan': 20})
+        cmpctd_prs_obj = Prs(db_file_path=self.src_file_path,
+                             adb_name_prefix='upd',
+                             adb_srt_rule=lambda val: val)
+        self.assertEqual(cmpctd_prs_obj.root_paths_idx_paths,
+                         ['paths'])
+        self.assertEqual(list(cmpctd_prs_obj.rng(0, inf)),
+                         srtd_src_vcf)
+        self.assertEqual(list(cmpctd_prs_obj.eq(56551760)),
+                         [self.src_vcf[20]])
+        self.assertEqual(cmpctd_prs_obj.bloom_filter.get_stats()['rejects'],
+                         0)
+        with ZipFile(adb_paths[0]) as adb_opened_r:
+            self.assertEqual(Idx.read_adb_ends(adb_opened_r),
+                             [len(''.join(self.src_vcf))])
+        idx_obj.cmpct()
+        self.assertEqual(idx_obj.perf[-1][1]['segs_quan'],
+                         0)
+        with open(self.src_file_path, 'a') as src_file_opened:
+            src_file_opened.write(self.src_vcf[-1])
+        flat_idx_obj = Idx(db_file_path=self.src_file_path,
+                           adb_name_prefix='upd',
+                           db_line_prs=get_pos,
+                           adb_srt_rule=lambda val: val,
+                           adb_fmt='flat')
+        self.assertRaises(ValueError,
+                          flat_idx_obj.upd)
+        db_zst_size = os.path.getsize(self.db_zst_path)
+        for mism_kwargs in [{'db_line_pld': get_pos},
+                            {'ival_flag': True},
+                            {'key_enc': True}]:
+            mism_idx_obj = Idx(db_file_path=self.src_file_path,
+                               adb_name_prefix='upd',
+                               db_line_prs=get_pos,
+                               adb_srt_rule=lambda val: val,
+                               **mism_kwargs)
+            self.assertRaises(ValueError,
+                              mism_idx_obj.upd)
+            self.assertRaises(ValueError,
+                              mism_idx_obj.cmpct_segs)
+        self.assertEqual(os.path.getsize(self.db_zst_path),
+                         db_zst_size)
+        self.assertRaises(ValueError,
+                          dump_lstarts_idx,
+                          [[1, 0], [2, 10, 'A']])
+        self.assertEqual(Prs(db_file_path=self.src_file_path,
+                             adb_name_prefix='upd',
+                             adb_srt_rule=lambda val: val).count(),
+                         20)
+        os.rename(self.db_zst_path,
+                  full_db_zst_path)
+        full_idx_obj = Idx(db_file_path=full_db_zst_path,
+                           adb_name_prefix='full',
+                           db_line_prs=get_pos,
+                           adb_srt_rule=lambda val: val,
+                           adb_fmt='flat')
+        full_idx_obj.idx()
+        self.assertRaises(ValueError,
+                          full_idx_obj.upd)
+        del_files(self.src_file_path,
+                  full_db_zst_path,
+                  *adb_paths)
+
+    def test_multi_idx(self):
+        adb_name_prefixes = ['mpos', 'malleles', 'mflat', 'spos', 'salleles', 'sflat']
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in adb_name_prefixes]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_pos(vcf_line: str):
+            return int(vcf_line.split('\t')[1])
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        def get_idx_objs(adb_name_prefix_start: str):
+            return [Idx(db_file_path=self.src_file_path,
+                        adb_name_prefix=f'{adb_name_prefix_start}{adb_name_prefix_end}',
+                        db_line_prs=db_line_prs,
+                        adb_srt_rule=adb_srt_rule,
+                        presrt_chunk_len=4,
+                        lstarts_idx_div=2,
+                        lstarts_idx_len=3,
+                        adb_fmt=adb_fmt)
+                    for adb_name_prefix_end, db_line_prs, adb_srt_rule, adb_fmt in [['pos', get_pos, lambda val: val, 'zip'],
+                                                                                    ['alleles', get_alleles, SrtRules.natur, 'zip'],
+                                                                                    ['flat', get_alleles, SrtRules.natur, 'flat']]]
+
+        multi_idx_obj = MultiIdx(get_idx_objs('m'))
+        multi_idx_obj.idx()
+        self.assertEqual(list(map(itemgetter(0),
+                                  multi_idx_obj.perf)),
+                         ['crt_db_zst'])
+        for idx_obj in get_idx_objs('s'):
+            idx_obj.idx()
+        self.assertEqual(multi_idx_obj.idx_objs[1].perf[-1][1]['merged_vals_quan'],
+                         28)
+        for adb_name_prefix_end, adb_srt_rule, queries in [['pos', lambda val: val, [126113, 56868236, 1]],
+                                                           ['alleles', SrtRules.natur, ['chr1:763769:ATT', 'chr14:56783534:G']],
+                                                           ['flat', SrtRules.natur, ['chr1:763769:ATT', 'chr14:56783534:G']]]:
+            multi_prs_obj, single_prs_obj = [Prs(db_file_path=self.src_file_path,
+                                                 adb_name_prefix=f'{adb_name_prefix_start}{adb_name_prefix_end}',
+                                                 adb_srt_rule=adb_srt_rule)
+                                             for adb_name_prefix_start in ['m', 's']]
+            self.assertEqual(list(multi_prs_obj.eq(*queries)),
+                             list(single_prs_obj.eq(*queries)))
+            self.assertEqual(list(multi_prs_obj.rng_lstarts(queries[0], queries[1])),
+                             list(single_prs_obj.rng_lstarts(queries[0], queries[1])))
+            self.assertEqual(multi_prs_obj.count(),
+                             single_prs_obj.count())
+        self.assertEqual(list(Prs(db_file_path=self.src_file_path,
+                                  adb_name_prefix='mpos',
+                                  adb_srt_rule=lambda val: val).eq(56868236)),
+                         [self.src_vcf[25]])
+        del_files(adb_paths[1])
+        multi_idx_obj = MultiIdx(get_idx_objs('m'))
+        multi_idx_obj.idx()
+        self.assertEqual(list(map(itemgetter(0),
+                                  multi_idx_obj.perf)),
+                         ['presrt_idxs'])
+        self.assertEqual([idx_obj.perf
+                          for idx_obj in multi_idx_obj.idx_objs[::2]],
+                         [[], []])
+        self.assertEqual(multi_idx_obj.idx_objs[1].perf[0][1]['merged_vals_quan'],
+                         28)
+        self.assertRaises(ValueError,
+                          MultiIdx,
+                          multi_idx_obj.idx_objs + [Idx(db_file_path='other.vcf',
+                                                        adb_name_prefix='other',
+                                                        db_line_prs=get_pos,
+                                                        adb_srt_rule=lambda val: val)])
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_presrt_in_compr_err(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in ['err', 'merr']]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_alleles(vcf_line: str,
+                        err_flag: bool = False):
+            vcf_row = vcf_line.split('\t')
+            if err_flag \
+                    and vcf_row[1] == '56412076':
+                raise ValueError(vcf_line)
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        def get_idx_obj(adb_name_prefix: str,
+                        err_flag: bool):
+            return Idx(db_file_path=self.src_file_path,
+                       adb_name_prefix=adb_name_prefix,
+                       db_line_prs=get_alleles,
+                       adb_srt_rule=SrtRules.natur,
+                       db_line_prs_kwargs={'err_flag': err_flag},
+                       compr_chunk_size=64,
+                       presrt_chunk_len=5,
+                       lstarts_idx_div=2,
+                       lstarts_idx_len=3)
+
+        for idx_obj_kind in ['single', 'multi']:
+            for err_flag in [True, False]:
+                if idx_obj_kind == 'single':
+                    any_idx_obj = get_idx_obj('err',
+                                              err_flag)
+                else:
+                    any_idx_obj = MultiIdx([get_idx_obj('merr',
+                                                        err_flag)])
+                if err_flag:
+                    self.assertRaises(ValueError,
+                                      any_idx_obj.idx)
+                    self.assertFalse(os.path.exists(self.db_zst_path))
+                    self.assertFalse(os.path.exists(f'{self.db_zst_path}.tmp'))
+                else:
+                    any_idx_obj.idx()
+            self.assertEqual(Prs(db_file_path=self.src_file_path,
+                                 adb_name_prefix='err' if idx_obj_kind == 'single' else 'merr',
+                                 adb_srt_rule=SrtRules.natur).count(),
+                             28)
+            del_files(self.db_zst_path)
+        del_files(self.src_file_path,
+                  *adb_paths)
+
+    def test_async_prs(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'vcf.vcf.async.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  adb_path)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='async',
+                      db_line_prs=get_alleles,
+                      adb_srt_rule=SrtRules.natur,
+                      compr_frame_size=256,
+                      presrt_chunk_len=5,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3)
+        idx_obj.idx()
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='async',
+                      adb_srt_rule=SrtRules.natur)
+        queries = ['chr1:763769:ATT', 'chr14:56783534:G', 'chr1:1:A', 'chr1:724137:TAATGGAATGG']
+
+        async def query_async():
+            async with AsyncPrs(db_file_path=self.src_file_path,
+                                adb_name_prefix='async',
+                                adb_srt_rule=SrtRules.natur,
+                                prs_objs_quan=2,
+                                tasks_quan=3,
+                                rng_chunk_len=4) as async_prs_obj:
+                eq_results = await asyncio.gather(*[async_prs_obj.eq(query)
+                                                    for query in queries])
+                rng_results = await asyncio.gather(*[asyncio.create_task(self.collect_async(async_prs_obj.rng('chr1',
+                                                                                                              'chr14:56700000')))
+                                                     for _ in range(10)])
+                for _ in range(3):
+                    async with aclosing(async_prs_obj.rng('chr1',
+                                                          'chr14')) as lines:
+                        async for line in lines:
+                            break
+                rng_lstarts = [lstart
+                               async for lstart in async_prs_obj.rng_lstarts('chr14',
+                                                                             'chr14:99999999')]
+                return (eq_results,
+                        rng_results,
+                        rng_lstarts,
+                        await async_prs_obj.eq_batch(queries),
+                        await async_prs_obj.count(),
+                        await async_prs_obj.exists('chr1:1:A'),
+                        len(async_prs_obj.prs_objs))
+
+        eq_results, rng_results, rng_lstarts, eq_batch_results, vals_quan, exists_flag, prs_objs_quan = asyncio.run(query_async())
+        self.assertEqual(eq_results,
+                         [list(prs_obj.eq(query))
+                          for query in queries])
+        self.assertEqual(rng_results,
+                         [list(prs_obj.rng('chr1',
+                                           'chr14:56700000'))] * 10)
+        self.assertEqual(len(rng_results[0]),
+                         21)
+        self.assertEqual(rng_lstarts,
+                         list(prs_obj.rng_lstarts('chr14',
+                                                  'chr14:99999999')))
+        self.assertEqual(eq_batch_results,
+                         list(prs_obj.eq_batch(queries)))
+        self.assertEqual(vals_quan,
+                         28)
+        self.assertFalse(exists_flag)
+        self.assertEqual(prs_objs_quan,
+                         2)
+        prs_obj.close()
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
+    def test_par_prs(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'vcf.vcf.par.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf[:20]:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  adb_path)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='par',
+                      db_line_prs=get_alleles,
+                      adb_srt_rule='natur',
+                      compr_frame_size=256,
+                      presrt_chunk_len=5,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3)
+        for src_vcf_start, src_vcf_end in [[0, 0], [20, 28]]:
+            with open(self.src_file_path, 'a') as src_file_opened:
+                for src_vcf_line in self.src_vcf[src_vcf_start:
+                                                 src_vcf_end]:
+                    src_file_opened.write(src_vcf_line)
+            idx_obj.upd()
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='par',
+                      adb_srt_rule='natur')
+        par_prs_obj = ParPrs(db_file_path=self.src_file_path,
+                             adb_name_prefix='par',
+                             adb_srt_rule='natur',
+                             procs=2,
+                             queries_chunk_len=2,
+                             lstarts_idxs_chunk_len=2)
+        self.assertEqual(par_prs_obj.root_paths_idx_paths,
+                         ['paths',
+                          'seg1/paths'])
+        queries = ['chr1:763769:ATT', 'chr14:56783534:G', 'chr1:1:A', 'chr1:724137:TAATGGAATGG', 'chr14:57002112:A']
+        self.assertEqual(list(par_prs_obj.eq(*queries)),
+                         list(prs_obj.eq(*queries)))
+        self.assertEqual(list(par_prs_obj.eq_batch(queries)),
+                         list(prs_obj.eq_batch(queries)))
+        for query_start, query_end in [['chr1', 'chr14:56700000'], ['chr1', 'chr99'], ['chr2', 'chr3']]:
+            self.assertEqual(list(par_prs_obj.rng(query_start,
+                                                  query_end)),
+                             list(prs_obj.rng(query_start,
+                                              query_end)))
+            self.assertEqual(list(par_prs_obj.rng_lstarts(query_start,
+                                                          query_end)),
+                             list(prs_obj.rng_lstarts(query_start,
+                                                      query_end)))
+        self.assertEqual(len(list(par_prs_obj.rng('chr1',
+                                                  'chr99'))),
+                         28)
+        self.assertRaises(ValueError,
+                          lambda: list(par_prs_obj.eq_batch(queries,
+                                                            'fetch')))
+        par_prs_obj.close()
+        prs_obj.close()
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
+    def test_join(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'vcf.vcf.join.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  adb_path)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='join',
+                      db_line_prs=get_alleles,
+                      adb_srt_rule=SrtRules.natur,
+                      compr_frame_size=256,
+                      presrt_chunk_len=5,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3,
+                      bloom_fpr=0.01)
+        idx_obj.idx()
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='join',
+                      adb_srt_rule=SrtRules.natur)
+        prs_obj.presrt_blk_len = 2
+        recs = [[rec_num, allele]
+                for rec_num, allele in enumerate(['chr14:56783534:G', 'chr1:1:A', 'chr1:724137:TAATGGAATGG',
+                                                  'chr1:763769:ATT', 'chr14:57002112:A', 'chr2:5:C',
+                                                  'chr1:126113:A', 'chr1:724137:TAATGGAATGG'])]
+        srtd_recs = sorted(recs,
+                           key=lambda rec: SrtRules.natur(rec[1]))
+        exp_join_res = []
+        for rec in srtd_recs:
+            lines = list(prs_obj.eq(rec[1]))
+            if not lines:
+                exp_join_res.append((rec, None))
+            for line in lines:
+                exp_join_res.append((rec, line))
+        self.assertEqual(sum(line is None
+                             for rec, line in exp_join_res),
+                         2)
+        for recs_chunk_len in [3, 100]:
+            self.assertEqual(list(prs_obj.join(recs,
+                                               itemgetter(1),
+                                               recs_chunk_len=recs_chunk_len)),
+                             exp_join_res)
+            self.assertEqual(list(prs_obj.join(srtd_recs,
+                                               itemgetter(1),
+                                               True,
+                                               recs_chunk_len)),
+                             exp_join_res)
+        self.assertEqual(list(prs_obj.join(['chr1:1:A', 'chr1:763769:ATT'])),
+                         [('chr1:1:A', None),
+                          ('chr1:763769:ATT', self.src_vcf[14])])
+        self.assertEqual(list(prs_obj.join([])),
+                         [])
+        prs_obj.close()
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
+    def test_pfx(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in ['pfxstr', 'pfxflat', 'pfxenc', 'pfxnatur']]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        def get_str(src_str: str):
+            return src_str
+
+        def pfx_brute(pfx):
+            return [vcf_line
+                    for allele, vcf_line in sorted([allele, vcf_line]
+                                                   for vcf_line in self.src_vcf[8:]
+                                                   for allele in get_alleles(vcf_line))
+                    if allele.startswith(pfx)]
+
+        prs_objs = []
+        for adb_name_prefix, adb_srt_rule, adb_fmt, key_enc in [['pfxstr', get_str, 'zip', False],
+                                                                ['pfxflat', get_str, 'flat', False],
+                                                                ['pfxenc', get_str, 'zip', True]]:
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=get_alleles,
+                          adb_srt_rule=adb_srt_rule,
+                          presrt_chunk_len=5,
+                          lstarts_idx_div=2,
+                          lstarts_idx_len=3,
+                          lstarts_idx_fmt=2,
+                          adb_fmt=adb_fmt,
+                          key_enc=key_enc)
+            idx_obj.idx()
+            prs_objs.append(Prs(db_file_path=self.src_file_path,
+                                adb_name_prefix=adb_name_prefix,
+                                adb_srt_rule=adb_srt_rule,
+                                key_enc=key_enc))
+        for prs_obj in prs_objs:
+            for pfx in ['chr1:', 'chr14:566', 'chr14:56783534:', 'chr1:724137:TAATGGAATGG', 'chr2']:
+                self.assertEqual(list(prs_obj.pfx(pfx)),
+                                 pfx_brute(pfx))
+            self.assertEqual(len(list(prs_obj.pfx('chr1'))),
+                             28)
+            self.assertEqual(list(prs_obj.pfx('chr14:566',
+                                              limit=2)),
+                             pfx_brute('chr14:566')[:2])
+            with self.assertRaises(ValueError):
+                list(prs_obj.pfx(''))
+            prs_obj.close()
+        natur_idx_obj = Idx(db_file_path=self.src_file_path,
+                            adb_name_prefix='pfxnatur',
+                            db_line_prs=get_alleles,
+                            adb_srt_rule=SrtRules.natur,
+                            presrt_chunk_len=5,
+                            lstarts_idx_div=2,
+                            lstarts_idx_len=3)
+        natur_idx_obj.idx()
+        natur_prs_obj = Prs(db_file_path=self.src_file_path,
+                            adb_name_prefix='pfxnatur',
+                            adb_srt_rule=SrtRules.natur)
+        self.assertEqual(list(natur_prs_obj.pfx('chr14:56783534:')),
+                         pfx_brute('chr14:56783534:'))
+        with self.assertRaises(ValueError):
+            list(natur_prs_obj.pfx('chr14:566'))
+        natur_prs_obj.close()
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    def test_metrics(self):
+        adb_path = os.path.join(os.getcwd(),
+                                'vcf.vcf.mtr.adb')
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  adb_path)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        idx_obj = Idx(db_file_path=self.src_file_path,
+                      adb_name_prefix='mtr',
+                      db_line_prs=get_alleles,
+                      adb_srt_rule=SrtRules.natur,
+                      presrt_chunk_len=5,
+                      lstarts_idx_div=2,
+                      lstarts_idx_len=3)
+        idx_obj.idx()
+        idx_metrics = idx_obj.get_metrics()
+        self.assertEqual(idx_metrics['counters']['lines_scanned'],
+                         len(self.src_vcf[8:]))
+        self.assertEqual(idx_metrics['counters']['keys_emitted'],
+                         28)
+        self.assertEqual(idx_metrics['counters']['keys_merged'],
+                         28)
+        self.assertEqual(idx_metrics['counters']['spill_runs'],
+                         6)
+        self.assertEqual(idx_metrics['counters']['bytes_compressed'],
+                         os.path.getsize(self.src_file_path))
+        self.assertEqual(set(idx_metrics['timers']),
+                         {'crt_db_zst', 'crt_adb'})
+        prs_obj = Prs(db_file_path=self.src_file_path,
+                      adb_name_prefix='mtr',
+                      adb_srt_rule=SrtRules.natur)
+        spans = []
+        prs_obj.metrics.add_trace_func(lambda span_name, span_attrs: spans.append([span_name,
+                                                                                   span_attrs]))
+        lines = list(prs_obj.eq('chr14:56783534:C', 'chr14:56783534:C', 'chr1:1:A'))
+        self.assertEqual(len(lines),
+                         2)
+        self.assertEqual([[span_name, span_attrs['query']]
+                          for span_name, span_attrs in spans],
+                         [['eq', 'chr14:56783534:C'],
+                          ['eq', 'chr14:56783534:C'],
+                          ['eq', 'chr1:1:A']])
+        self.assertGreater(spans[0][1]['counters']['leaves_loaded'],
+                           0)
+        self.assertEqual(spans[0][1]['counters']['frames_decompressed'],
+                         1)
+        self.assertEqual(spans[1][1]['counters'],
+                         {'frames_touched': 1,
+                          'seeks': 1,
+                          'lines_returned': 1})
+        self.assertNotIn('lines_returned',
+                         spans[2][1]['counters'])
+        list(prs_obj.rng('chr1', 'chr1:800000'))
+        self.assertEqual(spans[-1][1]['counters']['lines_returned'],
+                         len(list(prs_obj.rng('chr1', 'chr1:800000'))))
+        prs_metrics = json.loads(prs_obj.get_metrics_json())
+        self.assertEqual(prs_metrics['timers']['eq']['calls'],
+                         3)
+        self.assertEqual(prs_metrics['timers']['rng']['calls'],
+                         2)
+        self.assertEqual(prs_metrics['counters']['leaves_loaded'],
+                         prs_metrics['adb_cache']['misses'] - prs_metrics['counters']['nodes_loaded'])
+        prs_obj.metrics.reset()
+        self.assertEqual(prs_obj.get_metrics()['counters'],
+                         {})
+        prs_obj.close()
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  adb_path)
+
+    def test_key_enc(self):
+        adb_paths = [os.path.join(os.getcwd(),
+                                  f'vcf.vcf.{adb_name_prefix}.adb')
+                     for adb_name_prefix in ['enc', 'noenc']]
+        with open(self.src_file_path, 'w') as src_file_opened:
+            for src_vcf_line in self.src_vcf:
+                src_file_opened.write(src_vcf_line)
+        del_files(self.db_zst_path,
+                  *adb_paths)
+
+        def get_alleles(vcf_line: str):
+            vcf_row = vcf_line.split('\t')
+            return tuple(f'{vcf_row[0]}:{vcf_row[1]}:{alt}'
+                         for alt in vcf_row[4].split(','))
+
+        def get_ref(vcf_line: str):
+            return vcf_line.split('\t')[3]
+
+        prs_objs = []
+        for adb_name_prefix, key_enc in [['enc', True],
+                                         ['noenc', False]]:
+            idx_obj = Idx(db_file_path=self.src_file_path,
+                          adb_name_prefix=adb_name_prefix,
+                          db_line_prs=get_alleles,
+                          adb_srt_rule=SrtRules.natur,
+                          presrt_chunk_len=5,
+                          lstarts_idx_div=2,
+                          lstarts_idx_len=3,
+                          lstarts_idx_fmt=2,
+                          db_line_pld=get_ref,
+                          bloom_fpr=0.01,
+                          key_enc=key_enc)
+            idx_obj.idx()
+            prs_objs.append(Prs(db_file_path=self.src_file_path,
+                                adb_name_prefix=adb_name_prefix,
+                                adb_srt_rule=SrtRules.natur,
+                                key_enc=key_enc))
+        enc_prs_obj, noenc_prs_obj = prs_objs
+        self.assertEqual(type(enc_prs_obj.read_lstarts_idx('1/1/lstarts')[0][0]),
+                         bytes)
+        queries = ['chr1:763769:ATT', 'chr14:56783534:G', 'chr1:1:A', 'chr1:724137:TAATGGAATGG']
+        for prs_meth_name, args in [['eq', queries],
+                                    ['eq_plds', queries],
+                                    ['rng', ['chr1', 'chr14:56700000']],
+                                    ['rng_plds', ['chr1:700000', 'chr14']],
+                                    ['hist', ['chr1', 'chr99']],
+                                    ['distinct', ['chr14:56783534', 'chr14:56868236:TAA']]]:
+            self.assertEqual(list(getattr(enc_prs_obj, prs_meth_name)(*args)),
+                             list(getattr(noenc_prs_obj, prs_meth_name)(*args)))
+        self.assertEqual(list(enc_prs_obj.eq_batch(queries)),
+                         list(noenc_prs_obj.eq_batch(queries)))
+        self.assertEqual(list(enc_prs_obj.join(queries)),
+                         list(noenc_prs_obj.join(queries)))
+        self.assertEqual(enc_prs_obj.count('chr1', 'chr14:56783534'),
+                         noenc_prs_obj.count('chr1', 'chr14:56783534'))
+        self.assertEqual(enc_prs_obj.count(),
+                         28)
+        adopt_prs_obj = Prs(db_file_path=self.src_file_path,
+                            adb_name_prefix='enc',
+                            adb_srt_rule=SrtRules.natur)
+        self.assertTrue(adopt_prs_obj.key_enc)
+        self.assertEqual(list(adopt_prs_obj.eq(*queries)),
+                         list(noenc_prs_obj.eq(*queries)))
+        adopt_prs_obj.close()
+        flat_idx_obj = Idx(db_file_path=self.src_file_path,
+                           adb_name_prefix='flatenc',
+                           db_line_prs=get_alleles,
+                           adb_srt_rule=SrtRules.natur,
+                           lstarts_idx_len=3,
+                           bloom_fpr=0.01,
+                           adb_fmt='flat',
+                           key_enc=True)
+        flat_idx_obj.idx()
+        adb_paths.append(flat_idx_obj.adb_path)
+        for key_enc in [False, True]:
+            adopt_prs_obj = Prs(db_file_path=self.src_file_path,
+                                adb_name_prefix='flatenc',
+                                adb_srt_rule=SrtRules.natur,
+                                key_enc=key_enc)
+            self.assertTrue(adopt_prs_obj.key_enc)
+            self.assertEqual(list(adopt_prs_obj.eq(*queries)),
+                             list(noenc_prs_obj.eq(*queries)))
+            adopt_prs_obj.close()
+        self.assertEqual(load_flat_adb_head(dump_flat_adb_head(40, 8)),
+                         (40, 8, 0, 0, False))
+        self.assertIsNone(load_flat_adb_head(dump_flat_adb_head()[:4] +
+                                             b'\1' +
+                                             dump_flat_adb_head()[5:])[4])
+        for prs_obj in prs_objs:
+            prs_obj.close()
+        del_files(self.src_file_path,
+                  self.db_zst_path,
+                  *adb_paths)
+
+    @staticmethod
+    async def collect_async(any_async_gen):
+        return [row
+                async for row in any_async_gen]
+
 
 class SrtRulesTests(unittest.TestCase):
     srt_rules = SrtRules()
@@ -828,6 +2375,91 @@ class SrtRulesTests(unittest.TestCase):
                           self.srt_rules.letts_nums,
                           'id-1')
 
+    def test_srt_rule_fast_paths(self):
+        self.assertEqual(self.srt_rules.natur('rs'),
+                         [[float('+inf'), 'rs']])
+        self.assertEqual(self.srt_rules.natur('rs',
+                                              nums_first=False),
+                         [[float('-inf'), 'rs']])
+        self.assertEqual(self.srt_rules.natur('\u0663'),
+                         [[3]])
+        self.assertEqual(self.srt_rules.natur('inf'),
+                         [[float('+inf')]])
+        self.assertEqual(self.srt_rules.natur('Infinity'),
+                         [[float('+inf')]])
+        self.assertEqual(self.srt_rules.natur('chr-inf'),
+                         [[float('+inf'), 'chr-inf']])
+        self.assertTrue(all(map(lambda subcell: subcell != subcell,
+                                self.srt_rules.natur('NaN')[0])))
+        self.assertEqual(self.srt_rules.natur('x:inf'),
+                         [[float('+inf'), 'x:inf']])
+        self.assertEqual(self.srt_rules.natur('1:inf'),
+                         [[1, ':inf']])
+        self.assertRaises(IndexError,
+                          self.srt_rules.natur,
+                          '')
+        self.assertEqual(self.srt_rules.natur_batch(['rs10', 'chr1:5', '7']),
+                         [[[float('+inf'), 'rs', 10]],
+                          [[float('+inf'), 'chr', 1, ':', 5]],
+                          [[7]]])
+        self.assertEqual(self.srt_rules.letts_nums_batch(['rs1', 'ENSG000']),
+                         [['rs', 1], ['ENSG', 0]])
+
+    def test_memo_srt_rule(self):
+        memo_natur = memo_srt_rule(SrtRules.natur,
+                                   max_size=2)
+        for src_str in ['rs1', 'rs1', 'rs2,5', 'rs1']:
+            self.assertEqual(memo_natur(src_str),
+                             SrtRules.natur(src_str))
+        self.assertEqual(memo_natur('rs2,5',
+                                    dec_delimiter=','),
+                         [[float('+inf'), 'rs', 2.5]])
+        self.assertEqual(memo_natur(['chr14', 1]),
+                         [[float('+inf'), 'chr', 14], [1]])
+        self.assertEqual(memo_natur.cache_info().hits,
+                         2)
+
+
+class KeyEncTests(unittest.TestCase):
+    def test_enc_key_ordr(self):
+        vals = [0, -0.0, 1, -1, 2 ** 53, 2 ** 53 + 1, 2 ** 53 - 1, 2.5, -2.5,
+                float('inf'), float('-inf'), 10 ** 20, -10 ** 20, 1e308,
+                int(1e308) + 1, 2 ** 1024 + 5, -2 ** 1024 - 5, 5e-324, True]
+        self.assertEqual(sorted(vals,
+                                key=enc_key),
+                         sorted(vals))
+        strs = ['', 'a', 'a\0', 'a\0b', 'ab', 'b', '\uffff', '\U0001f600', 'z\0\0']
+        self.assertEqual(sorted(strs,
+                                key=enc_key),
+                         sorted(strs))
+        natur_vals = [SrtRules.natur(src_str)
+                      for src_str in ['rs1', 'rs12', 'rs2', 'chr1:12:A', 'chr14:5:AT',
+                                      'chr1', 'chr1:1', '1.5', 'x', 'x1y2', '-3', '1e5']]
+        self.assertEqual(sorted(natur_vals,
+                                key=enc_key),
+                         sorted(natur_vals))
+        self.assertEqual(sorted([[1, [2, 'a']], [1, [2]], [1], [], [1, [2, 'a'], 3]],
+                                key=enc_key),
+                         [[], [1], [1, [2]], [1, [2, 'a']], [1, [2, 'a'], 3]])
+        self.assertEqual(enc_key(2),
+                         enc_key(2.0))
+        self.assertEqual(enc_key((1, 'a')),
+                         enc_key([1, 'a']))
+
+    def test_dec_key(self):
+        for val in [0, 1, -1, 2 ** 53 + 1, -2 ** 1024 - 5, 2.5, float('inf'), 'a\0b', b'\0',
+                    [[float('inf'), 'rs', 12044852]], [[1.1], [-2.2], [float('-inf'), 'str']]]:
+            self.assertEqual(dec_key(enc_key(val)),
+                             val)
+        self.assertEqual(type(dec_key(enc_key(2.0))),
+                         int)
+        self.assertRaises(TypeError,
+                          enc_key,
+                          None)
+        self.assertRaises(ValueError,
+                          enc_key,
+                          10 ** 400)
+
 
 if __name__ == "__main__":
     unittest.main()